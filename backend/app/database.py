@@ -1,30 +1,132 @@
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import MetaData, event, Insert, Update, Delete
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from typing import Tuple
+from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 USE_SQLITE = os.getenv("USE_SQLITE", "true").lower() == "true"
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "true").lower() == "true"
 
-if USE_SQLITE:
-    DATABASE_URL = "sqlite:///./workflow_app.db"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB rather than pages
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY"
+}
+
+def _async_url(url: str) -> str:
+    """Point a plain database URL at its asyncio driver"""
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    }
+
+def apply_sqlite_pragmas(engine: AsyncEngine, pragmas: dict = SQLITE_PRAGMAS):
+    """Run the performance pragmas on every new connection"""
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_sqlite_engines(url: str, read_pool_size: int) -> Tuple[AsyncEngine, AsyncEngine]:
+    """Return (reader, writer) engines for one SQLite file.
+
+    SQLite allows one writer at a time. Giving writes a single pooled
+    connection queues them in the pool instead of letting them fail with
+    "database is locked", while WAL lets the reader pool keep serving
+    reads during a write.
+    """
     connect_args = {"check_same_thread": False}
+    reader = create_async_engine(
+        url, connect_args=connect_args, poolclass=AsyncAdaptedQueuePool,
+        pool_size=read_pool_size, max_overflow=0
+    )
+    writer = create_async_engine(
+        url, connect_args=connect_args, poolclass=AsyncAdaptedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=60
+    )
+    apply_sqlite_pragmas(reader)
+    apply_sqlite_pragmas(writer)
+    return reader, writer
+
+class RoutingSession(Session):
+    """Sends flushes and DML to the writer engine and plain reads to the reader.
+
+    Once a transaction has written, later reads stay on the writer until it
+    ends, so the session sees its own uncommitted changes.
+    """
+
+    reader = None
+    writer = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)) or self.info.get("wrote"):
+            self.info["wrote"] = True
+            return self.writer.sync_engine
+        return self.reader.sync_engine
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
+
+def routing_sessionmaker(reader: AsyncEngine, writer: AsyncEngine) -> async_sessionmaker:
+    session_class = type("BoundRoutingSession", (RoutingSession,), {"reader": reader, "writer": writer})
+    return async_sessionmaker(class_=AsyncSession, sync_session_class=session_class,
+                              autoflush=False, expire_on_commit=False)
+
+if USE_SQLITE:
+    DATABASE_URL = "sqlite+aiosqlite:///./workflow_app.db"
     print("Using SQLite database for local development")
 else:
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    connect_args = {}
+    DATABASE_URL = _async_url(os.getenv("DATABASE_URL"))
     print("Using Neon PostgreSQL database")
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if USE_SQLITE and SQLITE_PROFILE:
+    engine, write_engine = create_sqlite_engines(DATABASE_URL, int(os.getenv("SQLITE_READ_POOL_SIZE", "8")))
+    SessionLocal = routing_sessionmaker(engine, write_engine)
+else:
+    engine = create_async_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False} if USE_SQLITE else {},
+        # aiosqlite defaults to NullPool; pool its connections like any other driver
+        poolclass=AsyncAdaptedQueuePool,
+        **_pool_options()
+    )
+    write_engine = engine
+    # Objects stay usable after commit; async sessions cannot lazy-load expired attributes
+    SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+def utcnow() -> datetime:
+    """Client-side timestamp default.
+
+    Keyset cursors compare created_at values, so they must be stored in the
+    same format as bound parameters; SQLite's CURRENT_TIMESTAMP drops the
+    microseconds and would make rows from the same second compare wrongly.
+    """
+    return datetime.now(timezone.utc)
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
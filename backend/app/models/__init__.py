@@ -0,0 +1,16 @@
+from .document import Document
+from .workflow import Workflow, WorkflowExecution, WorkflowExecutionTrace, WorkflowBatch, ExecutionJob
+from .chat import ChatSession, ChatMessage
+from .idempotency import IdempotencyKey
+
+__all__ = [
+    "Document",
+    "Workflow",
+    "WorkflowExecution",
+    "WorkflowExecutionTrace",
+    "WorkflowBatch",
+    "ExecutionJob",
+    "ChatSession",
+    "ChatMessage",
+    "IdempotencyKey"
+]
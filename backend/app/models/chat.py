@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base, utcnow
+
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
+    session_id = Column(String(255), unique=True, index=True, nullable=False)
+    # Rolling summary of every message created up to and including summary_until
+    summary = Column(Text)
+    summary_until = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    # Time of the latest message, so sessions can be listed by activity
+    updated_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_chat_sessions_workflow_id_updated_at", "workflow_id", "updated_at"),
+    )
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(255), ForeignKey("chat_sessions.session_id"), nullable=False)
+    message_type = Column(String(50), nullable=False)
+    content = Column(Text, nullable=False)
+    msg_metadata = Column(JSON)
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_created_at", "session_id", "created_at"),
+    )
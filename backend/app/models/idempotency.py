@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.database import Base, utcnow
+
+class IdempotencyKey(Base):
+    """Outcome of a request sent with an Idempotency-Key, replayed to retries of it"""
+    __tablename__ = "idempotency_keys"
+
+    # SHA-256 of the endpoint scope and the client's key
+    key = Column(String(64), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="in_progress")
+    # Claim token of the request running it; completing or releasing is fenced on it
+    owner = Column(String(32))
+    # An in-progress key not completed by then is taken over by the next retry
+    locked_until = Column(DateTime(timezone=True))
+    response_status = Column(Integer)
+    response_body = Column(JSON)
+    response_headers = Column(JSON)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
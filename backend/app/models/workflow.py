@@ -0,0 +1,88 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, ForeignKey, Index, Float, LargeBinary
+from sqlalchemy.sql import func
+from app.database import Base, utcnow
+
+class Workflow(Base):
+    __tablename__ = "workflows"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    description = Column(Text)
+    components = Column(JSON, nullable=False)
+    connections = Column(JSON, nullable=False)
+    is_valid = Column(Boolean, default=False)
+    settings = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Client-side so that two updates within one second still get distinct versions
+    updated_at = Column(DateTime(timezone=True), onupdate=utcnow)
+
+class WorkflowExecution(Base):
+    __tablename__ = "workflow_executions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
+    input_query = Column(Text, nullable=False)
+    output_response = Column(Text)
+    # Only set on executions recorded before step traces moved to WorkflowExecutionTrace
+    execution_steps = Column(JSON)
+    trace_payloads = Column(JSON)
+    status = Column(String(50), default="pending")
+    error_message = Column(Text)
+    duration_ms = Column(Float)
+    step_count = Column(Integer)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    batch_id = Column(String(36), ForeignKey("workflow_batches.id"), index=True)
+    batch_index = Column(Integer)
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    completed_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_workflow_executions_workflow_id_created_at", "workflow_id", "created_at"),
+    )
+
+class WorkflowExecutionTrace(Base):
+    """Compressed step trace of one execution, loaded only when asked for"""
+    __tablename__ = "workflow_execution_traces"
+
+    execution_id = Column(Integer, ForeignKey("workflow_executions.id"), primary_key=True)
+    encoding = Column(String(20), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    size_bytes = Column(Integer)
+
+class WorkflowBatch(Base):
+    __tablename__ = "workflow_batches"
+
+    id = Column(String(36), primary_key=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
+    inputs = Column(JSON, nullable=False)
+    options = Column(JSON)
+    status = Column(String(50), default="pending")
+    total = Column(Integer, nullable=False)
+    completed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class ExecutionJob(Base):
+    """Queued run of a WorkflowExecution, claimed by an execution worker under a lease"""
+    __tablename__ = "execution_jobs"
+
+    execution_id = Column(Integer, ForeignKey("workflow_executions.id"), primary_key=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
+    kind = Column(String(20), nullable=False)
+    payload = Column(JSON)
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # Not claimable before this; pushed back after a failed attempt
+    available_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    lease_owner = Column(String(64))
+    lease_expires_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=utcnow)
+
+    __table_args__ = (
+        Index("ix_execution_jobs_status_available_at", "status", "available_at"),
+    )
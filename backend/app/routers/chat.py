@@ -1,50 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import asyncio
+import os
 import uuid
 
 from app.database import get_db
 from app.models.chat import ChatSession, ChatMessage
-from app.models.workflow import Workflow
+from app.models.workflow import WorkflowExecution
+from app.schemas.workflow import QueuedExecution
 from app.schemas.chat import (
     ChatRequest, ChatResponse,
     ChatSession as ChatSessionSchema,
     ChatMessage as ChatMessageSchema
 )
-from app.services.workflow_executor import workflow_executor
+from app.services.workflow_executor import workflow_executor, resolve_max_parallelism
+from app.services.plan_cache import plan_cache
+from app.services.workflow_cache import workflow_cache
+from app.services.trace_recorder import resolve_trace_level
+from app.services.chat_store import chat_store
+from app.services.chroma_service import chroma_service
+from app.services.chat_memory import chat_memory
+from app.services.job_queue import job_queue
+from app.services.admission import admission
+from app.services.fair_scheduler import resolve_tenant
+from app.services.idempotency import idempotency, json_body, IdempotentRequest
+from app.services.pagination import paginate, schema_columns, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.cancellation import watch_disconnect, resolve_timeout
+from app.services.metrics import estimate_tokens
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-@router.post("/", response_model=ChatResponse)
+def _multi_worker() -> bool:
+    """Whether other API workers may be writing sessions to the same database"""
+    return int(os.getenv("WEB_CONCURRENCY", "1")) > 1 or chroma_service.shared
+
+async def _session_exists(db: AsyncSession, session_id: str) -> bool:
+    """Whether the session is in the database.
+
+    With several workers the session may have been created by another one
+    whose write-behind buffer has not flushed yet, so a miss is checked again
+    once that flush is due before it counts as unknown. A single worker
+    knows its own buffer, so there a miss is final.
+    """
+    query = select(ChatSession.id).where(ChatSession.session_id == session_id)
+    if (await db.execute(query)).first() is not None:
+        return True
+    if not _multi_worker():
+        return False
+    # End the read transaction so the second look sees the other worker's commit
+    await db.rollback()
+    await asyncio.sleep(chat_store.interval * 2)
+    return (await db.execute(query)).first() is not None
+
+async def _workflow_id(request: Request) -> Optional[int]:
+    """The body's workflow id, read without validating the body a second time"""
+    body = await json_body(request)
+    try:
+        return int(body["workflow_id"])
+    except (KeyError, TypeError, ValueError):
+        # The body is rejected with 422 once the endpoint validates it
+        return None
+
+async def _idempotency(request: Request):
+    """Claim the request's Idempotency-Key, if it sent one; released again unless the message is answered"""
+    claim = await idempotency.begin(
+        request, f"chat:{resolve_tenant(request, await _workflow_id(request))}", await json_body(request)
+    )
+    try:
+        yield claim
+    finally:
+        await idempotency.release(claim)
+
+async def _admit(request: Request, claim: Optional[IdempotentRequest] = Depends(_idempotency)):
+    """Hold an admission slot while an inline run is handled; queued runs only insert a row"""
+    if job_queue.wants_queue(request) or (claim is not None and claim.replay is not None):
+        yield
+        return
+    async with admission.admit(await _workflow_id(request)):
+        yield
+
+@router.post("/", response_model=ChatResponse,
+             responses={
+                 202: {"model": QueuedExecution},
+                 409: {"description": "Idempotency-Key still in progress; see Retry-After"},
+                 429: {"description": "At capacity; see Retry-After"}
+             },
+             dependencies=[Depends(_admit)])
 async def send_message(
     chat_request: ChatRequest,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    claim: Optional[IdempotentRequest] = Depends(_idempotency)
 ):
-    """Send a message and get response from workflow"""
+    """Send a message and get response from workflow.
     
-    session_id = chat_request.session_id
-    if not session_id:
-        session_id = str(uuid.uuid4())
-        
-        db_session = ChatSession(
-            workflow_id=chat_request.workflow_id,
-            session_id=session_id
-        )
-        db.add(db_session)
-        db.commit()
-    else:
-        db_session = db.query(ChatSession).filter(
-            ChatSession.session_id == session_id
-        ).first()
-        if not db_session:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Chat session not found"
-            )
-    
-    workflow = db.query(Workflow).filter(
-        Workflow.id == chat_request.workflow_id
-    ).first()
+    Sessions and messages are queued on the write-behind store rather than
+    committed here; they reach the database within one flush interval. The
+    workflow sees the session's bounded memory (rolling summary plus recent
+    turns) as its ``history`` input.
+    
+    With ``Prefer: respond-async`` (or EXECUTION_MODE=queue) the message is
+    answered by an execution worker: the response is 202 with the execution
+    id, and the reply is added to the session when the run completes.
+    
+    A retry sent with the same ``Idempotency-Key`` gets the first request's
+    response; the message is neither answered nor stored a second time.
+    """
+    if claim is not None and claim.replay is not None:
+        return claim.replay
+    
+    workflow = await workflow_cache.get(db, chat_request.workflow_id)
     if not workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -57,86 +124,130 @@ async def send_message(
             detail="Workflow is not valid"
         )
     
-    user_message = ChatMessage(
-        session_id=session_id,
-        message_type="user",
-        content=chat_request.message
-    )
-    db.add(user_message)
-    db.commit()
+    session_id = chat_request.session_id
+    if not session_id:
+        session_id = str(uuid.uuid4())
+        chat_store.add_session(session_id, chat_request.workflow_id)
+    elif not chat_store.pending_session(session_id) and not await _session_exists(db, session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
+        )
+    
+    memory_policy = chat_memory.policy_for(workflow.settings)
+    # Loaded before queuing this message, so only the earlier turns are in it
+    history = await chat_memory.load(db, session_id, memory_policy) if chat_request.session_id else None
+    
+    chat_store.add_message(session_id, "user", chat_request.message)
+    
+    if job_queue.wants_queue(request):
+        # The worker writes the reply straight to the database, so the session and question go first
+        await chat_store.flush()
+        db_execution = WorkflowExecution(
+            workflow_id=chat_request.workflow_id,
+            input_query=chat_request.message,
+            status="queued"
+        )
+        db.add(db_execution)
+        await job_queue.enqueue(db, db_execution, "chat", {
+            "session_id": session_id,
+            "history": history,
+            "tenant": resolve_tenant(request, chat_request.workflow_id),
+            **chat_request.model_dump(mode="json", include={"trace_level", "timeout_seconds", "max_parallelism"})
+        })
+        await db.commit()
+        return await idempotency.complete(claim, job_queue.accepted(db_execution.id, session_id=session_id))
+    
+    # End the read transaction so the run does not hold a pooled connection
+    await db.commit()
     
+    # A keyed run outlives a dropped connection, so the client's retry can pick up its reply
+    cancel_event, watcher = watch_disconnect(request, enabled=claim is None)
     try:
-        from app.schemas.workflow import ComponentConfig, WorkflowConnection
-        components = [ComponentConfig(**comp) for comp in workflow.components]
-        connections = [WorkflowConnection(**conn) for conn in workflow.connections]
+        plan = plan_cache.get_plan(workflow)
         
-        result = await workflow_executor.execute_workflow(
-            components=components,
-            connections=connections,
+        result = await workflow_executor.execute_plan(
+            plan=plan,
             user_query=chat_request.message,
-            workflow_id=chat_request.workflow_id
+            workflow_id=chat_request.workflow_id,
+            trace_level=resolve_trace_level(chat_request.trace_level, workflow.settings),
+            timeout_seconds=resolve_timeout(chat_request.timeout_seconds, workflow.settings),
+            max_parallelism=resolve_max_parallelism(chat_request.max_parallelism, workflow.settings),
+            cancel_event=cancel_event,
+            history=history,
+            tenant=resolve_tenant(request, chat_request.workflow_id)
         )
         
         response_text = result["final_response"]
         
-        assistant_message = ChatMessage(
-            session_id=session_id,
-            message_type="assistant",
-            content=response_text,
-            msg_metadata={
-                "execution_success": result["success"],
-                "execution_steps": len(result.get("execution_steps", [])),
-                "workflow_id": chat_request.workflow_id
-            }
-        )
-        db.add(assistant_message)
-        db.commit()
+        chat_store.add_message(session_id, "assistant", response_text, {
+            "execution_success": result["success"],
+            "execution_status": result["status"],
+            "execution_steps": result["metadata"]["total_steps"],
+            "workflow_id": chat_request.workflow_id
+        })
+        chat_memory.schedule_fold(session_id, memory_policy)
         
-        return ChatResponse(
+        response = ChatResponse(
             message=response_text,
             session_id=session_id,
             metadata={
                 "execution_success": result["success"],
-                "steps_executed": len(result.get("execution_steps", []))
+                "execution_status": result["status"],
+                "steps_executed": result["metadata"]["total_steps"],
+                "trace_id": result["metadata"]["trace_id"],
+                "memory_tokens": estimate_tokens(history)
             }
         )
         
     except Exception as e:
         error_message = f"Error processing message: {str(e)}"
         
-        error_response = ChatMessage(
-            session_id=session_id,
-            message_type="assistant",
-            content=error_message,
-            msg_metadata={
-                "error": True,
-                "workflow_id": chat_request.workflow_id
-            }
-        )
-        db.add(error_response)
-        db.commit()
+        chat_store.add_message(session_id, "assistant", error_message, {
+            "error": True,
+            "workflow_id": chat_request.workflow_id
+        })
         
-        return ChatResponse(
+        response = ChatResponse(
             message=error_message,
             session_id=session_id,
             metadata={"error": True}
         )
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+    
+    # The error reply is in the session too, so a retry gets it rather than a second answer
+    return await idempotency.complete(claim, response)
 
 @router.get("/sessions/{session_id}/messages", response_model=List[ChatMessageSchema])
-async def get_chat_history(session_id: str, db: Session = Depends(get_db)):
-    """Get chat history for a session"""
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.session_id == session_id
-    ).order_by(ChatMessage.created_at.asc()).all()
+async def get_chat_history(
+    session_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get chat history for a session, oldest first"""
+    if chat_store.has_pending(session_id):
+        await chat_store.flush()
     
-    return messages
+    return await paginate(
+        db, response,
+        select(*schema_columns(ChatMessage, ChatMessageSchema)).where(ChatMessage.session_id == session_id),
+        [ChatMessage.created_at, ChatMessage.id], cursor, limit
+    )
 
 @router.get("/sessions/{session_id}", response_model=ChatSessionSchema)
-async def get_chat_session(session_id: str, db: Session = Depends(get_db)):
+async def get_chat_session(session_id: str, db: AsyncSession = Depends(get_db)):
     """Get chat session details"""
-    session = db.query(ChatSession).filter(
-        ChatSession.session_id == session_id
-    ).first()
+    if chat_store.pending_session(session_id):
+        await chat_store.flush()
+    
+    result = await db.execute(
+        select(ChatSession).where(ChatSession.session_id == session_id)
+    )
+    session = result.scalars().first()
     
     if not session:
         raise HTTPException(
@@ -147,10 +258,19 @@ async def get_chat_session(session_id: str, db: Session = Depends(get_db)):
     return ChatSessionSchema.from_orm(session)
 
 @router.get("/workflows/{workflow_id}/sessions", response_model=List[ChatSessionSchema])
-async def get_workflow_sessions(workflow_id: int, db: Session = Depends(get_db)):
-    """Get all chat sessions for a workflow"""
-    sessions = db.query(ChatSession).filter(
-        ChatSession.workflow_id == workflow_id
-    ).order_by(ChatSession.updated_at.desc()).all()
+async def get_workflow_sessions(
+    workflow_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get chat sessions for a workflow, most recently active first"""
+    if chat_store.has_pending():
+        await chat_store.flush()
     
-    return sessions
\ No newline at end of file
+    return await paginate(
+        db, response,
+        select(*schema_columns(ChatSession, ChatSessionSchema)).where(ChatSession.workflow_id == workflow_id),
+        [ChatSession.updated_at, ChatSession.id], cursor, limit, descending=True
+    )
\ No newline at end of file
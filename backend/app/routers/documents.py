@@ -1,15 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 import os
 import shutil
 from pathlib import Path
+import asyncio
 import uuid
 
 from app.database import get_db
 from app.models.document import Document
-from app.schemas.document import Document as DocumentResponse, DocumentCreate
+from app.schemas.document import Document as DocumentResponse, DocumentCreate, DocumentSummary
 from app.services.document_processor import document_processor
+from app.services.chroma_service import chroma_service
+from app.services.pagination import paginate, schema_columns, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
@@ -21,7 +25,7 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 async def upload_document(
     file: UploadFile = File(...),
     workflow_id: int = None,  # Optional workflow association
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload and process a document, optionally linking it to a workflow"""
     
@@ -58,8 +62,8 @@ async def upload_document(
         
         db_document = Document(**document_data.dict())
         db.add(db_document)
-        db.commit()
-        db.refresh(db_document)
+        await db.commit()
+        await db.refresh(db_document)
         
         # Index document in vector database
         chunk_count = await document_processor.index_document(
@@ -74,7 +78,7 @@ async def upload_document(
         
         # Update metadata with chunk count
         db_document.doc_metadata["chunk_count"] = chunk_count  # Updated field name
-        db.commit()
+        await db.commit()
         
         return DocumentResponse.from_orm(db_document)
         
@@ -87,30 +91,33 @@ async def upload_document(
             detail=f"Error processing document: {str(e)}"
         )
 
-@router.get("/", response_model=List[DocumentResponse])
+@router.get("/", response_model=List[DocumentSummary])
 async def list_documents(
+    response: Response,
     workflow_id: int = None,  # Optional filter by workflow
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get list of all documents, optionally filtered by workflow"""
-    query = db.query(Document)
+    """Get a page of documents without their text, optionally filtered by workflow"""
+    query = select(*schema_columns(Document, DocumentSummary))
     
     if workflow_id is not None:
-        query = query.filter(Document.workflow_id == workflow_id)
+        query = query.where(Document.workflow_id == workflow_id)
     
-    documents = query.all()
-    return documents
+    return await paginate(db, response, query, [Document.id], cursor, limit)
 
 @router.get("/workflow/{workflow_id}", response_model=List[DocumentResponse])
-async def get_workflow_documents(workflow_id: int, db: Session = Depends(get_db)):
+async def get_workflow_documents(workflow_id: int, db: AsyncSession = Depends(get_db)):
     """Get all documents for a specific workflow"""
-    documents = db.query(Document).filter(Document.workflow_id == workflow_id).all()
+    result = await db.execute(select(Document).where(Document.workflow_id == workflow_id))
+    documents = result.scalars().all()
     return documents
 
 @router.get("/{document_id}", response_model=DocumentResponse)
-async def get_document(document_id: int, db: Session = Depends(get_db)):
+async def get_document(document_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific document"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,9 +126,9 @@ async def get_document(document_id: int, db: Session = Depends(get_db)):
     return document
 
 @router.delete("/{document_id}")
-async def delete_document(document_id: int, db: Session = Depends(get_db)):
+async def delete_document(document_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a document"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -133,8 +140,9 @@ async def delete_document(document_id: int, db: Session = Depends(get_db)):
     if file_path.exists():
         file_path.unlink()
     
-    # Delete from database
-    db.delete(document)
-    db.commit()
+    # Delete from database and the vector store
+    await db.delete(document)
+    await db.commit()
+    await asyncio.to_thread(chroma_service.delete_documents, "documents", {"document_id": document_id})
     
     return {"message": "Document deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import json
+
+from app.database import get_db
+from app.models.workflow import WorkflowExecution
+from app.schemas.workflow import ExecutionSteps, WorkflowExecution as WorkflowExecutionSchema
+from app.services.job_queue import job_queue, FINAL_STATUSES
+from app.services.trace_store import trace_store
+from app.services.tracing import tracer
+
+router = APIRouter(prefix="/executions", tags=["executions"])
+
+async def _get_execution(execution_id: int, db: AsyncSession) -> WorkflowExecution:
+    execution = await db.get(WorkflowExecution, execution_id)
+    if not execution:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Execution not found"
+        )
+    return execution
+
+@router.get("/{execution_id}", response_model=WorkflowExecutionSchema)
+async def get_execution(execution_id: int, db: AsyncSession = Depends(get_db)):
+    """Get an execution's status and, once it has finished, its response"""
+    return await _get_execution(execution_id, db)
+
+@router.get("/{execution_id}/events")
+async def stream_execution(execution_id: int, db: AsyncSession = Depends(get_db)):
+    """Stream a queued execution as NDJSON.
+    
+    One ``status`` event per status change, then a ``done`` event carrying
+    the finished execution.
+    """
+    await _get_execution(execution_id, db)
+    await db.close()
+    
+    async def ndjson():
+        async for execution in job_queue.watch(execution_id):
+            if execution.status in FINAL_STATUSES:
+                event = {"event": "done", **WorkflowExecutionSchema.from_orm(execution).model_dump()}
+            else:
+                event = {"event": "status", "execution_id": execution_id, "status": execution.status}
+            yield json.dumps(event, default=str) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.get("/{execution_id}/steps", response_model=ExecutionSteps)
+async def get_execution_steps(execution_id: int, db: AsyncSession = Depends(get_db)):
+    """Get the recorded step trace of one execution"""
+    execution = await _get_execution(execution_id, db)
+    
+    with tracer.start_span("trace.load", execution_id=execution_id):
+        steps, payloads = await trace_store.load(db, execution)
+    
+    return ExecutionSteps(execution_id=execution_id, steps=steps, trace_payloads=payloads)
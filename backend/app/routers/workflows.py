@@ -1,24 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, timezone
 import json
+import uuid
 
 from app.database import get_db
-from app.models.workflow import Workflow, WorkflowExecution
+from app.models.workflow import Workflow, WorkflowExecution, WorkflowExecutionTrace, WorkflowBatch
 from app.schemas.workflow import (
     WorkflowCreate, WorkflowUpdate, Workflow as WorkflowSchema,
-    WorkflowExecutionCreate, WorkflowExecution as WorkflowExecutionSchema
+    WorkflowExecutionCreate, WorkflowExecution as WorkflowExecutionSchema,
+    WorkflowExecutionSummary, WorkflowBatch as WorkflowBatchSchema, TraceLevel, QueuedExecution
 )
-from app.services.workflow_executor import workflow_executor
+from app.services.workflow_executor import workflow_executor, resolve_max_parallelism
+from app.services.plan_cache import plan_cache
+from app.services.workflow_cache import workflow_cache, CachedWorkflow
+from app.services.http_cache import etag_matches, not_modified, json_with_etag
+from app.services.trace_recorder import resolve_trace_level
+from app.services.trace_store import trace_store, execution_summary
+from app.services.tracing import tracer
+from app.services.cancellation import watch_disconnect, resolve_timeout
+from app.services.batch_runner import batch_runner, parse_batch_inputs
+from app.services.retention import retention
+from app.services.chat_memory import chat_memory
+from app.services.job_queue import job_queue
+from app.services.admission import admission
+from app.services.fair_scheduler import resolve_tenant
+from app.services.idempotency import idempotency, json_body, IdempotentRequest
+from app.services.pagination import paginate, schema_columns, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/workflows", tags=["workflows"])
 
+def _check_settings(settings: Optional[dict]):
+    """Reject per-workflow overrides that could not be applied later"""
+    try:
+        retention.policy.for_workflow(settings)
+        chat_memory.policy_for(settings)
+        resolve_trace_level(None, settings)
+        resolve_timeout(None, settings)
+        resolve_max_parallelism(None, settings)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.post("/", response_model=WorkflowSchema)
 async def create_workflow(
     workflow: WorkflowCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new workflow"""
+    _check_settings(workflow.settings)
     
     # Validate workflow
     is_valid = workflow_executor._validate_workflow(
@@ -29,42 +61,52 @@ async def create_workflow(
     db_workflow = Workflow(
         name=workflow.name,
         description=workflow.description,
+        settings=workflow.settings,
         components=json.loads(json.dumps([comp.dict() for comp in workflow.components])),
         connections=json.loads(json.dumps([conn.dict() for conn in workflow.connections])),
         is_valid=is_valid
     )
     
     db.add(db_workflow)
-    db.commit()
-    db.refresh(db_workflow)
+    await db.commit()
+    await db.refresh(db_workflow)
     
     return WorkflowSchema.from_orm(db_workflow)
 
 @router.get("/", response_model=List[WorkflowSchema])
-async def list_workflows(db: Session = Depends(get_db)):
-    """Get list of all workflows"""
-    workflows = db.query(Workflow).all()
-    return workflows
+async def list_workflows(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a page of workflows; X-Next-Cursor holds the cursor for the next page"""
+    return await paginate(
+        db, response, select(*schema_columns(Workflow, WorkflowSchema)),
+        [Workflow.id], cursor, limit
+    )
 
 @router.get("/{workflow_id}", response_model=WorkflowSchema)
-async def get_workflow(workflow_id: int, db: Session = Depends(get_db)):
-    """Get a specific workflow"""
-    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+async def get_workflow(workflow_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get a specific workflow; a matching If-None-Match gets 304 Not Modified"""
+    workflow = await workflow_cache.get(db, workflow_id)
     if not workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Workflow not found"
         )
-    return WorkflowSchema.from_orm(workflow)
+    if etag_matches(request, workflow.etag):
+        return not_modified(workflow.etag)
+    return json_with_etag(workflow.body, workflow.etag)
 
 @router.put("/{workflow_id}", response_model=WorkflowSchema)
 async def update_workflow(
     workflow_id: int,
     workflow_update: WorkflowUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a workflow"""
-    db_workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+    db_workflow = await db.get(Workflow, workflow_id)
     if not db_workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -72,6 +114,8 @@ async def update_workflow(
         )
     
     update_data = workflow_update.dict(exclude_unset=True)
+    if "settings" in update_data:
+        _check_settings(update_data["settings"])
     
     # Convert Pydantic models to dict for JSON storage
     if "components" in update_data:
@@ -98,34 +142,77 @@ async def update_workflow(
     for field, value in update_data.items():
         setattr(db_workflow, field, value)
     
-    db.commit()
-    db.refresh(db_workflow)
+    await db.commit()
+    await db.refresh(db_workflow)
+    plan_cache.invalidate(workflow_id)
+    workflow_cache.invalidate(workflow_id)
     
     return WorkflowSchema.from_orm(db_workflow)
 
 @router.delete("/{workflow_id}")
-async def delete_workflow(workflow_id: int, db: Session = Depends(get_db)):
-    """Delete a workflow"""
-    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+async def delete_workflow(workflow_id: int, db: AsyncSession = Depends(get_db)):
+    """Delete a workflow with its executions, chat history, documents, vectors and uploads"""
+    workflow = await db.get(Workflow, workflow_id)
     if not workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Workflow not found"
         )
     
-    db.delete(workflow)
-    db.commit()
+    # Release this session's connection before the cleanup takes the writer
+    await db.close()
+    purged = await retention.delete_workflow(workflow_id)
+    plan_cache.invalidate(workflow_id)
+    workflow_cache.invalidate(workflow_id)
     
-    return {"message": "Workflow deleted successfully"}
+    return {"message": "Workflow deleted successfully", "deleted": purged}
+
+async def _idempotency(workflow_id: int, request: Request):
+    """Claim the request's Idempotency-Key, if it sent one; released again unless the run completes"""
+    claim = await idempotency.begin(
+        request, f"execute:{resolve_tenant(request, workflow_id)}:{workflow_id}", await json_body(request)
+    )
+    try:
+        yield claim
+    finally:
+        await idempotency.release(claim)
 
-@router.post("/{workflow_id}/execute", response_model=WorkflowExecutionSchema)
+async def _admit(workflow_id: int, request: Request,
+                 claim: Optional[IdempotentRequest] = Depends(_idempotency)):
+    """Hold an admission slot while an inline run is handled; queued runs only insert a row"""
+    if job_queue.wants_queue(request) or (claim is not None and claim.replay is not None):
+        yield
+        return
+    async with admission.admit(workflow_id):
+        yield
+
+@router.post("/{workflow_id}/execute", response_model=WorkflowExecutionSchema,
+             responses={
+                 202: {"model": QueuedExecution},
+                 409: {"description": "Idempotency-Key still in progress; see Retry-After"},
+                 429: {"description": "At capacity; see Retry-After"}
+             },
+             dependencies=[Depends(_admit)])
 async def execute_workflow(
     workflow_id: int,
     execution: WorkflowExecutionCreate,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    claim: Optional[IdempotentRequest] = Depends(_idempotency)
 ):
-    """Execute a workflow"""
-    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+    """Execute a workflow.
+    
+    With ``Prefer: respond-async`` (or EXECUTION_MODE=queue) the run is
+    queued for an execution worker and the response is 202 with the
+    execution id; poll ``/executions/{id}`` or stream ``/executions/{id}/events``.
+    
+    A retry sent with the same ``Idempotency-Key`` gets the first request's
+    response instead of running the workflow again.
+    """
+    if claim is not None and claim.replay is not None:
+        return claim.replay
+    
+    workflow = await workflow_cache.get(db, workflow_id)
     if not workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -138,57 +225,204 @@ async def execute_workflow(
             detail="Workflow is not valid"
         )
     
+    queued = job_queue.wants_queue(request)
+    tenant = resolve_tenant(request, workflow_id)
+    
     # Create execution record
     db_execution = WorkflowExecution(
         workflow_id=workflow_id,
         input_query=execution.input_query,
-        status="running"
+        status="queued" if queued else "running"
     )
     db.add(db_execution)
-    db.commit()
-    db.refresh(db_execution)
+    if queued:
+        await job_queue.enqueue(db, db_execution, "execute", {
+            "tenant": tenant,
+            **execution.model_dump(mode="json", include={"trace_level", "timeout_seconds", "max_parallelism"})
+        })
+    with tracer.start_span("db.commit"):
+        await db.commit()
+    if queued:
+        return await idempotency.complete(claim, job_queue.accepted(db_execution.id))
+    await db.refresh(db_execution)
+    # Hand the connection back while the workflow runs; the writes after it start a new transaction
+    await db.commit()
     
+    # A keyed run outlives a dropped connection, so the client's retry can pick up its result
+    cancel_event, watcher = watch_disconnect(request, enabled=claim is None)
     try:
-        # Convert stored JSON back to Pydantic objects
-        from app.schemas.workflow import ComponentConfig, WorkflowConnection
-        components = [ComponentConfig(**comp) for comp in workflow.components]
-        connections = [WorkflowConnection(**conn) for conn in workflow.connections]
+        # Reuse the compiled plan for this workflow version
+        plan = plan_cache.get_plan(workflow)
         
         # Execute workflow
-        result = await workflow_executor.execute_workflow(
-            components=components,
-            connections=connections,
-            user_query=execution.input_query
+        result = await workflow_executor.execute_plan(
+            plan=plan,
+            user_query=execution.input_query,
+            trace_level=resolve_trace_level(execution.trace_level, workflow.settings),
+            timeout_seconds=resolve_timeout(execution.timeout_seconds, workflow.settings),
+            max_parallelism=resolve_max_parallelism(execution.max_parallelism, workflow.settings),
+            cancel_event=cancel_event,
+            tenant=tenant
         )
         
-        # Update execution record
-        db_execution.status = "completed" if result["success"] else "failed"
+        # Update execution record; timed_out and cancelled keep their partial steps
+        db_execution.status = result["status"]
         db_execution.output_response = result["final_response"]
-        db_execution.execution_steps = result["execution_steps"]
+        db_execution.completed_at = datetime.now(timezone.utc)
+        for field, value in execution_summary(result).items():
+            setattr(db_execution, field, value)
         if not result["success"]:
             db_execution.error_message = result.get("error", "Unknown error")
         
-        db.commit()
-        db.refresh(db_execution)
+        trace = trace_store.encode(db_execution.id, result["execution_steps"], result["trace_payloads"])
+        if trace:
+            db.add(WorkflowExecutionTrace(**trace))
         
-        return WorkflowExecutionSchema.from_orm(db_execution)
+        with tracer.start_span("db.commit"):
+            await db.commit()
+        await db.refresh(db_execution)
+        
+        # The caller gets the steps of the run it just made; listings leave them out
+        response = WorkflowExecutionSchema.from_orm(db_execution)
+        response.execution_steps = result["execution_steps"]
+        response.trace_payloads = result["trace_payloads"]
+        return await idempotency.complete(claim, response)
         
     except Exception as e:
         db_execution.status = "failed"
         db_execution.error_message = str(e)
-        db.commit()
-        db.refresh(db_execution)
+        with tracer.start_span("db.commit"):
+            await db.commit()
+        await db.refresh(db_execution)
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Workflow execution failed: {str(e)}"
         )
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+@router.get("/{workflow_id}/executions", response_model=List[WorkflowExecutionSummary])
+async def get_workflow_executions(
+    workflow_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get execution summaries for a workflow, newest first; steps are at /executions/{id}/steps"""
+    return await paginate(
+        db, response,
+        select(*schema_columns(WorkflowExecution, WorkflowExecutionSummary))
+        .where(WorkflowExecution.workflow_id == workflow_id),
+        [WorkflowExecution.created_at, WorkflowExecution.id], cursor, limit, descending=True
+    )
+
+def _stream_batch(batch: WorkflowBatch, workflow: CachedWorkflow) -> StreamingResponse:
+    """Run the batch's remaining queries and stream results as NDJSON"""
+    options = batch.options or {}
+    # Compile once for the whole batch
+    plan = plan_cache.get_plan(workflow)
+    results = batch_runner.run(
+        batch.id,
+        plan,
+        trace_level=resolve_trace_level(options.get("trace_level"), workflow.settings),
+        timeout_seconds=resolve_timeout(options.get("timeout_seconds"), workflow.settings),
+        max_parallelism=resolve_max_parallelism(options.get("max_parallelism"), workflow.settings),
+        concurrency=options.get("concurrency"),
+        tenant=options.get("tenant") or resolve_tenant(None, batch.workflow_id)
+    )
+    
+    async def ndjson():
+        async for event in results:
+            yield json.dumps(event, default=str) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+async def _get_valid_workflow(workflow_id: int, db: AsyncSession) -> CachedWorkflow:
+    workflow = await workflow_cache.get(db, workflow_id)
+    if not workflow:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workflow not found"
+        )
+    
+    if not workflow.is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Workflow is not valid"
+        )
+    return workflow
+
+async def _get_batch(workflow_id: int, batch_id: str, db: AsyncSession) -> WorkflowBatch:
+    batch = await db.get(WorkflowBatch, batch_id)
+    if batch and batch.workflow_id != workflow_id:
+        batch = None
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found"
+        )
+    return batch
+
+@router.post("/{workflow_id}/batches")
+async def execute_batch(
+    workflow_id: int,
+    request: Request,
+    file: UploadFile = File(...),
+    concurrency: Optional[int] = Form(None),
+    trace_level: Optional[TraceLevel] = Form(None),
+    timeout_seconds: Optional[float] = Form(None, gt=0),
+    max_parallelism: Optional[int] = Form(None, gt=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """Execute a workflow for every query in a JSONL or CSV upload.
+    
+    Results stream back as NDJSON as they complete: a ``batch`` event with
+    the batch id, one ``result`` event per query and a final ``done`` event.
+    """
+    workflow = await _get_valid_workflow(workflow_id, db)
+    
+    try:
+        queries = parse_batch_inputs(await file.read(), file.filename or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid batch file: {str(e)}"
+        )
+    
+    batch = WorkflowBatch(
+        id=str(uuid.uuid4()),
+        workflow_id=workflow_id,
+        inputs=queries,
+        options={
+            "concurrency": concurrency,
+            "trace_level": trace_level,
+            "timeout_seconds": timeout_seconds,
+            "max_parallelism": max_parallelism,
+            "tenant": resolve_tenant(request, workflow_id)
+        },
+        status="pending",
+        total=len(queries),
+        completed=0,
+        failed=0
+    )
+    db.add(batch)
+    with tracer.start_span("db.commit"):
+        await db.commit()
+    
+    return _stream_batch(batch, workflow)
 
-@router.get("/{workflow_id}/executions", response_model=List[WorkflowExecutionSchema])
-async def get_workflow_executions(workflow_id: int, db: Session = Depends(get_db)):
-    """Get execution history for a workflow"""
-    executions = db.query(WorkflowExecution).filter(
-        WorkflowExecution.workflow_id == workflow_id
-    ).order_by(WorkflowExecution.created_at.desc()).all()
+@router.post("/{workflow_id}/batches/{batch_id}/resume")
+async def resume_batch(workflow_id: int, batch_id: str, db: AsyncSession = Depends(get_db)):
+    """Run the queries of an interrupted batch that have no execution yet"""
+    workflow = await _get_valid_workflow(workflow_id, db)
+    batch = await _get_batch(workflow_id, batch_id, db)
     
-    return executions
\ No newline at end of file
+    return _stream_batch(batch, workflow)
+
+@router.get("/{workflow_id}/batches/{batch_id}", response_model=WorkflowBatchSchema)
+async def get_batch(workflow_id: int, batch_id: str, db: AsyncSession = Depends(get_db)):
+    """Get batch progress"""
+    return await _get_batch(workflow_id, batch_id, db)
@@ -1,8 +1,8 @@
-from .document import Document, DocumentCreate, DocumentUpdate, DocumentResponse
+from .document import Document, DocumentCreate, DocumentUpdate, DocumentResponse, DocumentSummary
 from .workflow import (
     Workflow, WorkflowCreate, WorkflowUpdate,
-    WorkflowExecution, WorkflowExecutionCreate,
-    ComponentConfig, WorkflowConnection, ComponentType
+    WorkflowExecution, WorkflowExecutionCreate, WorkflowExecutionSummary, ExecutionSteps, WorkflowBatch,
+    ComponentConfig, WorkflowConnection, ComponentType, TraceLevel
 )
 from .chat import (
     ChatSession, ChatSessionCreate,
@@ -11,10 +11,10 @@ from .chat import (
 )
 
 __all__ = [
-    "Document", "DocumentCreate", "DocumentUpdate", "DocumentResponse",
+    "Document", "DocumentCreate", "DocumentUpdate", "DocumentResponse", "DocumentSummary",
     "Workflow", "WorkflowCreate", "WorkflowUpdate",
-    "WorkflowExecution", "WorkflowExecutionCreate",
-    "ComponentConfig", "WorkflowConnection", "ComponentType",
+    "WorkflowExecution", "WorkflowExecutionCreate", "WorkflowExecutionSummary", "ExecutionSteps", "WorkflowBatch",
+    "ComponentConfig", "WorkflowConnection", "ComponentType", "TraceLevel",
     "ChatSession", "ChatSessionCreate",
     "ChatMessage", "ChatMessageCreate",
     "ChatRequest", "ChatResponse"
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from .workflow import TraceLevel
 
 class ChatMessageBase(BaseModel):
     content: str
@@ -27,6 +28,7 @@ class ChatSessionCreate(ChatSessionBase):
 class ChatSession(ChatSessionBase):
     id: int
     session_id: str
+    summary: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -37,6 +39,9 @@ class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     workflow_id: int
+    trace_level: Optional[TraceLevel] = None
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    max_parallelism: Optional[int] = Field(None, gt=0)
 
 class ChatResponse(BaseModel):
     message: str
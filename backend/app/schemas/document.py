@@ -31,6 +31,16 @@ class Document(DocumentBase):
     class Config:
         from_attributes = True
 
+class DocumentSummary(DocumentBase):
+    """Listing shape: everything but the extracted text"""
+    id: int
+    file_size: Optional[int] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class DocumentResponse(BaseModel):
     id: int
     filename: str
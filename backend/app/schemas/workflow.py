@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
@@ -10,6 +10,11 @@ class ComponentType(str, Enum):
     WEB_SEARCH = "web_search"
     OUTPUT = "output"
 
+class TraceLevel(str, Enum):
+    OFF = "off"
+    SUMMARY = "summary"
+    FULL = "full"
+
 class ComponentConfig(BaseModel):
     id: str
     type: ComponentType
@@ -27,6 +32,7 @@ class WorkflowConnection(BaseModel):
 class WorkflowBase(BaseModel):
     name: str
     description: Optional[str] = None
+    settings: Optional[Dict[str, Any]] = None  # e.g. {"trace_level": "summary"}
 
 class WorkflowCreate(WorkflowBase):
     components: List[ComponentConfig]
@@ -35,6 +41,7 @@ class WorkflowCreate(WorkflowBase):
 class WorkflowUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
+    settings: Optional[Dict[str, Any]] = None
     components: Optional[List[ComponentConfig]] = None
     connections: Optional[List[WorkflowConnection]] = None
 
@@ -54,16 +61,50 @@ class WorkflowExecutionBase(BaseModel):
     input_query: str
 
 class WorkflowExecutionCreate(WorkflowExecutionBase):
-    pass
+    trace_level: Optional[TraceLevel] = None
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    max_parallelism: Optional[int] = Field(None, gt=0)
 
-class WorkflowExecution(WorkflowExecutionBase):
+class WorkflowExecutionSummary(WorkflowExecutionBase):
     id: int
-    output_response: Optional[str] = None
-    execution_steps: Optional[List[Dict[str, Any]]] = None
     status: str
     error_message: Optional[str] = None
+    duration_ms: Optional[float] = None
+    step_count: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
     created_at: datetime
     completed_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class WorkflowExecution(WorkflowExecutionSummary):
+    output_response: Optional[str] = None
+    execution_steps: Optional[List[Dict[str, Any]]] = None
+    trace_payloads: Optional[Dict[str, str]] = None
+
+class QueuedExecution(BaseModel):
+    execution_id: int
+    status: str
+    session_id: Optional[str] = None
+    status_url: str
+    events_url: str
+
+class ExecutionSteps(BaseModel):
+    execution_id: int
+    steps: List[Dict[str, Any]]
+    trace_payloads: Dict[str, str]
+
+class WorkflowBatch(BaseModel):
+    id: str
+    workflow_id: int
+    status: str
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
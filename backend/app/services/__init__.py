@@ -1,12 +1,51 @@
 from .chroma_service import chroma_service
 from .document_processor import document_processor
 from .llm_service import llm_service, LLMProvider
-from .workflow_executor import workflow_executor
+from .search_service import search_service
+from .component_registry import component_registry
+from .workflow_executor import workflow_executor, ExecutionContext, ExecutionPlan
+from .plan_cache import plan_cache
+from .workflow_cache import workflow_cache
+from .memo_cache import memo_cache
+from .batch_runner import batch_runner
+from .chat_store import chat_store
+from .chat_memory import chat_memory
+from .retention import retention
+from .job_queue import job_queue
+from .admission import admission
+from .fair_scheduler import fair_scheduler
+from .idempotency import idempotency
+from .trace_recorder import TraceRecorder, resolve_trace_level
+from .trace_store import trace_store
+from .tracing import tracer
+from .metrics import metrics
+from .readiness import readiness
 
 __all__ = [
     "chroma_service",
     "document_processor", 
     "llm_service",
     "LLMProvider",
-    "workflow_executor"
+    "search_service",
+    "component_registry",
+    "workflow_executor",
+    "ExecutionContext",
+    "ExecutionPlan",
+    "plan_cache",
+    "workflow_cache",
+    "memo_cache",
+    "batch_runner",
+    "chat_store",
+    "chat_memory",
+    "retention",
+    "job_queue",
+    "admission",
+    "fair_scheduler",
+    "idempotency",
+    "TraceRecorder",
+    "resolve_trace_level",
+    "trace_store",
+    "tracer",
+    "metrics",
+    "readiness"
 ]
\ No newline at end of file
@@ -0,0 +1,161 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, AsyncIterator
+import asyncio
+import math
+import os
+import time
+from fastapi import HTTPException, status
+from .fair_scheduler import fair_scheduler
+from .metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, ADMISSION_QUEUE_LENGTH, ADMISSION_REJECTED, ADMISSION_WAIT
+)
+
+class _Waiter:
+    def __init__(self, workflow_id: Optional[int]):
+        self.workflow_id = workflow_id
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class AdmissionController:
+    """Bounds how many workflow runs this worker executes at once.
+
+    A run is admitted while fewer than ``limit`` runs are in flight on the
+    worker and fewer than ``workflow_limit`` on its workflow. Otherwise it
+    waits in a FIFO queue of at most ``queue_size`` for up to
+    ``queue_timeout`` seconds; anything beyond that is rejected with 429 and
+    a Retry-After estimate, so overload costs the excess requests a fast
+    error instead of costing every request its latency.
+
+    ``limit`` adapts to LLM latency with a gradient rule: it shrinks when
+    recent latency rises above the long-run baseline (the provider is
+    saturating) and grows by about its square root while latency holds, up
+    to ``max_limit``.
+    """
+
+    def __init__(self, initial_limit: Optional[int] = None, min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None, workflow_limit: Optional[int] = None,
+                 queue_size: Optional[int] = None, queue_timeout: Optional[float] = None):
+        self.enabled = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.min_limit = min_limit or int(os.getenv("ADMISSION_MIN_LIMIT", "4"))
+        # No more than the fair scheduler can run, so admitted requests never queue behind each other there
+        self.max_limit = max_limit or int(os.getenv("ADMISSION_MAX_LIMIT", str(fair_scheduler.capacity or 256)))
+        self.workflow_limit = workflow_limit or int(os.getenv("ADMISSION_WORKFLOW_LIMIT", "32"))
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else \
+            int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000")) / 1000
+        # How far recent latency may exceed the baseline before the limit shrinks
+        self.tolerance = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "1.5"))
+        self.limit = float(min(self.max_limit, initial_limit or int(os.getenv("ADMISSION_INITIAL_LIMIT", "32"))))
+        self.in_flight = 0
+        self._per_workflow: Dict[Optional[int], int] = {}
+        self._waiting: "deque[_Waiter]" = deque()
+        self._short_latency: Optional[float] = None
+        self._long_latency: Optional[float] = None
+        ADMISSION_LIMIT.set(self.limit)
+
+    @asynccontextmanager
+    async def admit(self, workflow_id: Optional[int] = None) -> AsyncIterator[None]:
+        """Hold a slot for one run; raises 429 if none frees up in time"""
+        if not self.enabled:
+            yield
+            return
+        await self._acquire(workflow_id)
+        try:
+            yield
+        finally:
+            self._release(workflow_id)
+
+    def observe_llm_latency(self, seconds: float):
+        """Feed one successful LLM call's latency into the adaptive limit"""
+        if self._short_latency is None:
+            self._short_latency = self._long_latency = seconds
+            return
+        self._short_latency = 0.8 * self._short_latency + 0.2 * seconds
+        self._long_latency = 0.99 * self._long_latency + 0.01 * seconds
+        if self._long_latency > self._short_latency:
+            # Recover the baseline quickly once a slowdown is over
+            self._long_latency = 0.9 * self._long_latency + 0.1 * self._short_latency
+
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_latency / self._short_latency))
+        if gradient == 1.0 and self.in_flight * 2 < self.limit:
+            # Latency is fine but demand is far below the limit; nothing to learn about more capacity
+            return
+        new_limit = gradient * self.limit + math.sqrt(self.limit)
+        self.limit = max(self.min_limit, min(self.max_limit, 0.8 * self.limit + 0.2 * new_limit))
+        ADMISSION_LIMIT.set(self.limit)
+        self._wake()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, for the Retry-After header"""
+        latency = self._short_latency or 1.0
+        return max(1, math.ceil(latency * (len(self._waiting) + 1) / max(1.0, self.limit)))
+
+    def _can_run(self, workflow_id: Optional[int]) -> bool:
+        return self.in_flight < int(self.limit) and \
+            self._per_workflow.get(workflow_id, 0) < self.workflow_limit
+
+    async def _acquire(self, workflow_id: Optional[int]):
+        if not self._waiting and self._can_run(workflow_id):
+            self._take(workflow_id)
+            ADMISSION_WAIT.observe(0)
+            return
+        if len(self._waiting) >= self.queue_size:
+            self._reject("queue_full")
+
+        waiter = _Waiter(workflow_id)
+        self._waiting.append(waiter)
+        # Waiters ahead may all be blocked by their workflow's cap
+        self._wake()
+        ADMISSION_QUEUE_LENGTH.set(len(self._waiting))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._reject("timeout")
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the client went away; give the slot back
+                self._release(workflow_id)
+            raise
+        finally:
+            if waiter in self._waiting:
+                self._waiting.remove(waiter)
+            ADMISSION_QUEUE_LENGTH.set(len(self._waiting))
+        ADMISSION_WAIT.observe(time.perf_counter() - start)
+
+    def _take(self, workflow_id: Optional[int]):
+        self.in_flight += 1
+        self._per_workflow[workflow_id] = self._per_workflow.get(workflow_id, 0) + 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+
+    def _release(self, workflow_id: Optional[int]):
+        self.in_flight -= 1
+        remaining = self._per_workflow.get(workflow_id, 1) - 1
+        if remaining:
+            self._per_workflow[workflow_id] = remaining
+        else:
+            self._per_workflow.pop(workflow_id, None)
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        self._wake()
+
+    def _wake(self):
+        """Admit waiters in arrival order, skipping those whose workflow is at its cap"""
+        for waiter in list(self._waiting):
+            if self.in_flight >= int(self.limit):
+                return
+            if waiter.future.done() or not self._can_run(waiter.workflow_id):
+                continue
+            self._waiting.remove(waiter)
+            self._take(waiter.workflow_id)
+            waiter.future.set_result(None)
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTED.inc(reason=reason)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Server is at capacity, retry later",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+admission = AdmissionController()
@@ -0,0 +1,219 @@
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, AsyncIterator
+import asyncio
+import csv
+import io
+import json
+import os
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import SessionLocal
+from app.models.workflow import WorkflowExecution, WorkflowExecutionTrace, WorkflowBatch
+from .workflow_executor import workflow_executor, ExecutionPlan
+from .trace_store import trace_store, execution_summary
+from .tracing import tracer
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_FLUSH_SIZE = int(os.getenv("BATCH_FLUSH_SIZE", "50"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+
+QUERY_FIELDS = ("query", "input_query", "message")
+# Result fields stored in WorkflowExecutionTrace rather than on the execution row
+TRACE_FIELDS = ("execution_steps", "trace_payloads")
+
+def parse_batch_inputs(content: bytes, filename: str) -> List[str]:
+    """Read queries from a JSONL or CSV upload.
+
+    JSONL lines may be plain strings or objects with a ``query`` (or
+    ``input_query``/``message``) field. CSV files use the first of those
+    columns present, falling back to the first column.
+    """
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith(".csv"):
+        queries = _parse_csv(text)
+    else:
+        queries = _parse_jsonl(text)
+
+    if not queries:
+        raise ValueError("No queries found in upload")
+    if len(queries) > BATCH_MAX_ITEMS:
+        raise ValueError(f"Batch exceeds the {BATCH_MAX_ITEMS} query limit")
+    return queries
+
+def _parse_jsonl(text: str) -> List[str]:
+    queries = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e.msg}")
+
+        if isinstance(item, dict):
+            item = next((item[field] for field in QUERY_FIELDS if field in item), None)
+        if not isinstance(item, str) or not item.strip():
+            raise ValueError(f"Line {line_number} has no query")
+        queries.append(item)
+    return queries
+
+def _parse_csv(text: str) -> List[str]:
+    reader = csv.reader(io.StringIO(text))
+    rows = [row for row in reader if row]
+    if not rows:
+        return []
+
+    header = [column.strip().lower() for column in rows[0]]
+    column = next((header.index(field) for field in QUERY_FIELDS if field in header), None)
+    if column is None:
+        # No recognised header: every row is data, query in the first column
+        column, data = 0, rows
+    else:
+        data = rows[1:]
+    return [row[column] for row in data if len(row) > column and row[column].strip()]
+
+class BatchRunner:
+    """Runs every query of a WorkflowBatch against one compiled plan.
+
+    Queries run with bounded concurrency and results are yielded as they
+    complete. Execution rows are inserted in bulk every ``flush_size``
+    results, so a crashed or disconnected batch resumes from its last flush:
+    indexes that already have a row are skipped on the next run.
+    """
+
+    def __init__(self, session_factory=SessionLocal, flush_size: Optional[int] = None):
+        self.session_factory = session_factory
+        self.flush_size = flush_size or BATCH_FLUSH_SIZE
+
+    async def run(self, batch_id: str, plan: ExecutionPlan,
+                  trace_level=None, timeout_seconds: Optional[float] = None,
+                  max_parallelism: Optional[int] = None, concurrency: Optional[int] = None, tenant: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        db = self.session_factory()
+        workers: List[asyncio.Task] = []
+        buffer: List[Dict[str, Any]] = []
+        batch = None
+        finished = False
+        summary: Dict[str, Any] = {}
+
+        try:
+            batch = await db.get(WorkflowBatch, batch_id)
+            done = set((await db.execute(
+                select(WorkflowExecution.batch_index).where(WorkflowExecution.batch_id == batch_id)
+            )).scalars())
+            todo = [index for index in range(batch.total) if index not in done]
+
+            batch.status = "running"
+            await db.commit()
+            yield {"event": "batch", "batch_id": batch_id, "total": batch.total, "skipped": len(done)}
+
+            indexes: asyncio.Queue = asyncio.Queue()
+            for index in todo:
+                indexes.put_nowait(index)
+            results: asyncio.Queue = asyncio.Queue()
+
+            # Plain values for the workers; commits expire the batch row's attributes
+            inputs, workflow_id = batch.inputs, batch.workflow_id
+            workers = [
+                asyncio.create_task(self._worker(batch_id, workflow_id, inputs, plan, indexes, results,
+                                                 trace_level, timeout_seconds, max_parallelism, tenant))
+                for _ in range(min(max(1, concurrency or BATCH_MAX_CONCURRENCY), len(todo)))
+            ]
+
+            for _ in todo:
+                row = await results.get()
+                buffer.append(row)
+                if len(buffer) >= self.flush_size:
+                    await self._flush(db, batch, buffer)
+
+                yield {
+                    "event": "result",
+                    "index": row["batch_index"],
+                    "input_query": row["input_query"],
+                    "status": row["status"],
+                    "output_response": row["output_response"],
+                    "error": row["error_message"]
+                }
+
+            finished = True
+        finally:
+            for worker in workers:
+                worker.cancel()
+            # A client disconnect cancels this generator's scope, so persist from a
+            # separate task that the cancellation cannot interrupt
+            summary = await asyncio.shield(asyncio.ensure_future(
+                self._finish(db, batch, list(buffer), finished)
+            ))
+
+        yield {"event": "done", "batch_id": batch_id, **summary}
+
+    async def _worker(self, batch_id: str, workflow_id: int, inputs: List[str], plan: ExecutionPlan,
+                      indexes: asyncio.Queue, results: asyncio.Queue,
+                      trace_level, timeout_seconds: Optional[float], max_parallelism: Optional[int],
+                      tenant: Optional[str]):
+        while not indexes.empty():
+            index = indexes.get_nowait()
+            query = inputs[index]
+            try:
+                result = await workflow_executor.execute_plan(
+                    plan=plan,
+                    user_query=query,
+                    workflow_id=workflow_id,
+                    trace_level=trace_level,
+                    timeout_seconds=timeout_seconds,
+                    max_parallelism=max_parallelism,
+                    tenant=tenant
+                )
+            except Exception as e:
+                result = {"status": "failed", "success": False, "error": str(e),
+                          "final_response": None, "execution_steps": [], "trace_payloads": {}}
+
+            await results.put({
+                "workflow_id": workflow_id,
+                "batch_id": batch_id,
+                "batch_index": index,
+                "input_query": query,
+                "output_response": result["final_response"],
+                "execution_steps": result["execution_steps"],
+                "trace_payloads": result["trace_payloads"],
+                "status": result["status"],
+                "error_message": None if result["success"] else result.get("error", "Unknown error"),
+                "completed_at": datetime.now(timezone.utc),
+                **execution_summary(result)
+            })
+
+    async def _finish(self, db: AsyncSession, batch: Optional[WorkflowBatch],
+                      buffer: List[Dict[str, Any]], finished: bool) -> Dict[str, Any]:
+        try:
+            if batch is None:
+                return {}
+            await self._flush(db, batch, buffer)
+            batch.status = "completed" if finished else "interrupted"
+            await db.commit()
+            return {"status": batch.status, "completed": batch.completed, "failed": batch.failed}
+        finally:
+            await db.close()
+
+    async def _flush(self, db: AsyncSession, batch: WorkflowBatch, buffer: List[Dict[str, Any]]):
+        """Insert buffered execution rows in one statement and advance the batch counters"""
+        if not buffer:
+            return
+
+        with tracer.start_span("db.bulk_insert", table="workflow_executions", rows=len(buffer)):
+            rows = [{key: value for key, value in row.items() if key not in TRACE_FIELDS} for row in buffer]
+            ids = (await db.execute(
+                insert(WorkflowExecution).returning(WorkflowExecution.id, sort_by_parameter_order=True), rows
+            )).scalars().all()
+            traces = [
+                trace_store.encode(execution_id, row["execution_steps"], row["trace_payloads"])
+                for execution_id, row in zip(ids, buffer)
+            ]
+            traces = [trace for trace in traces if trace]
+            if traces:
+                await db.execute(insert(WorkflowExecutionTrace), traces)
+            failed = sum(1 for row in buffer if row["status"] != "completed")
+            batch.completed = (batch.completed or 0) + len(buffer) - failed
+            batch.failed = (batch.failed or 0) + failed
+            await db.commit()
+        buffer.clear()
+
+batch_runner = BatchRunner()
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Optional, Tuple
+from fastapi import Request
+from .workflow_settings import parse_setting
+
+DISCONNECT_POLL_INTERVAL = 0.5
+
+async def cancel_on_disconnect(request: Request, cancel_event: asyncio.Event,
+                               poll_interval: float = DISCONNECT_POLL_INTERVAL):
+    """Set ``cancel_event`` once the client behind ``request`` goes away"""
+    while not cancel_event.is_set():
+        if await request.is_disconnected():
+            cancel_event.set()
+            return
+        await asyncio.sleep(poll_interval)
+
+def watch_disconnect(request: Request, enabled: bool = True) -> Tuple[asyncio.Event, Optional[asyncio.Task]]:
+    """Start a disconnect watcher; cancel the returned task, if any, when the request is done"""
+    cancel_event = asyncio.Event()
+    if not enabled:
+        return cancel_event, None
+    watcher = asyncio.create_task(cancel_on_disconnect(request, cancel_event))
+    return cancel_event, watcher
+
+def resolve_timeout(requested: Optional[float], settings: Optional[dict]) -> Optional[float]:
+    """Request value, then the workflow's settings, then the executor default; ValueError if the setting is not a positive number"""
+    if requested:
+        return requested
+    value = (settings or {}).get("timeout_seconds")
+    if value is None:
+        return None
+    timeout = parse_setting("timeout_seconds", value, 0.0)
+    if timeout <= 0:
+        raise ValueError(f"Invalid timeout_seconds setting {value!r}: expected a positive number")
+    return timeout
@@ -0,0 +1,237 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+import os
+import re
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import SessionLocal
+from app.models.chat import ChatSession, ChatMessage
+from .chat_store import chat_store
+from .llm_service import llm_service, LLMProvider
+from .tracing import tracer
+from .metrics import CHAT_MEMORY_TOKENS, estimate_tokens
+from .workflow_settings import parse_setting
+
+CHARS_PER_TOKEN = 4
+SPEAKERS = {"user": "User", "assistant": "Assistant"}
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation. Merge the new turns into the existing "
+    "summary. Keep names, facts, decisions and open questions; drop pleasantries. Answer with "
+    "the updated summary only, in at most {max_tokens} tokens."
+)
+
+class MemoryPolicy:
+    """How much conversation a chat session carries into each workflow run.
+
+    The last ``turns`` exchanges are passed verbatim; older ones are folded
+    into a rolling summary of at most ``summary_tokens``. Together they never
+    exceed ``token_budget``. Defaults come from the environment and can be
+    overridden per workflow with ``{"settings": {"memory": {"turns": 4}}}``.
+    ``summarizer`` is ``extractive`` (no model call) or an LLM provider name.
+    """
+
+    FIELDS = ("enabled", "turns", "token_budget", "summary_tokens", "summarizer")
+
+    def __init__(self, enabled: bool = True, turns: int = 6, token_budget: int = 1500,
+                 summary_tokens: int = 400, summarizer: str = "extractive"):
+        # The fold boundary is the oldest message of the verbatim window
+        if turns < 1:
+            raise ValueError(f"Invalid memory.turns setting {turns!r}: expected at least 1")
+        self.enabled = enabled
+        self.turns = turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+
+    @classmethod
+    def default(cls) -> "MemoryPolicy":
+        return cls(
+            enabled=os.getenv("CHAT_MEMORY_ENABLED", "true").lower() == "true",
+            turns=int(os.getenv("CHAT_MEMORY_TURNS", "6")),
+            token_budget=int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "1500")),
+            summary_tokens=int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "400")),
+            summarizer=os.getenv("CHAT_SUMMARIZER", "extractive")
+        )
+
+    def for_workflow(self, settings: Optional[Dict[str, Any]]) -> "MemoryPolicy":
+        overrides = (settings or {}).get("memory") or {}
+        if not isinstance(overrides, dict):
+            raise ValueError(f"Invalid memory setting {overrides!r}: expected an object")
+        return MemoryPolicy(**{
+            field: parse_setting(f"memory.{field}", overrides[field], getattr(self, field))
+            if field in overrides else getattr(self, field)
+            for field in self.FIELDS
+        })
+
+class ChatMemory:
+    """Bounded conversation memory for chat sessions.
+
+    ``load()`` returns the session summary plus its most recent turns, which
+    costs one indexed query of at most ``2 * turns`` rows however long the
+    session is. After each exchange ``schedule_fold()`` folds messages that
+    have left the verbatim window into ``ChatSession.summary`` in the
+    background, so each message is summarized once.
+    """
+
+    def __init__(self, session_factory=SessionLocal, policy: Optional[MemoryPolicy] = None,
+                 fold_max_messages: Optional[int] = None):
+        self.session_factory = session_factory
+        self.policy = policy or MemoryPolicy.default()
+        # Cap on messages folded per run, so a long unsummarized backlog is caught up gradually
+        self.fold_max_messages = fold_max_messages or int(os.getenv("CHAT_SUMMARY_FOLD_MAX_MESSAGES", "40"))
+        self._folding: Dict[str, asyncio.Task] = {}
+
+    def policy_for(self, settings: Optional[Dict[str, Any]]) -> MemoryPolicy:
+        return self.policy.for_workflow(settings)
+
+    async def load(self, db: AsyncSession, session_id: str, policy: MemoryPolicy) -> Optional[str]:
+        """Memory text for the next message of a session, or None if there is none"""
+        if not policy.enabled:
+            return None
+        if chat_store.has_pending(session_id):
+            # The previous exchange may still be buffered
+            await chat_store.flush()
+
+        with tracer.start_span("chat.memory.load", session_id=session_id) as span:
+            session = (await db.execute(
+                select(ChatSession.summary, ChatSession.summary_until)
+                .where(ChatSession.session_id == session_id)
+            )).first()
+
+            recent = select(ChatMessage.message_type, ChatMessage.content) \
+                .where(ChatMessage.session_id == session_id)
+            if session is not None and session.summary_until is not None:
+                recent = recent.where(ChatMessage.created_at > session.summary_until)
+            messages = (await db.execute(
+                recent.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(2 * policy.turns)
+            )).all()
+
+            memory = self._render(session.summary if session else None, list(reversed(messages)), policy)
+            tokens = estimate_tokens(memory)
+            span.set_attribute("tokens", tokens)
+        CHAT_MEMORY_TOKENS.observe(tokens)
+        return memory
+
+    def schedule_fold(self, session_id: str, policy: MemoryPolicy):
+        """Fold messages older than the verbatim window into the summary, in the background"""
+        if not policy.enabled or session_id in self._folding:
+            return
+        task = asyncio.create_task(self._fold_safely(session_id, policy))
+        self._folding[session_id] = task
+        task.add_done_callback(lambda _: self._folding.pop(session_id, None))
+
+    async def close(self):
+        """Wait for folds still running"""
+        if self._folding:
+            await asyncio.gather(*self._folding.values(), return_exceptions=True)
+
+    async def fold(self, session_id: str, policy: MemoryPolicy) -> bool:
+        """Fold one slice of the backlog into the summary; False when there was nothing to fold"""
+        async with self.session_factory() as db:
+            session = (await db.execute(
+                select(ChatSession.summary, ChatSession.summary_until)
+                .where(ChatSession.session_id == session_id)
+            )).first()
+            if session is None:
+                return False
+
+            # Oldest message that must stay verbatim
+            boundary = (await db.execute(
+                select(ChatMessage.created_at).where(ChatMessage.session_id == session_id)
+                .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+                .offset(2 * policy.turns - 1).limit(1)
+            )).scalar()
+            if boundary is None:
+                return False
+
+            backlog = select(ChatMessage.message_type, ChatMessage.content, ChatMessage.created_at).where(
+                ChatMessage.session_id == session_id, ChatMessage.created_at < boundary
+            )
+            if session.summary_until is not None:
+                backlog = backlog.where(ChatMessage.created_at > session.summary_until)
+            messages = (await db.execute(
+                backlog.order_by(ChatMessage.created_at, ChatMessage.id).limit(self.fold_max_messages)
+            )).all()
+            if not messages:
+                return False
+
+            with tracer.start_span("chat.memory.fold", session_id=session_id, messages=len(messages),
+                                   summarizer=policy.summarizer):
+                summary = await self._summarize(session.summary, messages, policy)
+
+            await db.execute(
+                update(ChatSession).where(ChatSession.session_id == session_id)
+                .values(summary=summary, summary_until=messages[-1].created_at)
+            )
+            await db.commit()
+            return True
+
+    async def _fold_safely(self, session_id: str, policy: MemoryPolicy):
+        try:
+            await self.fold(session_id, policy)
+        except Exception as e:
+            print(f"Chat memory fold error for session {session_id}: {e}")
+
+    def _render(self, summary: Optional[str], messages: List[Any], policy: MemoryPolicy) -> Optional[str]:
+        """Summary plus the newest turns that fit in the token budget"""
+        parts: List[str] = []
+        budget = policy.token_budget
+        if summary:
+            summary = self._truncate(summary, min(policy.summary_tokens, budget))
+            budget -= estimate_tokens(summary)
+
+        turns: List[str] = []
+        for message in reversed(messages):
+            line = f"{SPEAKERS.get(message.message_type, message.message_type)}: {message.content}"
+            if estimate_tokens(line) > budget:
+                if not turns and budget > 0:
+                    # Always keep part of the latest message rather than nothing
+                    turns.append(self._truncate(line, budget))
+                break
+            turns.append(line)
+            budget -= estimate_tokens(line)
+
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        parts.extend(reversed(turns))
+        return "\n".join(parts) or None
+
+    async def _summarize(self, summary: Optional[str], messages: List[Any], policy: MemoryPolicy) -> str:
+        if policy.summarizer != "extractive":
+            try:
+                return await self._summarize_with_llm(summary, messages, policy)
+            except Exception as e:
+                print(f"LLM summarization failed, using extractive summary: {e}")
+        return self._summarize_extractively(summary, messages, policy)
+
+    async def _summarize_with_llm(self, summary: Optional[str], messages: List[Any], policy: MemoryPolicy) -> str:
+        transcript = "\n".join(
+            f"{SPEAKERS.get(message.message_type, message.message_type)}: {message.content}"
+            for message in messages
+        )
+        result = await llm_service.generate_response(
+            query=f"New turns:\n{transcript}",
+            context=f"Existing summary:\n{summary}" if summary else None,
+            custom_prompt=SUMMARY_PROMPT.format(max_tokens=policy.summary_tokens),
+            provider=LLMProvider(policy.summarizer)
+        )
+        if not result["metadata"]["success"]:
+            raise RuntimeError(result["metadata"].get("error", "summarization failed"))
+        return self._truncate(result["response"].strip(), policy.summary_tokens)
+
+    def _summarize_extractively(self, summary: Optional[str], messages: List[Any], policy: MemoryPolicy) -> str:
+        """First sentence of every folded message; the oldest lines drop out once over budget"""
+        lines = summary.split("\n") if summary else []
+        for message in messages:
+            first_sentence = re.split(r"(?<=[.!?])\s", message.content.strip(), maxsplit=1)[0]
+            lines.append(f"{SPEAKERS.get(message.message_type, message.message_type)}: "
+                         f"{self._truncate(first_sentence, 50)}")
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > policy.summary_tokens:
+            lines.pop(0)
+        return self._truncate("\n".join(lines), policy.summary_tokens)
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        limit = max_tokens * CHARS_PER_TOKEN
+        return text if len(text) <= limit else text[:max(0, limit - 3)] + "..."
+
+chat_memory = ChatMemory()
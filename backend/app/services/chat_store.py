@@ -0,0 +1,152 @@
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+import asyncio
+import os
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+from app.database import SessionLocal
+from app.models.chat import ChatSession, ChatMessage
+from .tracing import tracer
+from .metrics import CHAT_WRITES_PENDING, CHAT_FLUSH_ROWS
+
+class ChatWriteBehind:
+    """Buffers chat session and message inserts and writes them in batches.
+
+    Requests enqueue rows and return without waiting on the database. A
+    background task flushes everything pending in one transaction every
+    ``interval`` seconds, or sooner once ``max_batch`` rows are waiting.
+    Readers of a session with pending rows call ``flush()`` first, so they
+    always see their own writes. ``close()`` flushes on shutdown; rows still
+    buffered when the process is killed are lost, bounded by the interval.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval: Optional[float] = None,
+                 max_batch: Optional[int] = None):
+        self.session_factory = session_factory
+        self.interval = interval if interval is not None else int(os.getenv("CHAT_FLUSH_INTERVAL_MS", "200")) / 1000
+        self.max_batch = max_batch or int(os.getenv("CHAT_FLUSH_MAX_BATCH", "100"))
+        self._sessions: List[Dict[str, Any]] = []
+        self._messages: List[Dict[str, Any]] = []
+        self._pending_sessions: Dict[str, Dict[str, Any]] = {}
+        # Session ids with rows in the flush that is currently being written
+        self._in_flight: set = set()
+        self._lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the background task and write everything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def add_session(self, session_id: str, workflow_id: int):
+        now = datetime.now(timezone.utc)
+        row = {"session_id": session_id, "workflow_id": workflow_id, "created_at": now, "updated_at": now}
+        self._sessions.append(row)
+        self._pending_sessions[session_id] = row
+        self._queued()
+
+    def add_message(self, session_id: str, message_type: str, content: str,
+                    msg_metadata: Optional[Dict[str, Any]] = None):
+        self._messages.append({
+            "session_id": session_id,
+            "message_type": message_type,
+            "content": content,
+            "msg_metadata": msg_metadata,
+            # Stamped now so history is ordered by send time, not flush time
+            "created_at": datetime.now(timezone.utc)
+        })
+        self._queued()
+
+    def pending_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """A session created by add_session that has not been written yet"""
+        return self._pending_sessions.get(session_id)
+
+    def has_pending(self, session_id: Optional[str] = None) -> bool:
+        if session_id is None:
+            return bool(self._sessions or self._messages or self._in_flight)
+        return session_id in self._pending_sessions or session_id in self._in_flight or any(
+            message["session_id"] == session_id for message in self._messages
+        )
+
+    async def flush(self):
+        """Write all buffered rows in one transaction"""
+        async with self._lock:
+            sessions, self._sessions = self._sessions, []
+            messages, self._messages = self._messages, []
+            if not sessions and not messages:
+                return
+            self._in_flight = {row["session_id"] for row in sessions + messages}
+
+            try:
+                with tracer.start_span("db.flush", sessions=len(sessions), messages=len(messages)):
+                    try:
+                        await self._write(sessions, messages)
+                    except IntegrityError:
+                        # One bad row must not block the rest of the batch forever
+                        await self._write_individually(sessions, messages)
+            except Exception:
+                # Keep the rows, ahead of anything queued meanwhile, for the next attempt
+                self._sessions[:0] = sessions
+                self._messages[:0] = messages
+                raise
+            finally:
+                self._in_flight = set()
+                CHAT_WRITES_PENDING.set(len(self._sessions) + len(self._messages))
+
+            for row in sessions:
+                self._pending_sessions.pop(row["session_id"], None)
+            CHAT_FLUSH_ROWS.observe(len(sessions) + len(messages))
+
+    async def _write(self, sessions: List[Dict[str, Any]], messages: List[Dict[str, Any]]):
+        async with self.session_factory() as db:
+            if sessions:
+                await db.execute(insert(ChatSession), sessions)
+            if messages:
+                await db.execute(insert(ChatMessage), messages)
+                # Messages are buffered in send order, so the last one per session is its latest
+                latest = {message["session_id"]: message["created_at"] for message in messages}
+                await db.execute(
+                    update(ChatSession.__table__)
+                    .where(ChatSession.__table__.c.session_id == bindparam("touched_session"))
+                    .values(updated_at=bindparam("touched_at")),
+                    [{"touched_session": session_id, "touched_at": at} for session_id, at in latest.items()]
+                )
+            await db.commit()
+
+    async def _write_individually(self, sessions: List[Dict[str, Any]], messages: List[Dict[str, Any]]):
+        rows = [([row], []) for row in sessions] + [([], [row]) for row in messages]
+        for session_rows, message_rows in rows:
+            try:
+                await self._write(session_rows, message_rows)
+            except IntegrityError as e:
+                print(f"Chat write-behind dropped a row: {e}")
+
+    def _queued(self):
+        pending = len(self._sessions) + len(self._messages)
+        CHAT_WRITES_PENDING.set(pending)
+        if pending >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Chat write-behind flush error: {e}")
+
+chat_store = ChatWriteBehind()
@@ -1,30 +1,136 @@
-import chromadb
-from chromadb.config import Settings
+import asyncio
 import os
 from typing import List, Dict, Any, Optional
 import uuid
 import hashlib
+import threading
+import time
+from .tracing import tracer
+from .metrics import VECTOR_EMBEDDING_DURATION, VECTOR_QUERY_DURATION
 
 class ChromaService:
+    """Vector store access.
+
+    chromadb is imported and the client opened on first use (or by
+    ``warm()`` during startup), so importing this module stays cheap.
+
+    ``CHROMA_MODE=persistent`` opens the store directory in this process,
+    which only one process may do. ``CHROMA_MODE=http`` talks to a single
+    Chroma server over a pooled keep-alive session instead, so any number of
+    API workers can share one store.
+    """
+
     def __init__(self):
         self.persist_directory = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
-        
+        self.mode = os.getenv("CHROMA_MODE", "persistent").lower()
+        self.host = os.getenv("CHROMA_HOST", "127.0.0.1")
+        self.port = int(os.getenv("CHROMA_PORT", "8001"))
+        self.pool_size = int(os.getenv("CHROMA_HTTP_POOL_SIZE", "16"))
+        # How long a worker trusts its copy of a shared collection's data version
+        self.version_ttl = float(os.getenv("CHROMA_VERSION_TTL_SECONDS", "1"))
+        self._client = None
+        self._client_lock = threading.Lock()
+        # Bumped on every write so memoized retrievals never outlive the data they read
+        self._data_versions: Dict[str, int] = {}
+        self._shared_versions: Dict[str, tuple] = {}
+        self._version_refreshes: Dict[str, "asyncio.Future"] = {}
+    
+    @property
+    def shared(self) -> bool:
+        """True when other processes may write the same store"""
+        return self.mode == "http"
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._connect()
+        return self._client
+    
+    @property
+    def is_connected(self) -> bool:
+        return self._client is not None
+    
+    def _connect(self):
         os.environ["ANONYMIZED_TELEMETRY"] = "False"
         os.environ["CHROMA_SERVER_AUTHN_CREDENTIALS_FILE"] = ""
         
-        try:
-            import chromadb.telemetry
-            chromadb.telemetry.Telemetry.capture = lambda *args, **kwargs: None
-        except:
-            pass
+        with tracer.start_span("vector.connect", mode=self.mode):
+            import chromadb
+            from chromadb.config import Settings
             
-        settings = Settings(
-            anonymized_telemetry=False,
-            allow_reset=True,
-            is_persistent=True
-        )
+            try:
+                import chromadb.telemetry
+                chromadb.telemetry.Telemetry.capture = lambda *args, **kwargs: None
+            except:
+                pass
+            
+            if self.shared:
+                return self._connect_http(chromadb, Settings(anonymized_telemetry=False))
+                
+            settings = Settings(
+                anonymized_telemetry=False,
+                allow_reset=True,
+                is_persistent=True
+            )
+            
+            return chromadb.PersistentClient(path=self.persist_directory, settings=settings)
+    
+    def _connect_http(self, chromadb, settings):
+        from requests.adapters import HTTPAdapter
+        
+        client = chromadb.HttpClient(host=self.host, port=str(self.port), settings=settings)
+        # Requests run from worker threads; keep that many connections alive instead of requests' default 10
+        session = getattr(getattr(client, "_server", None), "_session", None)
+        if session is not None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        return client
+    
+    def warm(self) -> Dict[str, Any]:
+        """Open the client and load the documents collection; blocking, so run it in a thread"""
+        self.client.heartbeat()
+        collection = self.get_or_create_collection("documents")
+        return {"collections": len(self.client.list_collections()), "documents": collection.count()}
         
-        self.client = chromadb.PersistentClient(path=self.persist_directory, settings=settings)
+    async def data_version(self, collection_name: str) -> Any:
+        """A value that changes whenever the collection's contents do.
+
+        Locally this counts the writes made by this process. A shared store
+        can also be written by other workers, so there the version is a
+        token kept in the collection's metadata, re-read at most every
+        ``version_ttl`` seconds in a thread; concurrent callers share one read.
+        """
+        local = self._data_versions.get(collection_name, 0)
+        if not self.shared:
+            return local
+        
+        cached = self._shared_versions.get(collection_name)
+        if cached is None or cached[1] <= time.monotonic():
+            refresh = self._version_refreshes.get(collection_name)
+            if refresh is None:
+                refresh = asyncio.ensure_future(asyncio.to_thread(self._read_version_token, collection_name))
+                self._version_refreshes[collection_name] = refresh
+                refresh.add_done_callback(lambda _: self._version_refreshes.pop(collection_name, None))
+            cached = (await asyncio.shield(refresh), time.monotonic() + self.version_ttl)
+            self._shared_versions[collection_name] = cached
+        return (local, cached[0])
+    
+    def _read_version_token(self, collection_name: str) -> Optional[str]:
+        try:
+            return (self.client.get_collection(name=collection_name).metadata or {}).get("data_version")
+        except Exception:
+            return None
+    
+    def _bump_version(self, collection_name: str, collection=None):
+        self._data_versions[collection_name] = self._data_versions.get(collection_name, 0) + 1
+        if self.shared:
+            self._shared_versions.pop(collection_name, None)
+            if collection is not None:
+                # A random token, so concurrent writers never need to read-modify-write a counter
+                collection.modify(metadata={**(collection.metadata or {}), "data_version": uuid.uuid4().hex})
         
     def simple_embedding(self, text: str) -> List[float]:
         """Simple hash-based embedding for testing (replace with proper embeddings in production)"""
@@ -58,7 +164,9 @@ class ChromaService:
         if ids is None:
             ids = [str(uuid.uuid4()) for _ in documents]
         
-        embeddings = [self.simple_embedding(doc) for doc in documents]
+        with tracer.start_span("vector.embed", texts=len(documents)) as span:
+            embeddings = [self.simple_embedding(doc) for doc in documents]
+        VECTOR_EMBEDDING_DURATION.observe(span.duration_ms / 1000, operation="add")
         
         collection.add(
             documents=documents,
@@ -66,6 +174,7 @@ class ChromaService:
             metadatas=metadatas,
             ids=ids
         )
+        self._bump_version(collection_name, collection)
         
         return ids
     
@@ -74,17 +183,21 @@ class ChromaService:
         try:
             collection = self.client.get_collection(name=collection_name)
             
-            query_embedding = self.simple_embedding(query)
+            with tracer.start_span("vector.embed", texts=1) as span:
+                query_embedding = self.simple_embedding(query)
+            VECTOR_EMBEDDING_DURATION.observe(span.duration_ms / 1000, operation="query")
             
             where_clause = None
             if workflow_id is not None:
                 where_clause = {"workflow_id": workflow_id}
             
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=where_clause
-            )
+            with tracer.start_span("vector.query", collection=collection_name, n_results=n_results) as span:
+                results = collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_results,
+                    where=where_clause
+                )
+            VECTOR_QUERY_DURATION.observe(span.duration_ms / 1000, collection=collection_name)
             
             return {
                 "documents": results["documents"][0] if results["documents"] else [],
@@ -101,10 +214,24 @@ class ChromaService:
                 "ids": []
             }
     
+    def delete_documents(self, collection_name: str, where: Dict[str, Any]) -> bool:
+        """Delete the vectors whose metadata matches ``where``"""
+        try:
+            collection = self.client.get_collection(name=collection_name)
+        except Exception:
+            # Nothing has been indexed into it yet
+            return False
+        
+        with tracer.start_span("vector.delete", collection=collection_name):
+            collection.delete(where=where)
+        self._bump_version(collection_name, collection)
+        return True
+    
     def delete_collection(self, name: str):
         """Delete a collection"""
         try:
             self.client.delete_collection(name=name)
+            self._bump_version(name)
             return True
         except Exception as e:
             print(f"Error deleting collection {name}: {e}")
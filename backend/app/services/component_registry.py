@@ -0,0 +1,89 @@
+from typing import Dict, Any, List, Callable, Awaitable, Optional, Tuple
+import json
+from app.schemas.workflow import ComponentType, ComponentConfig
+from .http_cache import make_etag
+
+ComponentExecutor = Callable[[ComponentConfig, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+DataVersion = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+class ComponentSpec:
+    """Everything the API and executor need to know about one component type"""
+
+    def __init__(self, type: ComponentType, label: str, description: str,
+                 inputs: List[str], outputs: List[str], config_schema: Dict[str, Any],
+                 icon: str, color: str, executor: ComponentExecutor,
+                 timeout_seconds: Optional[float] = None, deterministic: bool = False,
+                 data_version: Optional[DataVersion] = None):
+        self.type = type
+        self.label = label
+        self.description = description
+        self.inputs = inputs
+        self.outputs = outputs
+        self.config_schema = config_schema
+        self.icon = icon
+        self.color = color
+        self.executor = executor
+        self.timeout_seconds = timeout_seconds
+        self.deterministic = deterministic
+        self.data_version = data_version
+
+    def definition(self) -> Dict[str, Any]:
+        """Public definition served by the /components API"""
+        return {
+            "type": self.type,
+            "label": self.label,
+            "description": self.description,
+            "inputs": self.inputs,
+            "outputs": self.outputs,
+            "config_schema": self.config_schema,
+            "icon": self.icon,
+            "color": self.color
+        }
+
+class ComponentRegistry:
+    def __init__(self):
+        self._specs: Dict[ComponentType, ComponentSpec] = {}
+        # (etag, body) for GET /components/, rebuilt after any registration
+        self._definitions_response: Optional[Tuple[str, bytes]] = None
+
+    def register(self, type: ComponentType, *, label: str, description: str,
+                 inputs: List[str], outputs: List[str], config_schema: Dict[str, Any],
+                 icon: str, color: str, timeout_seconds: Optional[float] = None,
+                 deterministic: bool = False, data_version: Optional[DataVersion] = None):
+        """Decorator registering an async executor together with its definition.
+
+        ``timeout_seconds`` is the default time budget for one execution of
+        the component; a ``timeout_seconds`` key in the component's config
+        overrides it.
+
+        ``deterministic`` components return the same output for the same
+        config and ``inputs``, so the executor memoizes them. If the output
+        also depends on stored data, the coroutine ``data_version(config)``
+        must return a value that changes whenever that data does.
+        """
+        def decorator(executor: ComponentExecutor) -> ComponentExecutor:
+            self._specs[type] = ComponentSpec(
+                type=type, label=label, description=description,
+                inputs=inputs, outputs=outputs, config_schema=config_schema,
+                icon=icon, color=color, executor=executor,
+                timeout_seconds=timeout_seconds, deterministic=deterministic,
+                data_version=data_version
+            )
+            self._definitions_response = None
+            return executor
+        return decorator
+
+    def get(self, type: ComponentType) -> Optional[ComponentSpec]:
+        return self._specs.get(type)
+
+    def definitions(self) -> List[Dict[str, Any]]:
+        return [spec.definition() for spec in self._specs.values()]
+
+    def definitions_response(self) -> Tuple[str, bytes]:
+        """(etag, serialized body) of definitions(); it only changes when a component registers"""
+        if self._definitions_response is None:
+            body = json.dumps(self.definitions(), default=str).encode("utf-8")
+            self._definitions_response = (make_etag("components", body.decode("utf-8")), body)
+        return self._definitions_response
+
+component_registry = ComponentRegistry()
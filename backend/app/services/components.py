@@ -0,0 +1,320 @@
+import asyncio
+import os
+from typing import Dict, Any
+from .llm_service import llm_service, LLMProvider
+from .chroma_service import chroma_service
+from .search_service import search_service
+from .component_registry import component_registry
+from app.schemas.workflow import ComponentType, ComponentConfig
+
+@component_registry.register(
+    ComponentType.USER_QUERY,
+    label="User Query",
+    description="Accepts user queries and serves as the entry point for the workflow",
+    inputs=[],
+    outputs=["query"],
+    config_schema={
+        "type": "object",
+        "properties": {
+            "placeholder": {
+                "type": "string",
+                "title": "Placeholder Text",
+                "default": "Enter your question..."
+            }
+        }
+    },
+    icon="search",
+    color="#3B82F6"
+)
+async def execute_user_query_component(component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute user query component"""
+    return {
+        "success": True,
+        "query": current_data.get("query", ""),
+        "component_output": "Query received and processed"
+    }
+
+@component_registry.register(
+    ComponentType.KNOWLEDGE_BASE,
+    label="Knowledge Base",
+    description="Retrieves relevant context from uploaded documents using vector search",
+    inputs=["query"],
+    outputs=["context", "retrieved_documents"],
+    config_schema={
+        "type": "object",
+        "properties": {
+            "collection_name": {
+                "type": "string",
+                "title": "Collection Name",
+                "default": "documents"
+            },
+            "max_results": {
+                "type": "integer",
+                "title": "Max Results",
+                "default": 3,  # Reduced for free tier
+                "minimum": 1,
+                "maximum": 10  # Limited for free tier
+            },
+            "similarity_threshold": {
+                "type": "number",
+                "title": "Similarity Threshold",
+                "default": 0.7,
+                "minimum": 0.0,
+                "maximum": 1.0
+            },
+            "memoize": {
+                "type": "boolean",
+                "title": "Reuse Recent Results",
+                "description": "Reuse retrieval results for the same query until documents change",
+                "default": True
+            }
+        }
+    },
+    icon="book",
+    color="#10B981",
+    timeout_seconds=float(os.getenv("KNOWLEDGE_BASE_TIMEOUT", "10")),
+    deterministic=True,
+    data_version=lambda config: chroma_service.data_version(config.get("collection_name", "documents"))
+)
+async def execute_knowledge_base_component(component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute knowledge base component"""
+    try:
+        query = current_data.get("query", "")
+        workflow_id = current_data.get("workflow_id")
+        config = component.data
+
+        collection_name = config.get("collection_name", "documents")
+        max_results = config.get("max_results", 3)
+
+        # Chroma is synchronous; run it off the event loop so sibling branches keep going
+        results = await asyncio.to_thread(
+            chroma_service.query_documents,
+            collection_name=collection_name,
+            query=query,
+            n_results=max_results,
+            workflow_id=workflow_id
+        )
+
+        context = "\n\n".join(results["documents"])
+
+        return {
+            "success": True,
+            "context": context,
+            "retrieved_documents": len(results["documents"]),
+            "component_output": f"Retrieved {len(results['documents'])} relevant documents for workflow {workflow_id if workflow_id else 'all'}"
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Knowledge base component error: {str(e)}",
+            "context": ""
+        }
+
+@component_registry.register(
+    ComponentType.LLM_ENGINE,
+    label="LLM Engine",
+    description="Generates responses using language models like OpenAI GPT or Google Gemini",
+    inputs=["query", "context", "history"],
+    outputs=["response"],
+    config_schema={
+        "type": "object",
+        "properties": {
+            "provider": {
+                "type": "string",
+                "title": "LLM Provider",
+                "enum": ["openai", "gemini", "mock"],
+                "default": "gemini"
+            },
+            "model": {
+                "type": "string",
+                "title": "Model",
+                "default": "gemini-1.5-flash"
+            },
+            "custom_prompt": {
+                "type": "string",
+                "title": "Custom Prompt",
+                "default": "You are a helpful AI assistant. Answer the user's question based on the provided context and your knowledge."
+            },
+            "use_web_search": {
+                "type": "boolean",
+                "title": "Use Web Search",
+                "description": "Prefer connecting a Web Search component, which runs in parallel with the knowledge base",
+                "default": False
+            },
+            "temperature": {
+                "type": "number",
+                "title": "Temperature",
+                "default": 0.7,
+                "minimum": 0.0,
+                "maximum": 2.0
+            },
+            "max_tokens": {
+                "type": "integer",
+                "title": "Max Tokens",
+                "default": 500,
+                "minimum": 1,
+                "maximum": 1000
+            }
+        }
+    },
+    icon="bot",
+    color="#8B5CF6",
+    timeout_seconds=float(os.getenv("LLM_TIMEOUT", "60"))
+)
+async def execute_llm_engine_component(component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute LLM engine component"""
+    try:
+        query = current_data.get("query", "")
+        context = current_data.get("context", "")
+        history = current_data.get("history")
+        config = component.data
+
+        # Get configuration with smart provider detection
+        provider_name = config.get("provider")
+        model = config.get("model")
+
+        # Auto-detect provider if not specified
+        if not provider_name and model:
+            if model.lower().startswith("mock"):
+                provider_name = "mock"
+            elif "gemini" in model.lower() or "bard" in model.lower():
+                provider_name = "gemini"
+            elif "gpt" in model.lower() or "davinci" in model.lower() or "curie" in model.lower():
+                provider_name = "openai"
+            else:
+                provider_name = "gemini"  # Default to free Gemini
+        elif not provider_name:
+            provider_name = "gemini"  # Default to free Gemini
+
+        provider = LLMProvider(provider_name)
+        custom_prompt = config.get("custom_prompt")
+        use_web_search = config.get("use_web_search", False)
+
+        # Generate response
+        llm_result = await llm_service.generate_response(
+            query=query,
+            context=context if context else None,
+            custom_prompt=custom_prompt,
+            provider=provider,
+            model=model,
+            use_web_search=use_web_search,
+            history=history
+        )
+
+        return {
+            "success": llm_result["metadata"]["success"],
+            "response": llm_result["response"],
+            "llm_metadata": llm_result["metadata"],
+            "component_output": "LLM response generated"
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"LLM engine component error: {str(e)}",
+            "response": f"Error: {str(e)}"
+        }
+
+@component_registry.register(
+    ComponentType.WEB_SEARCH,
+    label="Web Search",
+    description="Searches the web for real-time information using Google or Bing",
+    inputs=["query"],
+    outputs=["search_results", "context"],
+    config_schema={
+        "type": "object",
+        "properties": {
+            "search_engine": {
+                "type": "string",
+                "title": "Search Engine",
+                "enum": ["google", "bing"],
+                "default": "google"
+            },
+            "max_results": {
+                "type": "integer",
+                "title": "Max Results",
+                "default": 3,
+                "minimum": 1,
+                "maximum": 10
+            },
+            "search_type": {
+                "type": "string",
+                "title": "Search Type",
+                "enum": ["general", "news", "academic"],
+                "default": "general"
+            }
+        }
+    },
+    icon="globe",
+    color="#06B6D4",
+    timeout_seconds=float(os.getenv("WEB_SEARCH_TIMEOUT", "10"))
+)
+async def execute_web_search_component(component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute web search component"""
+    if not search_service.is_configured:
+        return {
+            "success": True,
+            "search_results": [],
+            "component_output": "Web search skipped: SERPAPI_KEY not configured"
+        }
+
+    try:
+        query = current_data.get("query", "")
+        config = component.data
+
+        results = await search_service.search(
+            query=query,
+            max_results=config.get("max_results", 3),
+            search_type=config.get("search_type", "general"),
+            search_engine=config.get("search_engine", "google")
+        )
+
+        return {
+            "success": True,
+            "search_results": results,
+            "context": search_service.format_results(results) or "",
+            "component_output": f"Found {len(results)} web results"
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Web search component error: {str(e)}",
+            "search_results": []
+        }
+
+@component_registry.register(
+    ComponentType.OUTPUT,
+    label="Output",
+    description="Displays the final response in a chat interface",
+    inputs=["response"],
+    outputs=[],
+    config_schema={
+        "type": "object",
+        "properties": {
+            "format": {
+                "type": "string",
+                "title": "Output Format",
+                "enum": ["text", "markdown", "json"],
+                "default": "text"
+            },
+            "show_metadata": {
+                "type": "boolean",
+                "title": "Show Metadata",
+                "default": False
+            }
+        }
+    },
+    icon="message",
+    color="#F59E0B"
+)
+async def execute_output_component(component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute output component"""
+    response = current_data.get("response", "No response available")
+
+    return {
+        "success": True,
+        "final_response": response,
+        "component_output": "Response formatted for output"
+    }
@@ -1,10 +1,11 @@
-import fitz  # PyMuPDF
 import os
 from typing import List, Dict, Any
 import mimetypes
 from pathlib import Path
 import aiofiles
 from .chroma_service import chroma_service
+from .tracing import tracer
+from .metrics import DOCUMENT_INGEST_DURATION, DOCUMENT_INGEST_BYTES, DOCUMENT_INGEST_CHUNKS
 
 class DocumentProcessor:
     def __init__(self):
@@ -24,10 +25,14 @@ class DocumentProcessor:
         
         text_content = ""
         
-        if content_type == 'application/pdf':
-            text_content = await self._extract_pdf_text(file_path)
-        elif content_type in ['text/plain', 'text/markdown']:
-            text_content = await self._extract_text_content(file_path)
+        with tracer.start_span("document.extract", content_type=content_type) as span:
+            if content_type == 'application/pdf':
+                text_content = await self._extract_pdf_text(file_path)
+            elif content_type in ['text/plain', 'text/markdown']:
+                text_content = await self._extract_text_content(file_path)
+        
+        DOCUMENT_INGEST_DURATION.observe(span.duration_ms / 1000, stage="extract")
+        DOCUMENT_INGEST_BYTES.inc(len(text_content.encode("utf-8")), content_type=content_type)
         
         return {
             "text_content": text_content,
@@ -38,6 +43,8 @@ class DocumentProcessor:
     
     async def _extract_pdf_text(self, file_path: str) -> str:
         """Extract text from PDF using PyMuPDF"""
+        import fitz  # PyMuPDF; slow to import, so only loaded once a PDF arrives
+        
         text_content = ""
         
         try:
@@ -93,12 +100,16 @@ class DocumentProcessor:
             chunk_metadatas.append(chunk_metadata)
             chunk_ids.append(f"doc_{document_id}_chunk_{i}")
         
-        chroma_service.add_documents(
-            collection_name=collection_name,
-            documents=chunks,
-            metadatas=chunk_metadatas,
-            ids=chunk_ids
-        )
+        with tracer.start_span("document.index", chunks=len(chunks)) as span:
+            chroma_service.add_documents(
+                collection_name=collection_name,
+                documents=chunks,
+                metadatas=chunk_metadatas,
+                ids=chunk_ids
+            )
+        
+        DOCUMENT_INGEST_DURATION.observe(span.duration_ms / 1000, stage="index")
+        DOCUMENT_INGEST_CHUNKS.inc(len(chunks))
         
         return len(chunks)
 
@@ -0,0 +1,138 @@
+from typing import Dict, Any, Optional, Set
+import asyncio
+import os
+import socket
+import time
+import uuid
+from app.models.workflow import WorkflowExecution
+from .job_queue import job_queue, JobQueue
+from .workflow_executor import workflow_executor, resolve_max_parallelism
+from .workflow_cache import workflow_cache
+from .plan_cache import plan_cache
+from .chat_memory import chat_memory
+from .trace_recorder import resolve_trace_level
+from .cancellation import resolve_timeout
+from .tracing import tracer
+
+class ExecutionWorker:
+    """Claims jobs from the queue and runs them, up to ``concurrency`` at a time.
+
+    Each running job renews its lease every third of the lease period; if a
+    renewal finds the job taken over, the run is cancelled and its result
+    dropped. ``run()`` returns once ``stop`` is set and in-flight jobs have
+    drained, or after ``drain_seconds``, when unfinished jobs are released
+    for another worker instead of waiting out their leases.
+    """
+
+    def __init__(self, queue: JobQueue = job_queue, concurrency: Optional[int] = None,
+                 poll_interval: Optional[float] = None, drain_seconds: Optional[float] = None):
+        self.queue = queue
+        self.concurrency = concurrency or int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+        self.poll_interval = poll_interval if poll_interval is not None else \
+            int(os.getenv("JOB_POLL_INTERVAL_MS", "500")) / 1000
+        self.drain_seconds = drain_seconds if drain_seconds is not None else \
+            float(os.getenv("JOB_DRAIN_SECONDS", "30"))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running: Set[asyncio.Task] = set()
+
+    async def run(self, stop: asyncio.Event):
+        maintained_at = 0.0
+        while not stop.is_set():
+            if time.monotonic() - maintained_at >= self.queue.lease_seconds / 3:
+                await self._maintain()
+                maintained_at = time.monotonic()
+
+            job = await self._claim() if len(self._running) < self.concurrency else None
+            if job is not None:
+                task = asyncio.create_task(self._process(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+                continue
+
+            # Idle or full: wake on the next poll, a finished job or shutdown
+            waiters = [asyncio.create_task(stop.wait()), *self._running]
+            await asyncio.wait(waiters, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            waiters[0].cancel()
+
+        await self._drain()
+
+    async def _claim(self):
+        try:
+            return await self.queue.claim(self.worker_id)
+        except Exception as e:
+            print(f"Execution worker could not claim a job: {e}")
+            return None
+
+    async def _maintain(self):
+        try:
+            await self.queue.abandon_expired()
+            await self.queue.record_depth()
+        except Exception as e:
+            print(f"Execution worker maintenance error: {e}")
+
+    async def _drain(self):
+        if self._running:
+            _, pending = await asyncio.wait(set(self._running), timeout=self.drain_seconds)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await chat_memory.close()
+
+    async def _process(self, job: Any):
+        cancel_event = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat(job, cancel_event))
+        try:
+            with tracer.start_span("job.run", execution_id=job.execution_id, kind=job.kind, attempt=job.attempts):
+                result, retryable = await self._execute(job, cancel_event)
+            outcome = await self.queue.finish(job, self.worker_id, result, retryable)
+            workflow = workflow_cache.peek(job.workflow_id)
+            if job.kind == "chat" and outcome == "completed" and workflow is not None:
+                # The reply is committed now, so it can count towards the summary
+                chat_memory.schedule_fold(job.payload["session_id"], chat_memory.policy_for(workflow.settings))
+        except asyncio.CancelledError:
+            await asyncio.shield(self.queue.release(job, self.worker_id))
+            raise
+        except Exception as e:
+            print(f"Execution worker error on execution {job.execution_id}: {e}")
+            await self.queue.finish(job, self.worker_id, self._failure(str(e)))
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: Any, cancel_event: asyncio.Event):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                owned = await self.queue.renew(job, self.worker_id)
+            except Exception as e:
+                print(f"Execution worker could not renew the lease of execution {job.execution_id}: {e}")
+                continue
+            if not owned:
+                cancel_event.set()
+                return
+
+    async def _execute(self, job: Any, cancel_event: asyncio.Event):
+        """The executor result and whether a failure may be retried"""
+        payload: Dict[str, Any] = job.payload or {}
+        async with self.queue.session_factory() as db:
+            workflow = await workflow_cache.get(db, job.workflow_id)
+            execution = await db.get(WorkflowExecution, job.execution_id)
+        if workflow is None or execution is None:
+            return self._failure("Workflow not found"), False
+        if not workflow.is_valid:
+            return self._failure("Workflow is not valid"), False
+
+        return await workflow_executor.execute_plan(
+            plan=plan_cache.get_plan(workflow),
+            user_query=execution.input_query,
+            workflow_id=job.workflow_id if job.kind == "chat" else None,
+            trace_level=resolve_trace_level(payload.get("trace_level"), workflow.settings),
+            timeout_seconds=resolve_timeout(payload.get("timeout_seconds"), workflow.settings),
+            max_parallelism=resolve_max_parallelism(payload.get("max_parallelism"), workflow.settings),
+            cancel_event=cancel_event,
+            history=payload.get("history"),
+            tenant=payload.get("tenant")
+        ), True
+
+    def _failure(self, error: str) -> Dict[str, Any]:
+        return {"status": "failed", "success": False, "error": error,
+                "final_response": None, "execution_steps": [], "trace_payloads": {}}
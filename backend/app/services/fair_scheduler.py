@@ -0,0 +1,166 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, AsyncIterator
+import asyncio
+import os
+import time
+from fastapi import Request
+from .metrics import SCHEDULER_IN_FLIGHT, SCHEDULER_QUEUE_LENGTH, SCHEDULER_WAIT
+
+TENANT_HEADER = os.getenv("FAIR_TENANT_HEADER", "X-Tenant-ID")
+
+def resolve_tenant(request: Optional[Request], workflow_id: Optional[int]) -> str:
+    """The tenant header if the client sent one, otherwise the workflow"""
+    tenant = request.headers.get(TENANT_HEADER) if request is not None else None
+    return tenant or f"workflow:{workflow_id}"
+
+def _parse_map(value: str) -> Dict[str, float]:
+    """``"acme=4,workflow:7=0.5"`` -> ``{"acme": 4.0, "workflow:7": 0.5}``"""
+    entries = {}
+    for item in value.split(","):
+        name, _, number = item.strip().rpartition("=")
+        if name:
+            entries[name] = float(number)
+    return entries
+
+class _Tenant:
+    def __init__(self, weight: float, max_in_flight: int):
+        self.weight = weight
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        # (start tag, future) in arrival order
+        self.waiting: "deque[tuple]" = deque()
+        self.last_tag = 0.0
+
+class FairScheduler:
+    """Shares ``capacity`` execution slots between tenants by weighted fair queuing.
+
+    While slots are free every run starts at once. When they are all taken,
+    each tenant queues on its own and every waiting run gets a virtual start
+    tag: its tenant's previous tag plus ``1 / weight``, but never behind the
+    scheduler's virtual clock. A freed slot goes to the lowest tag. A tenant
+    that keeps hundreds of runs queued therefore gets its weighted share of
+    slots, while a tenant with one waiting run is served next instead of
+    after the backlog. ``max_in_flight`` additionally caps single tenants.
+
+    Queuing alone still makes a newcomer wait for one of a busy tenant's
+    runs to finish, so by default no tenant may hold more than three
+    quarters of the slots: the rest stay free for other tenants' runs to
+    start at once, at the cost of a lone saturating tenant leaving them idle.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, default_weight: Optional[float] = None,
+                 default_max_in_flight: Optional[int] = None, weights: Optional[Dict[str, float]] = None,
+                 limits: Optional[Dict[str, float]] = None):
+        self.capacity = capacity if capacity is not None else int(os.getenv("FAIR_SCHEDULER_CAPACITY", "32"))
+        self.default_weight = default_weight or float(os.getenv("FAIR_DEFAULT_WEIGHT", "1"))
+        # 0 lets one tenant use every slot nobody else is waiting for
+        self.default_max_in_flight = default_max_in_flight if default_max_in_flight is not None else \
+            int(os.getenv("FAIR_TENANT_MAX_IN_FLIGHT", str(self.capacity - self.capacity // 4)))
+        self.weights = weights if weights is not None else _parse_map(os.getenv("FAIR_TENANT_WEIGHTS", ""))
+        self.limits = limits if limits is not None else _parse_map(os.getenv("FAIR_TENANT_LIMITS", ""))
+        self.in_flight = 0
+        self.virtual_time = 0.0
+        self._tenants: Dict[str, _Tenant] = {}
+        self._waiting = 0
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Run the body in one of the scheduler's slots; 0 capacity disables scheduling.
+
+        Raises ``asyncio.TimeoutError`` if no slot is granted within ``timeout`` seconds.
+        """
+        if self.capacity <= 0:
+            yield
+            return
+        await self._acquire(tenant, timeout)
+        try:
+            yield
+        finally:
+            self._release(tenant)
+
+    def _tenant(self, name: str) -> _Tenant:
+        tenant = self._tenants.get(name)
+        if tenant is None:
+            max_in_flight = int(self.limits.get(name, self.default_max_in_flight)) or self.capacity
+            tenant = _Tenant(self.weights.get(name, self.default_weight), max_in_flight)
+            self._tenants[name] = tenant
+        return tenant
+
+    def _can_take(self, tenant: _Tenant) -> bool:
+        return self.in_flight < self.capacity and tenant.in_flight < tenant.max_in_flight
+
+    async def _acquire(self, name: str, timeout: Optional[float]):
+        tenant = self._tenant(name)
+        if not self._waiting and self._can_take(tenant):
+            self._take(tenant)
+            SCHEDULER_WAIT.observe(0)
+            return
+
+        start_tag = max(self.virtual_time, tenant.last_tag)
+        tenant.last_tag = start_tag + 1 / tenant.weight
+        entry = (start_tag, asyncio.get_running_loop().create_future())
+        tenant.waiting.append(entry)
+        self._waiting += 1
+        self._dispatch()
+        SCHEDULER_QUEUE_LENGTH.set(self._waiting)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(entry[1]), timeout)
+        except asyncio.TimeoutError:
+            if not entry[1].done():
+                self._abandon(name, tenant, entry)
+                raise
+        except asyncio.CancelledError:
+            if entry[1].done():
+                # Granted just as the caller gave up; pass the slot on
+                self._release(name)
+            else:
+                self._abandon(name, tenant, entry)
+            raise
+        SCHEDULER_WAIT.observe(time.perf_counter() - started)
+
+    def _abandon(self, name: str, tenant: _Tenant, entry: tuple):
+        if tenant.waiting[-1] is entry:
+            # Give back the virtual time of a run that never started
+            tenant.last_tag = entry[0]
+        tenant.waiting.remove(entry)
+        self._waiting -= 1
+        entry[1].cancel()
+        self._forget(name, tenant)
+        SCHEDULER_QUEUE_LENGTH.set(self._waiting)
+
+    def _take(self, tenant: _Tenant):
+        self.in_flight += 1
+        tenant.in_flight += 1
+        SCHEDULER_IN_FLIGHT.set(self.in_flight)
+
+    def _release(self, name: str):
+        tenant = self._tenants[name]
+        self.in_flight -= 1
+        tenant.in_flight -= 1
+        SCHEDULER_IN_FLIGHT.set(self.in_flight)
+        self._dispatch()
+        self._forget(name, tenant)
+
+    def _dispatch(self):
+        """Hand free slots to the waiting runs with the lowest start tags"""
+        while self.in_flight < self.capacity:
+            eligible = [tenant for tenant in self._tenants.values() if tenant.waiting and self._can_take(tenant)]
+            if not eligible:
+                break
+            tenant = min(eligible, key=lambda candidate: candidate.waiting[0][0])
+            start_tag, future = tenant.waiting.popleft()
+            self._waiting -= 1
+            self.virtual_time = max(self.virtual_time, start_tag)
+            self._take(tenant)
+            future.set_result(None)
+        SCHEDULER_QUEUE_LENGTH.set(self._waiting)
+
+    def _forget(self, name: str, tenant: _Tenant):
+        """Drop idle tenants so that per-tenant state stays bounded; one returning restarts at the virtual time"""
+        if not tenant.in_flight and not tenant.waiting:
+            self._tenants.pop(name, None)
+
+fair_scheduler = FairScheduler()
@@ -0,0 +1,24 @@
+from typing import Optional
+import hashlib
+from fastapi import Request, Response, status
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the given version parts"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match names this ETag (weak comparison)"""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in [value[2:] if value.startswith("W/") else value for value in candidates]
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+def json_with_etag(body: bytes, etag: str) -> Response:
+    """Pre-serialized JSON body with its validator; clients must revalidate before reuse"""
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag, "Cache-Control": "no-cache"})
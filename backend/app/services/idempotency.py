@@ -0,0 +1,203 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from app.database import SessionLocal
+from app.models.idempotency import IdempotencyKey
+from .metrics import IDEMPOTENCY_REQUESTS
+
+# Response headers worth replaying; the rest are recomputed for the replay
+REPLAYED_HEADERS = ("location",)
+
+class IdempotentRequest:
+    """A request's hold on its Idempotency-Key: either the claim to run it or the response to replay"""
+
+    def __init__(self, key: str, owner: Optional[str] = None, replay: Optional[Response] = None):
+        self.key = key
+        self.owner = owner
+        self.replay = replay
+        self.completed = False
+
+async def json_body(request: Request) -> Any:
+    """The request's JSON body, or None if it has none or it does not parse.
+
+    Dependencies read it this way instead of declaring the body model, which
+    would make FastAPI validate the body twice and report each error twice.
+    """
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+class IdempotencyStore:
+    """Runs each request sent with an ``Idempotency-Key`` header at most once.
+
+    The first request with a key inserts an ``in_progress`` row and runs.
+    Its response is stored when it succeeds; an error releases the key so a
+    retry runs again. A retry that arrives while the first request is still
+    running waits up to ``wait_seconds`` for it to finish and then gets the
+    same response; one that arrives afterwards gets the stored response at
+    once, without running the workflow again. Keys are scoped per endpoint
+    and tenant, a key reused with a different body is rejected with 422, and stored
+    responses are forgotten ``ttl`` seconds after they were recorded.
+
+    An in-progress key that is not completed within ``lock_seconds``
+    belongs to a worker that died, and the next retry takes it over.
+    """
+
+    def __init__(self, session_factory=SessionLocal, ttl: Optional[float] = None,
+                 wait_seconds: Optional[float] = None, lock_seconds: Optional[float] = None):
+        self.session_factory = session_factory
+        self.header = os.getenv("IDEMPOTENCY_HEADER", "Idempotency-Key")
+        self.ttl = ttl or float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        self.wait_seconds = wait_seconds if wait_seconds is not None else \
+            float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+        self.lock_seconds = lock_seconds or float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "300"))
+        self.poll_interval = int(os.getenv("IDEMPOTENCY_POLL_MS", "250")) / 1000
+        # Wakes retries waiting in this process as soon as the key settles
+        self._settled: Dict[str, asyncio.Event] = {}
+        # Retries currently waiting on each event; the last one out drops an event nobody set
+        self._waiters: Dict[str, int] = {}
+
+    async def begin(self, request: Request, scope: str, body: Any) -> Optional[IdempotentRequest]:
+        """Claim the request's key, or wait for and return the original's response; None without a key"""
+        client_key = request.headers.get(self.header)
+        if not client_key:
+            return None
+
+        key = hashlib.sha256(f"{scope}\n{client_key}".encode("utf-8")).hexdigest()
+        fingerprint = hashlib.sha256(
+            json.dumps(jsonable_encoder(body), sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        deadline = time.monotonic() + self.wait_seconds
+        return await self._settle(key, fingerprint, deadline)
+
+    async def _settle(self, key: str, fingerprint: str, deadline: float) -> IdempotentRequest:
+        waited = False
+        while True:
+            owner = await self._claim(key, fingerprint)
+            if owner is not None:
+                IDEMPOTENCY_REQUESTS.inc(outcome="new")
+                return IdempotentRequest(key, owner=owner)
+
+            async with self.session_factory() as db:
+                row = await db.get(IdempotencyKey, key)
+            if row is None:
+                # Released by a failed original between the insert and this read
+                continue
+            if row.request_hash != fingerprint:
+                IDEMPOTENCY_REQUESTS.inc(outcome="mismatch")
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"{self.header} was already used for a different request"
+                )
+            if row.status == "completed":
+                IDEMPOTENCY_REQUESTS.inc(outcome="attached" if waited else "replayed")
+                return IdempotentRequest(key, replay=self._replay(row))
+            if time.monotonic() >= deadline:
+                IDEMPOTENCY_REQUESTS.inc(outcome="in_progress")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this key is still in progress",
+                    headers={"Retry-After": "1"}
+                )
+            waited = True
+            await self._wait(key, deadline)
+
+    async def complete(self, claim: Optional[IdempotentRequest], response: Any) -> Any:
+        """Store the response of a claimed request for its retries and return it unchanged"""
+        if claim is None or claim.owner is None:
+            return response
+        if isinstance(response, Response):
+            status_code = response.status_code
+            body = json.loads(response.body)
+            headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+        else:
+            status_code, body, headers = status.HTTP_200_OK, jsonable_encoder(response), {}
+
+        async with self.session_factory() as db:
+            await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == claim.key, IdempotencyKey.owner == claim.owner)
+                .values(status="completed", locked_until=None, response_status=status_code,
+                        response_body=body, response_headers=headers,
+                        expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.ttl))
+            )
+            await db.commit()
+        claim.completed = True
+        self._notify(claim.key)
+        return response
+
+    async def release(self, claim: Optional[IdempotentRequest]):
+        """Forget a claimed key whose request failed, so a retry runs it again"""
+        if claim is None or claim.owner is None or claim.completed:
+            return
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key == claim.key, IdempotencyKey.owner == claim.owner)
+            )
+            await db.commit()
+        self._notify(claim.key)
+
+    async def _claim(self, key: str, fingerprint: str) -> Optional[str]:
+        """Insert the key, or take over an expired or abandoned one; the claim token, or None if it is held"""
+        now = datetime.now(timezone.utc)
+        owner = uuid.uuid4().hex
+        values = dict(request_hash=fingerprint, status="in_progress", owner=owner,
+                      locked_until=now + timedelta(seconds=self.lock_seconds),
+                      response_status=None, response_body=None, response_headers=None,
+                      expires_at=now + timedelta(seconds=self.ttl))
+        async with self.session_factory() as db:
+            db.add(IdempotencyKey(key=key, **values))
+            try:
+                await db.commit()
+                return owner
+            except IntegrityError:
+                await db.rollback()
+
+            result = await db.execute(
+                update(IdempotencyKey).where(
+                    IdempotencyKey.key == key,
+                    or_(IdempotencyKey.expires_at < now,
+                        and_(IdempotencyKey.status == "in_progress", IdempotencyKey.locked_until < now))
+                ).values(**values)
+            )
+            await db.commit()
+        return owner if result.rowcount == 1 else None
+
+    async def _wait(self, key: str, deadline: float):
+        """Until the key settles in this process or the next poll for one settled elsewhere"""
+        event = self._settled.setdefault(key, asyncio.Event())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        timeout = max(0.0, min(self.poll_interval, deadline - time.monotonic()))
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if self._settled.get(key) is event:
+                    # Settled in another process, or not yet; the next wait starts a fresh event
+                    del self._settled[key]
+
+    def _notify(self, key: str):
+        event = self._settled.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def _replay(self, row: IdempotencyKey) -> JSONResponse:
+        return JSONResponse(row.response_body, status_code=row.response_status,
+                            headers={**(row.response_headers or {}), "Idempotent-Replayed": "true"})
+
+idempotency = IdempotencyStore()
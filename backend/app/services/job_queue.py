@@ -0,0 +1,271 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, AsyncIterator
+import asyncio
+import os
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import SessionLocal
+from app.models.workflow import WorkflowExecution, WorkflowExecutionTrace, ExecutionJob
+from app.models.chat import ChatMessage
+from app.schemas.workflow import QueuedExecution
+from .trace_store import trace_store, execution_summary
+from .tracing import tracer
+from .metrics import JOBS_ENQUEUED, JOBS_FINISHED, JOB_QUEUE_WAIT, JOB_QUEUE_DEPTH
+
+FINAL_STATUSES = ("completed", "failed", "timed_out", "cancelled")
+
+class JobQueue:
+    """Durable queue of workflow runs, stored in the execution_jobs table.
+
+    The API inserts a job in the same transaction as its WorkflowExecution
+    row and answers 202 straight away. Execution workers (``worker.py``)
+    claim jobs with a single UPDATE, so no two workers get the same one, and
+    hold them under a lease they renew while running. A job whose worker
+    dies is claimed again once its lease expires; a run that fails is retried
+    with exponential backoff until ``max_attempts``. Results are written to
+    the execution row, which clients poll or stream.
+
+    The same table works on SQLite, where writes are serialized, and on
+    Postgres, where the claim skips rows locked by other workers.
+    """
+
+    def __init__(self, session_factory=SessionLocal, lease_seconds: Optional[float] = None,
+                 max_attempts: Optional[int] = None, retry_backoff: Optional[float] = None):
+        self.session_factory = session_factory
+        # "queue" sends every run to the workers; otherwise only requests sending Prefer: respond-async
+        self.mode = os.getenv("EXECUTION_MODE", "inline").lower()
+        self.lease_seconds = lease_seconds or float(os.getenv("JOB_LEASE_SECONDS", "30"))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.retry_backoff = retry_backoff if retry_backoff is not None else \
+            float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+        self.stream_interval = int(os.getenv("JOB_STREAM_POLL_MS", "250")) / 1000
+
+    def wants_queue(self, request: Request) -> bool:
+        """Whether this request should be run by a worker rather than inline"""
+        prefer = request.headers.get("prefer", "").lower()
+        return self.mode == "queue" or "respond-async" in [value.strip() for value in prefer.split(",")]
+
+    async def enqueue(self, db: AsyncSession, execution: WorkflowExecution, kind: str,
+                      payload: Dict[str, Any]) -> ExecutionJob:
+        """Add a job for a new execution row; committed by the caller together with the row"""
+        await db.flush()
+        job = ExecutionJob(
+            execution_id=execution.id,
+            workflow_id=execution.workflow_id,
+            kind=kind,
+            payload=payload,
+            status="queued",
+            attempts=0,
+            max_attempts=self.max_attempts
+        )
+        db.add(job)
+        JOBS_ENQUEUED.inc(kind=kind)
+        return job
+
+    def accepted(self, execution_id: int, session_id: Optional[str] = None) -> JSONResponse:
+        """202 response pointing at the queued execution"""
+        body = QueuedExecution(
+            execution_id=execution_id,
+            status="queued",
+            session_id=session_id,
+            status_url=f"/executions/{execution_id}",
+            events_url=f"/executions/{execution_id}/events"
+        )
+        return JSONResponse(body.model_dump(), status_code=status.HTTP_202_ACCEPTED,
+                            headers={"Location": body.status_url})
+
+    async def claim(self, worker_id: str) -> Optional[Any]:
+        """Lease the oldest runnable job to this worker, or None if there is none"""
+        now = datetime.now(timezone.utc)
+        candidate = select(ExecutionJob.execution_id).where(or_(
+            and_(ExecutionJob.status == "queued", ExecutionJob.available_at <= now),
+            and_(ExecutionJob.status == "running", ExecutionJob.lease_expires_at < now,
+                 ExecutionJob.attempts < ExecutionJob.max_attempts)
+        )).order_by(ExecutionJob.available_at, ExecutionJob.execution_id).limit(1) \
+            .with_for_update(skip_locked=True)
+
+        async with self.session_factory() as db:
+            job = (await db.execute(
+                update(ExecutionJob)
+                .where(ExecutionJob.execution_id == candidate.scalar_subquery())
+                .values(status="running", lease_owner=worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        attempts=ExecutionJob.attempts + 1, updated_at=now)
+                .returning(ExecutionJob.execution_id, ExecutionJob.workflow_id, ExecutionJob.kind,
+                           ExecutionJob.payload, ExecutionJob.attempts, ExecutionJob.max_attempts,
+                           ExecutionJob.available_at)
+                .execution_options(synchronize_session=False)
+            )).first()
+            if job is None:
+                await db.rollback()
+                return None
+            await db.execute(
+                update(WorkflowExecution).where(WorkflowExecution.id == job.execution_id).values(status="running")
+            )
+            await db.commit()
+
+        JOB_QUEUE_WAIT.observe(max(0.0, (now - self._aware(job.available_at)).total_seconds()), kind=job.kind)
+        return job
+
+    async def renew(self, job: Any, worker_id: str) -> bool:
+        """Extend the lease; False once another worker has taken the job over"""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(ExecutionJob)
+                .where(ExecutionJob.execution_id == job.execution_id, ExecutionJob.lease_owner == worker_id,
+                       ExecutionJob.status == "running")
+                .values(lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds))
+            )
+            await db.commit()
+        return result.rowcount == 1
+
+    async def release(self, job: Any, worker_id: str):
+        """Hand an unfinished job back without using up an attempt, e.g. when a worker shuts down"""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(ExecutionJob)
+                .where(ExecutionJob.execution_id == job.execution_id, ExecutionJob.lease_owner == worker_id,
+                       ExecutionJob.status == "running")
+                .values(status="queued", lease_owner=None, lease_expires_at=None,
+                        attempts=ExecutionJob.attempts - 1, available_at=datetime.now(timezone.utc))
+            )
+            if result.rowcount:
+                await db.execute(
+                    update(WorkflowExecution).where(WorkflowExecution.id == job.execution_id).values(status="queued")
+                )
+            await db.commit()
+        JOBS_FINISHED.inc(kind=job.kind, outcome="released")
+
+    async def finish(self, job: Any, worker_id: str, result: Dict[str, Any], retryable: bool = True) -> str:
+        """Record a run's result, or schedule another attempt if it or one of its steps failed.
+
+        Returns the outcome: ``completed``, ``failed`` (any final status
+        other than completed), ``retried`` or ``lost`` when the lease had
+        passed to another worker and the result was discarded.
+        """
+        error = None if result["success"] else result.get("error", "Unknown error")
+        failed_steps = (result.get("metadata") or {}).get("failed_steps", 0)
+        retry = retryable and (result["status"] == "failed" or failed_steps > 0) and job.attempts < job.max_attempts
+        now = datetime.now(timezone.utc)
+
+        with tracer.start_span("job.finish", execution_id=job.execution_id, status=result["status"], retry=retry):
+            async with self.session_factory() as db:
+                # Fenced on the lease, so a worker that lost its job cannot overwrite the new owner's result
+                owned = update(ExecutionJob).where(
+                    ExecutionJob.execution_id == job.execution_id, ExecutionJob.lease_owner == worker_id,
+                    ExecutionJob.status == "running"
+                )
+                if retry:
+                    delay = self.retry_backoff * 2 ** (job.attempts - 1)
+                    error = error or f"{failed_steps} step(s) failed"
+                    claimed = await db.execute(owned.values(
+                        status="queued", lease_owner=None, lease_expires_at=None, last_error=error,
+                        available_at=now + timedelta(seconds=delay)
+                    ))
+                    outcome = "retried"
+                    execution_values = {"status": "queued", "error_message": error}
+                else:
+                    claimed = await db.execute(owned.values(
+                        status=result["status"], lease_owner=None, lease_expires_at=None, last_error=error
+                    ))
+                    outcome = "completed" if result["status"] == "completed" else "failed"
+                    execution_values = {
+                        "status": result["status"],
+                        "output_response": result["final_response"],
+                        "error_message": error,
+                        "completed_at": now,
+                        **execution_summary(result)
+                    }
+
+                if claimed.rowcount != 1:
+                    await db.rollback()
+                    outcome = "lost"
+                else:
+                    await db.execute(
+                        update(WorkflowExecution).where(WorkflowExecution.id == job.execution_id)
+                        .values(**execution_values)
+                    )
+                    if not retry:
+                        self._add_results(db, job, result, error)
+                    await db.commit()
+
+        JOBS_FINISHED.inc(kind=job.kind, outcome=outcome)
+        return outcome
+
+    async def abandon_expired(self) -> int:
+        """Fail jobs whose lease ran out on their last attempt; nobody will claim them again"""
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            ids = (await db.execute(
+                select(ExecutionJob.execution_id).where(
+                    ExecutionJob.status == "running", ExecutionJob.lease_expires_at < now,
+                    ExecutionJob.attempts >= ExecutionJob.max_attempts
+                ).limit(100)
+            )).scalars().all()
+            if not ids:
+                return 0
+            error = "Execution worker stopped responding on the last attempt"
+            await db.execute(
+                update(ExecutionJob).where(ExecutionJob.execution_id.in_(ids))
+                .values(status="failed", lease_owner=None, lease_expires_at=None, last_error=error)
+            )
+            await db.execute(
+                update(WorkflowExecution).where(WorkflowExecution.id.in_(ids))
+                .values(status="failed", error_message=error, completed_at=now)
+            )
+            await db.commit()
+        JOBS_FINISHED.inc(len(ids), kind="any", outcome="abandoned")
+        return len(ids)
+
+    async def record_depth(self):
+        """Update the queue depth gauge with the number of jobs per open status"""
+        async with self.session_factory() as db:
+            counts = dict((await db.execute(
+                select(ExecutionJob.status, func.count()).where(ExecutionJob.status.in_(("queued", "running")))
+                .group_by(ExecutionJob.status)
+            )).all())
+        for state in ("queued", "running"):
+            JOB_QUEUE_DEPTH.set(counts.get(state, 0), status=state)
+
+    async def watch(self, execution_id: int) -> AsyncIterator[WorkflowExecution]:
+        """Yield the execution row each time its status changes, ending at a final status"""
+        last_status = None
+        while True:
+            async with self.session_factory() as db:
+                execution = await db.get(WorkflowExecution, execution_id)
+            if execution is None:
+                return
+            if execution.status != last_status:
+                last_status = execution.status
+                yield execution
+            if execution.status in FINAL_STATUSES:
+                return
+            await asyncio.sleep(self.stream_interval)
+
+    def _add_results(self, db: AsyncSession, job: Any, result: Dict[str, Any], error: Optional[str]):
+        trace = trace_store.encode(job.execution_id, result["execution_steps"], result["trace_payloads"])
+        if trace:
+            db.add(WorkflowExecutionTrace(**trace))
+
+        if job.kind == "chat":
+            metadata = result.get("metadata") or {}
+            db.add(ChatMessage(
+                session_id=job.payload["session_id"],
+                message_type="assistant",
+                content=result["final_response"] or f"Error processing message: {error}",
+                msg_metadata={
+                    "execution_success": result["success"],
+                    "execution_status": result["status"],
+                    "execution_steps": metadata.get("total_steps", 0),
+                    "workflow_id": job.workflow_id,
+                    "execution_id": job.execution_id
+                }
+            ))
+
+    def _aware(self, value: datetime) -> datetime:
+        # SQLite hands datetimes back without their timezone
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+job_queue = JobQueue()
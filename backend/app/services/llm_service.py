@@ -1,25 +1,78 @@
-from openai import OpenAI
-import google.generativeai as genai
-import requests
+import asyncio
+import random
 import os
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
 from enum import Enum
+from .tracing import tracer
+from .metrics import LLM_REQUEST_DURATION, LLM_TOKENS, estimate_tokens
+from .search_service import search_service
+from .admission import admission
 
 class LLMProvider(str, Enum):
     OPENAI = "openai"
     GEMINI = "gemini"
+    MOCK = "mock"
+
+MOCK_VOCABULARY = [
+    "the", "workflow", "context", "document", "answer", "based", "on", "provided",
+    "information", "system", "query", "result", "data", "model", "response", "and",
+    "is", "of", "to", "in", "this", "relevant", "knowledge", "search", "user"
+]
+
+class MockLLMSettings:
+    """Timing and output settings for the in-process mock provider"""
+
+    def __init__(self):
+        self.time_to_first_token_ms = float(os.getenv("MOCK_LLM_TTFT_MS", "200"))
+        self.tokens_per_second = float(os.getenv("MOCK_LLM_TOKENS_PER_SEC", "50"))
+        self.response_tokens = int(os.getenv("MOCK_LLM_RESPONSE_TOKENS", "60"))
+        self.error_rate = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+        self.seed = int(os.getenv("MOCK_LLM_SEED", "42"))
 
 class LLMService:
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.google_api_key = os.getenv("GOOGLE_API_KEY")
-        self.serpapi_key = os.getenv("SERPAPI_KEY")
-        
-        if self.openai_api_key:
-            pass
-        
-        if self.google_api_key:
-            genai.configure(api_key=self.google_api_key)
+        self.mock_settings = MockLLMSettings()
+        # Provider SDKs are heavy to import; they load on first use or in warm()
+        self._openai_client = None
+        self._genai = None
+    
+    def is_configured(self, provider: LLMProvider) -> bool:
+        if provider == LLMProvider.OPENAI:
+            return bool(self.openai_api_key)
+        if provider == LLMProvider.GEMINI:
+            return bool(self.google_api_key)
+        return True
+    
+    def is_loaded(self, provider: LLMProvider) -> bool:
+        if provider == LLMProvider.OPENAI:
+            return self._openai_client is not None
+        if provider == LLMProvider.GEMINI:
+            return self._genai is not None
+        return True
+    
+    def warm(self, provider: LLMProvider):
+        """Import and configure a provider's SDK; blocking, so run it in a thread"""
+        if provider == LLMProvider.OPENAI:
+            self._openai()
+        elif provider == LLMProvider.GEMINI:
+            self._gemini()
+    
+    def _openai(self):
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+            # One client, so its connection pool is reused across requests
+            self._openai_client = AsyncOpenAI(api_key=self.openai_api_key)
+        return self._openai_client
+    
+    def _gemini(self):
+        if self._genai is None:
+            import google.generativeai as genai
+            if self.google_api_key:
+                genai.configure(api_key=self.google_api_key)
+            self._genai = genai
+        return self._genai
     
     async def generate_response(self, 
                               query: str, 
@@ -27,10 +80,11 @@ class LLMService:
                               custom_prompt: Optional[str] = None,
                               provider: LLMProvider = LLMProvider.GEMINI,
                               model: Optional[str] = None,
-                              use_web_search: bool = False) -> Dict[str, Any]:
+                              use_web_search: bool = False,
+                              history: Optional[str] = None) -> Dict[str, Any]:
         """Generate response using specified LLM provider"""
         
-        prompt = self._build_prompt(query, context, custom_prompt)
+        prompt = self._build_prompt(query, context, custom_prompt, history)
         
         if use_web_search:
             web_context = await self._get_web_search_context(query)
@@ -45,32 +99,79 @@ class LLMService:
             "context_provided": context is not None
         }
         
-        try:
-            if provider == LLMProvider.OPENAI:
-                response = await self._generate_openai_response(prompt, model)
-            elif provider == LLMProvider.GEMINI:
-                response = await self._generate_gemini_response(prompt, model)
-            
-            metadata["success"] = True
+        provider_label = getattr(provider, "value", provider)
+        
+        with tracer.start_span("llm.generate", provider=provider_label, model=model,
+                               prompt_chars=len(prompt)) as span:
+            try:
+                if provider == LLMProvider.OPENAI:
+                    response = await self._generate_openai_response(prompt, model)
+                elif provider == LLMProvider.GEMINI:
+                    response = await self._generate_gemini_response(prompt, model)
+                elif provider == LLMProvider.MOCK:
+                    response = await self._generate_mock_response(prompt, model)
+                
+                metadata["success"] = True
+            except Exception as e:
+                metadata["success"] = False
+                metadata["error"] = str(e)
+                span.error = str(e)
+        
+        model_label = model or "default"
+        metadata["usage"] = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(response) if metadata["success"] else 0
+        }
+        LLM_REQUEST_DURATION.observe(span.duration_ms / 1000, provider=provider_label, model=model_label,
+                                     success=str(metadata["success"]).lower())
+        if metadata["success"]:
+            admission.observe_llm_latency(span.duration_ms / 1000)
+        LLM_TOKENS.inc(metadata["usage"]["prompt_tokens"], provider=provider_label, model=model_label, kind="prompt")
+        LLM_TOKENS.inc(metadata["usage"]["completion_tokens"], provider=provider_label, model=model_label, kind="completion")
+        
+        if metadata["success"]:
             return {
                 "response": response,
                 "metadata": metadata
             }
-            
-        except Exception as e:
-            metadata["success"] = False
-            metadata["error"] = str(e)
-            return {
-                "response": f"Error generating response: {str(e)}",
-                "metadata": metadata
-            }
+        
+        return {
+            "response": f"Error generating response: {metadata['error']}",
+            "metadata": metadata
+        }
+    
+    async def stream_response(self,
+                              query: str,
+                              context: Optional[str] = None,
+                              custom_prompt: Optional[str] = None,
+                              provider: LLMProvider = LLMProvider.GEMINI,
+                              model: Optional[str] = None,
+                              history: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream a response as text chunks.
+
+        The mock provider emits tokens at its configured rate; other providers
+        yield the complete response as a single chunk.
+        """
+        prompt = self._build_prompt(query, context, custom_prompt, history)
+        
+        if provider == LLMProvider.MOCK:
+            async for token in self._stream_mock_response(prompt):
+                yield token
+        elif provider == LLMProvider.OPENAI:
+            yield await self._generate_openai_response(prompt, model)
+        elif provider == LLMProvider.GEMINI:
+            yield await self._generate_gemini_response(prompt, model)
     
-    def _build_prompt(self, query: str, context: Optional[str], custom_prompt: Optional[str]) -> str:
+    def _build_prompt(self, query: str, context: Optional[str], custom_prompt: Optional[str],
+                      history: Optional[str] = None) -> str:
         """Build the complete prompt for the LLM"""
         base_prompt = custom_prompt or "You are a helpful AI assistant. Answer the user's question based on the provided context and your knowledge."
         
         prompt_parts = [base_prompt]
         
+        if history:
+            prompt_parts.append(f"\nConversation so far:\n{history}")
+        
         if context:
             prompt_parts.append(f"\nContext:\n{context}")
         
@@ -86,9 +187,9 @@ class LLMService:
         
         model = model or "gpt-3.5-turbo"
         
-        client = OpenAI(api_key=self.openai_api_key)
+        client = self._openai()
         
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "user", "content": prompt}
@@ -105,6 +206,7 @@ class LLMService:
             raise ValueError("Google API key not configured")
         
         model_name = model or "gemini-1.5-flash"
+        genai = self._gemini()
         model = genai.GenerativeModel(model_name)
         
         generation_config = genai.types.GenerationConfig(
@@ -112,38 +214,39 @@ class LLMService:
             temperature=0.7,
         )
         
-        response = model.generate_content(
+        response = await model.generate_content_async(
             prompt,
             generation_config=generation_config
         )
         return response.text.strip()
     
+    async def _generate_mock_response(self, prompt: str, model: Optional[str] = None) -> str:
+        """Generate a deterministic response in-process with simulated latency"""
+        tokens = [token async for token in self._stream_mock_response(prompt)]
+        return "".join(tokens).strip()
+    
+    async def _stream_mock_response(self, prompt: str) -> AsyncIterator[str]:
+        """Yield mock tokens seeded by the prompt so identical prompts give identical output"""
+        settings = self.mock_settings
+        rng = random.Random(f"{settings.seed}:{prompt}")
+        
+        await asyncio.sleep(settings.time_to_first_token_ms / 1000.0)
+        
+        if rng.random() < settings.error_rate:
+            raise RuntimeError("Mock LLM injected failure")
+        
+        delay = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+        for i in range(settings.response_tokens):
+            if i > 0 and delay:
+                await asyncio.sleep(delay)
+            word = rng.choice(MOCK_VOCABULARY)
+            yield word if i == 0 else f" {word}"
+    
     async def _get_web_search_context(self, query: str) -> Optional[str]:
         """Get additional context from web search using SerpAPI"""
-        if not self.serpapi_key:
-            return None
-        
         try:
-            url = "https://serpapi.com/search"
-            params = {
-                "engine": "google",
-                "q": query,
-                "api_key": self.serpapi_key,
-                "num": 3
-            }
-            
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if "organic_results" in data:
-                results = []
-                for result in data["organic_results"][:3]:
-                    snippet = result.get("snippet", "")
-                    title = result.get("title", "")
-                    results.append(f"Title: {title}\nSnippet: {snippet}")
-                
-                return "\n\n".join(results)
-            
+            results = await search_service.search(query, max_results=3)
+            return search_service.format_results(results)
         except Exception as e:
             print(f"Web search error: {e}")
         
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from .metrics import MEMO_CACHE_REQUESTS, MEMO_CACHE_BYTES
+
+class MemoCache:
+    """LRU cache of deterministic component outputs, bounded by size and TTL.
+
+    Keys hash the component type, its config, the inputs it declares and a
+    data version, so a changed prompt upstream or a new document in the
+    collection produces a different key instead of a stale hit. Entry size is
+    estimated from the JSON encoding of the output.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("MEMO_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("MEMO_CACHE_TTL_SECONDS", "300"))
+        # key -> (expires_at, size, output)
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def make_key(component_type: str, config: Dict[str, Any], inputs: Dict[str, Any], data_version: Any) -> str:
+        payload = json.dumps([component_type, config, inputs, data_version], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, component_type: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        MEMO_CACHE_REQUESTS.inc(component_type=component_type, result="hit" if entry else "miss")
+        # Callers may mutate step outputs, so hand out a copy
+        return copy.deepcopy(entry[2]) if entry else None
+
+    def set(self, key: str, output: Dict[str, Any]):
+        size = len(json.dumps(output, default=str))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, copy.deepcopy(output))
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            MEMO_CACHE_BYTES.set(self._bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            MEMO_CACHE_BYTES.set(0)
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+memo_cache = MemoCache()
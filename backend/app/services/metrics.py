@@ -0,0 +1,244 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, [list(entry[0]), entry[1], entry[2]]) for key, entry in self._values.items())
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """In-process registry rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets or DEFAULT_BUCKETS))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+COMPONENT_DURATION = metrics.histogram(
+    "workflow_component_duration_seconds", "Workflow component execution time", ["component_type", "success"]
+)
+LLM_REQUEST_DURATION = metrics.histogram(
+    "llm_request_duration_seconds", "LLM call latency", ["provider", "model", "success"]
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total", "Approximate LLM tokens (4 characters per token)", ["provider", "model", "kind"]
+)
+VECTOR_EMBEDDING_DURATION = metrics.histogram(
+    "vector_embedding_duration_seconds", "Time to embed texts for the vector store", ["operation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+VECTOR_QUERY_DURATION = metrics.histogram(
+    "vector_query_duration_seconds", "Vector store query latency", ["collection"]
+)
+DOCUMENT_INGEST_DURATION = metrics.histogram(
+    "document_ingest_duration_seconds", "Time spent extracting and indexing uploaded documents", ["stage"]
+)
+DOCUMENT_INGEST_BYTES = metrics.counter(
+    "document_ingest_bytes_total", "Text bytes extracted from uploaded documents", ["content_type"]
+)
+DOCUMENT_INGEST_CHUNKS = metrics.counter(
+    "document_ingest_chunks_total", "Chunks written to the vector store", []
+)
+MEMO_CACHE_REQUESTS = metrics.counter(
+    "memo_cache_requests_total", "Memoized component lookups", ["component_type", "result"]
+)
+MEMO_CACHE_BYTES = metrics.gauge(
+    "memo_cache_bytes", "Estimated size of memoized component outputs", []
+)
+CHAT_WRITES_PENDING = metrics.gauge(
+    "chat_writes_pending", "Chat sessions and messages buffered for write-behind", []
+)
+CHAT_FLUSH_ROWS = metrics.histogram(
+    "chat_flush_rows", "Rows written per chat write-behind flush", [],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+WORKFLOW_CACHE_REQUESTS = metrics.counter(
+    "workflow_cache_requests_total", "Workflow definition cache lookups", ["result"]
+)
+RETENTION_PURGED_ROWS = metrics.counter(
+    "retention_purged_rows_total", "Rows and files removed by retention and workflow cleanup", ["table"]
+)
+CHAT_MEMORY_TOKENS = metrics.histogram(
+    "chat_memory_tokens", "Estimated tokens of conversation memory passed to a chat turn", [],
+    buckets=(0, 50, 100, 250, 500, 1000, 1500, 2000, 4000)
+)
+DEPENDENCY_READY = metrics.gauge(
+    "dependency_ready", "1 once a dependency has warmed up, else 0", ["dependency"]
+)
+STARTUP_DURATION = metrics.gauge(
+    "startup_duration_seconds", "Time spent in each startup phase", ["phase"]
+)
+JOBS_ENQUEUED = metrics.counter(
+    "execution_jobs_enqueued_total", "Workflow runs handed to the execution workers", ["kind"]
+)
+JOBS_FINISHED = metrics.counter(
+    "execution_jobs_finished_total", "Job attempts ended by a worker, by outcome", ["kind", "outcome"]
+)
+JOB_QUEUE_WAIT = metrics.histogram(
+    "execution_job_queue_wait_seconds", "Time from a job becoming runnable to a worker claiming it", ["kind"]
+)
+JOB_QUEUE_DEPTH = metrics.gauge(
+    "execution_jobs", "Jobs waiting for or held by a worker", ["status"]
+)
+ADMISSION_IN_FLIGHT = metrics.gauge(
+    "admission_in_flight", "Workflow runs currently admitted on this worker", []
+)
+ADMISSION_LIMIT = metrics.gauge(
+    "admission_limit", "Adaptive in-flight limit of this worker", []
+)
+ADMISSION_QUEUE_LENGTH = metrics.gauge(
+    "admission_queue_length", "Requests waiting for an admission slot", []
+)
+ADMISSION_REJECTED = metrics.counter(
+    "admission_rejected_total", "Requests answered 429 by admission control", ["reason"]
+)
+ADMISSION_WAIT = metrics.histogram(
+    "admission_wait_seconds", "Time admitted requests waited for a slot", []
+)
+SCHEDULER_IN_FLIGHT = metrics.gauge(
+    "scheduler_in_flight", "Executions holding a fair scheduler slot", []
+)
+SCHEDULER_QUEUE_LENGTH = metrics.gauge(
+    "scheduler_queue_length", "Executions waiting for a fair scheduler slot", []
+)
+SCHEDULER_WAIT = metrics.histogram(
+    "scheduler_wait_seconds", "Time executions waited for a fair scheduler slot", []
+)
+IDEMPOTENCY_REQUESTS = metrics.counter(
+    "idempotency_requests_total", "Requests sent with an Idempotency-Key, by outcome", ["outcome"]
+)
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return (len(text) + 3) // 4 if text else 0
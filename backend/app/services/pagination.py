@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple, Type
+import base64
+import json
+import os
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import DateTime, Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+MAX_PAGE_SIZE = int(os.getenv("PAGE_SIZE_MAX", "500"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def schema_columns(model, schema: Type[BaseModel]) -> list:
+    """Model columns named by the response schema, for projected listing queries"""
+    return [getattr(model, name) for name in schema.model_fields if name in model.__table__.columns]
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, keys: Sequence[Any]) -> List[Any]:
+    """Inverse of encode_cursor; raises ValueError for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("Invalid cursor")
+    return [
+        datetime.fromisoformat(value) if isinstance(key.type, DateTime) and value is not None else value
+        for key, value in zip(keys, values)
+    ]
+
+async def fetch_page(db: AsyncSession, statement: Select, keys: Sequence[Any],
+                     cursor: Optional[str], limit: int, descending: bool = False) -> Tuple[list, Optional[str]]:
+    """Run a keyset-paginated query.
+
+    ``keys`` are the ordering columns, ending with a unique one (usually the
+    primary key), and must be among the selected columns. Rows come back in
+    ``keys`` order; the returned cursor resumes after the last row, or is
+    None on the final page.
+    """
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        position = tuple_(*keys) < tuple_(*values) if descending else tuple_(*keys) > tuple_(*values)
+        statement = statement.where(position)
+
+    order = [key.desc() for key in keys] if descending else [key.asc() for key in keys]
+    rows = (await db.execute(statement.order_by(*order).limit(limit + 1))).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], key.key) for key in keys])
+
+async def paginate(db: AsyncSession, response: Response, statement: Select, keys: Sequence[Any],
+                   cursor: Optional[str], limit: int, descending: bool = False) -> list:
+    """fetch_page for routes: bad cursors become 400s and the next cursor goes in a header"""
+    try:
+        rows, next_cursor = await fetch_page(db, statement, keys, cursor, limit, descending)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
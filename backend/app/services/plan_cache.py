@@ -0,0 +1,42 @@
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+import os
+from .workflow_executor import workflow_executor, ExecutionPlan
+
+class PlanCache:
+    """LRU cache of compiled execution plans keyed by (workflow_id, updated_at).
+
+    Only the newest version of each workflow is kept. A changed updated_at
+    triggers a recompile, and invalidate() drops the entry eagerly when a
+    workflow is updated or deleted.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or int(os.getenv("PLAN_CACHE_SIZE", "256"))
+        self._plans: "OrderedDict[int, Tuple[Any, ExecutionPlan]]" = OrderedDict()
+
+    def get_plan(self, workflow) -> ExecutionPlan:
+        """Return the compiled plan for a Workflow row, compiling it on a miss"""
+        entry = self._plans.get(workflow.id)
+
+        if entry is not None and entry[0] == workflow.updated_at:
+            self._plans.move_to_end(workflow.id)
+            return entry[1]
+
+        plan = workflow_executor.compile_plan_from_json(workflow.components, workflow.connections)
+        self._plans[workflow.id] = (workflow.updated_at, plan)
+        self._plans.move_to_end(workflow.id)
+
+        if len(self._plans) > self.max_size:
+            self._plans.popitem(last=False)
+
+        return plan
+
+    def invalidate(self, workflow_id: int):
+        """Drop the cached plan for a workflow"""
+        self._plans.pop(workflow_id, None)
+
+    def clear(self):
+        self._plans.clear()
+
+plan_cache = PlanCache()
@@ -0,0 +1,156 @@
+from typing import Dict, Any, Awaitable, Callable, Optional
+import asyncio
+import os
+import time
+from sqlalchemy import text
+from .chroma_service import chroma_service
+from .llm_service import llm_service, LLMProvider
+from .search_service import search_service
+from .tracing import tracer
+from .metrics import DEPENDENCY_READY, STARTUP_DURATION
+
+class Dependency:
+    """Warm-up state of one external dependency.
+
+    ``state`` moves from ``cold`` to ``warming`` to ``ready`` or ``failed``;
+    dependencies that are not configured stay ``disabled``.
+    """
+
+    def __init__(self, name: str, warm: Callable[[], Awaitable[Any]], required: bool = False,
+                 enabled: bool = True):
+        self.name = name
+        self.warm = warm
+        self.required = required
+        self.state = "cold" if enabled else "disabled"
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.detail: Any = None
+
+    def report(self) -> Dict[str, Any]:
+        report = {"state": self.state, "required": self.required}
+        if self.duration_ms is not None:
+            report["duration_ms"] = round(self.duration_ms, 1)
+        if self.detail:
+            report["detail"] = self.detail
+        if self.error:
+            report["error"] = self.error
+        return report
+
+class Readiness:
+    """Warms dependencies in the background after startup and reports their state.
+
+    The process accepts traffic as soon as the app is up; ``/ready`` answers
+    503 until every required dependency has warmed, so an orchestrator only
+    routes requests once the vector store and database are usable.
+    Dependencies that are not warmed yet still initialize lazily on first use.
+    Failed dependencies are warmed again, with the delay doubling from
+    ``retry_initial`` up to ``retry_max`` seconds, until every required one
+    is ready.
+    """
+
+    def __init__(self, retry_initial: Optional[float] = None, retry_max: Optional[float] = None):
+        self.dependencies: Dict[str, Dependency] = {}
+        self.timings: Dict[str, float] = {}
+        self.retry_initial = retry_initial if retry_initial is not None else float(os.getenv("WARMUP_RETRY_INITIAL_SECONDS", "1"))
+        self.retry_max = retry_max if retry_max is not None else float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "30"))
+        self._started_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, warm: Callable[[], Awaitable[Any]], required: bool = False,
+                 enabled: bool = True):
+        self.dependencies[name] = Dependency(name, warm, required, enabled)
+        DEPENDENCY_READY.set(0, dependency=name)
+
+    def record(self, phase: str, seconds: float):
+        """Store a startup timing such as the app import or startup hook"""
+        self.timings[f"{phase}_ms"] = round(seconds * 1000, 1)
+        STARTUP_DURATION.set(seconds, phase=phase)
+
+    def start(self, started_at: Optional[float] = None):
+        """Warm every dependency in the background; ``started_at`` is the perf_counter() of process start"""
+        self._started_at = started_at if started_at is not None else time.perf_counter()
+        if os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true" and self._task is None:
+            self._task = asyncio.create_task(self._warm_until_ready())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def warm_up(self):
+        with tracer.start_span("startup.warm_up"):
+            await asyncio.gather(*[
+                self._warm(dependency) for dependency in self.dependencies.values()
+                if dependency.state in ("cold", "failed")
+            ])
+        if self._started_at is not None and self.is_ready():
+            self.record("ready", time.perf_counter() - self._started_at)
+
+    async def _warm_until_ready(self):
+        delay = self.retry_initial
+        await self.warm_up()
+        while not self.is_ready():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max)
+            await self.warm_up()
+
+    def is_ready(self) -> bool:
+        return all(dependency.state == "ready" for dependency in self.dependencies.values() if dependency.required)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "dependencies": {name: dependency.report() for name, dependency in self.dependencies.items()},
+            "timings": self.timings
+        }
+
+    async def _warm(self, dependency: Dependency):
+        dependency.state = "warming"
+        start = time.perf_counter()
+        with tracer.start_span("startup.warm", dependency=dependency.name) as span:
+            try:
+                dependency.detail = await dependency.warm()
+                dependency.state = "ready"
+                dependency.error = None
+            except Exception as e:
+                dependency.state = "failed"
+                dependency.error = str(e)
+                span.error = str(e)
+        dependency.duration_ms = (time.perf_counter() - start) * 1000
+        DEPENDENCY_READY.set(1 if dependency.state == "ready" else 0, dependency=dependency.name)
+
+async def _warm_database():
+    from app.database import engine
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def _warm_vector_store():
+    return await asyncio.to_thread(chroma_service.warm)
+
+async def _warm_embedding_model():
+    embedding = await asyncio.to_thread(chroma_service.simple_embedding, "warm up")
+    return {"dimensions": len(embedding)}
+
+def _warm_provider(provider: LLMProvider) -> Callable[[], Awaitable[Any]]:
+    async def warm():
+        await asyncio.to_thread(llm_service.warm, provider)
+    return warm
+
+async def _noop():
+    return None
+
+REQUIRED_DEPENDENCIES = {
+    name.strip() for name in os.getenv("READY_REQUIRED", "database,vector_store").split(",") if name.strip()
+}
+
+readiness = Readiness()
+readiness.register("database", _warm_database, "database" in REQUIRED_DEPENDENCIES)
+readiness.register("vector_store", _warm_vector_store, "vector_store" in REQUIRED_DEPENDENCIES)
+readiness.register("embedding_model", _warm_embedding_model, "embedding_model" in REQUIRED_DEPENDENCIES)
+for _provider in (LLMProvider.OPENAI, LLMProvider.GEMINI):
+    readiness.register(f"llm_{_provider.value}", _warm_provider(_provider),
+                       f"llm_{_provider.value}" in REQUIRED_DEPENDENCIES,
+                       enabled=llm_service.is_configured(_provider))
+readiness.register("web_search", _noop, "web_search" in REQUIRED_DEPENDENCIES,
+                   enabled=search_service.is_configured)
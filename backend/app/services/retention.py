@@ -0,0 +1,347 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Awaitable, Callable
+import asyncio
+import os
+import time
+from sqlalchemy import Select, delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import SessionLocal
+from app.models.workflow import Workflow, WorkflowExecution, WorkflowExecutionTrace, WorkflowBatch, ExecutionJob
+from app.models.chat import ChatSession, ChatMessage
+from app.models.document import Document
+from app.models.idempotency import IdempotencyKey
+from .chroma_service import chroma_service
+from .chat_store import chat_store
+from .tracing import tracer
+from .workflow_settings import parse_setting
+from .metrics import RETENTION_PURGED_ROWS
+
+UPLOAD_DIR = Path("uploads")
+DOCUMENTS_COLLECTION = "documents"
+
+class RetentionPolicy:
+    """How much history to keep for one workflow; 0 disables a limit.
+
+    Every limit is off unless configured, so no history is deleted until
+    an operator opts in. Defaults come from the environment and can be
+    overridden per workflow with
+    ``{"settings": {"retention": {"execution_max_count": 100}}}``.
+    """
+
+    LIMITS = ("execution_max_age_days", "execution_max_count", "chat_max_age_days", "chat_max_sessions")
+
+    def __init__(self, execution_max_age_days: float = 0.0, execution_max_count: int = 0,
+                 chat_max_age_days: float = 0.0, chat_max_sessions: int = 0):
+        self.execution_max_age_days = execution_max_age_days
+        self.execution_max_count = execution_max_count
+        self.chat_max_age_days = chat_max_age_days
+        self.chat_max_sessions = chat_max_sessions
+
+    @classmethod
+    def default(cls) -> "RetentionPolicy":
+        return cls(
+            execution_max_age_days=float(os.getenv("RETENTION_EXECUTION_MAX_AGE_DAYS", "0")),
+            execution_max_count=int(os.getenv("RETENTION_EXECUTION_MAX_COUNT", "0")),
+            chat_max_age_days=float(os.getenv("RETENTION_CHAT_MAX_AGE_DAYS", "0")),
+            chat_max_sessions=int(os.getenv("RETENTION_CHAT_MAX_SESSIONS", "0"))
+        )
+
+    def for_workflow(self, settings: Optional[Dict[str, Any]]) -> "RetentionPolicy":
+        overrides = (settings or {}).get("retention") or {}
+        if not isinstance(overrides, dict):
+            raise ValueError(f"Invalid retention setting {overrides!r}: expected an object")
+        return RetentionPolicy(**{
+            limit: parse_setting(f"retention.{limit}", overrides[limit], getattr(self, limit))
+            if limit in overrides else getattr(self, limit)
+            for limit in self.LIMITS
+        })
+
+class RetentionManager:
+    """Deletes history past its retention policy and everything a deleted workflow leaves behind.
+
+    All deletes run in transactions of at most ``batch_size`` rows with a
+    ``pause`` between them, so the single SQLite writer (or Postgres row
+    locks) is never held long enough to stall live requests. A background
+    task runs a full purge every ``interval`` seconds. When several workers
+    share the database only the one holding ``lock_file`` runs it; another
+    takes over on its next interval if that worker exits.
+    """
+
+    def __init__(self, session_factory=SessionLocal, policy: Optional[RetentionPolicy] = None,
+                 interval: Optional[float] = None, batch_size: Optional[int] = None,
+                 pause: Optional[float] = None, upload_grace: Optional[float] = None):
+        self.session_factory = session_factory
+        self.policy = policy or RetentionPolicy.default()
+        self.enabled = os.getenv("RETENTION_ENABLED", "true").lower() == "true"
+        self.interval = interval if interval is not None else float(os.getenv("RETENTION_PURGE_INTERVAL_SECONDS", "3600"))
+        self.batch_size = batch_size or int(os.getenv("RETENTION_PURGE_BATCH_SIZE", "200"))
+        self.pause = pause if pause is not None else int(os.getenv("RETENTION_PURGE_PAUSE_MS", "50")) / 1000
+        # Files younger than this may belong to an upload that is still being processed
+        self.upload_grace = upload_grace if upload_grace is not None else float(os.getenv("RETENTION_UPLOAD_GRACE_SECONDS", "3600"))
+        self.lock_file = os.getenv("RETENTION_LOCK_FILE", "./retention.lock")
+        self._lock_handle = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._lock_handle is not None:
+            self._lock_handle.close()
+            self._lock_handle = None
+
+    async def purge(self) -> Dict[str, int]:
+        """Apply every workflow's retention policy and remove orphaned rows and files"""
+        purged: Dict[str, int] = {}
+        with tracer.start_span("retention.purge") as span:
+            async with self.session_factory() as db:
+                workflows = (await db.execute(select(Workflow.id, Workflow.settings))).all()
+
+            for workflow in workflows:
+                try:
+                    policy = self.policy.for_workflow(workflow.settings)
+                except ValueError as e:
+                    # Saved before settings were validated; keep its history rather than guess
+                    print(f"Retention skipped workflow {workflow.id}: {e}")
+                    continue
+                self._add(purged, await self._purge_executions(workflow.id, policy))
+                self._add(purged, await self._purge_chat(workflow.id, policy))
+
+            self._add(purged, await self._purge_orphans())
+            purged["idempotency_keys"] = await self._drain(
+                select(IdempotencyKey.key).where(IdempotencyKey.expires_at < datetime.now(timezone.utc)),
+                self._delete_idempotency_keys
+            )
+            purged["uploads"] = await asyncio.to_thread(self._purge_uploads, await self._referenced_uploads())
+            span.set_attribute("purged", sum(purged.values()))
+        return purged
+
+    async def delete_workflow(self, workflow_id: int) -> Dict[str, int]:
+        """Delete a workflow with its executions, batches, chat history, documents, vectors and files"""
+        if chat_store.has_pending():
+            # Buffered sessions of this workflow would otherwise be written after the cleanup
+            await chat_store.flush()
+
+        purged: Dict[str, int] = {}
+        with tracer.start_span("retention.delete_workflow", workflow_id=workflow_id):
+            self._add(purged, await self._delete_workflow_rows(
+                WorkflowExecution.workflow_id == workflow_id,
+                ChatSession.workflow_id == workflow_id,
+                WorkflowBatch.workflow_id == workflow_id,
+                Document.workflow_id == workflow_id
+            ))
+            await asyncio.to_thread(chroma_service.delete_documents, DOCUMENTS_COLLECTION, {"workflow_id": workflow_id})
+
+            async with self.session_factory() as db:
+                await db.execute(delete(Workflow).where(Workflow.id == workflow_id))
+                await db.commit()
+        return purged
+
+    async def _purge_executions(self, workflow_id: int, policy: RetentionPolicy) -> Dict[str, int]:
+        purged: Dict[str, int] = {}
+        ids = select(WorkflowExecution.id).where(WorkflowExecution.workflow_id == workflow_id)
+        if policy.execution_max_age_days:
+            cutoff = self._cutoff(policy.execution_max_age_days)
+            self._add(purged, {"workflow_executions": await self._drain(
+                ids.where(WorkflowExecution.created_at < cutoff), self._delete_executions
+            )})
+        if policy.execution_max_count:
+            self._add(purged, {"workflow_executions": await self._drain(
+                ids.order_by(WorkflowExecution.created_at.desc(), WorkflowExecution.id.desc())
+                .offset(policy.execution_max_count),
+                self._delete_executions
+            )})
+        if policy.execution_max_age_days:
+            # A batch is kept while any of its executions are, so it can still be resumed
+            purged["workflow_batches"] = await self._drain(
+                select(WorkflowBatch.id).where(
+                    WorkflowBatch.workflow_id == workflow_id,
+                    WorkflowBatch.status != "running",
+                    WorkflowBatch.created_at < self._cutoff(policy.execution_max_age_days),
+                    ~exists().where(WorkflowExecution.batch_id == WorkflowBatch.id)
+                ),
+                self._delete_batches
+            )
+        return purged
+
+    async def _purge_chat(self, workflow_id: int, policy: RetentionPolicy) -> Dict[str, int]:
+        purged: Dict[str, int] = {}
+        sessions = select(ChatSession.session_id).where(ChatSession.workflow_id == workflow_id)
+        if policy.chat_max_sessions:
+            purged["chat_sessions"] = await self._drain(
+                sessions.order_by(ChatSession.updated_at.desc(), ChatSession.id.desc())
+                .offset(policy.chat_max_sessions),
+                self._delete_sessions
+            )
+        if policy.chat_max_age_days:
+            cutoff = self._cutoff(policy.chat_max_age_days)
+            purged["chat_messages"] = await self._drain(
+                select(ChatMessage.id).where(
+                    ChatMessage.session_id.in_(sessions),
+                    ChatMessage.created_at < cutoff
+                ),
+                self._delete_messages
+            )
+            # Sessions are kept while they still have recent messages
+            self._add(purged, {"chat_sessions": await self._drain(
+                sessions.where(
+                    ChatSession.created_at < cutoff,
+                    ~exists().where(ChatMessage.session_id == ChatSession.session_id)
+                ),
+                self._delete_sessions
+            )})
+        return purged
+
+    async def _purge_orphans(self) -> Dict[str, int]:
+        """Rows whose workflow no longer exists, e.g. deleted before cleanup cascaded"""
+        def orphaned(column):
+            return ~exists().where(Workflow.id == column)
+
+        purged = await self._delete_workflow_rows(
+            orphaned(WorkflowExecution.workflow_id),
+            orphaned(ChatSession.workflow_id),
+            orphaned(WorkflowBatch.workflow_id),
+            Document.workflow_id.is_not(None) & orphaned(Document.workflow_id)
+        )
+        purged["workflow_execution_traces"] = await self._drain(
+            select(WorkflowExecutionTrace.execution_id).where(
+                ~exists().where(WorkflowExecution.id == WorkflowExecutionTrace.execution_id)
+            ),
+            self._delete_traces
+        )
+        return purged
+
+    async def _delete_workflow_rows(self, executions, sessions, batches, documents) -> Dict[str, int]:
+        """Delete the dependents of workflows selected by one condition per table, children first"""
+        return {
+            "workflow_executions": await self._drain(select(WorkflowExecution.id).where(executions),
+                                                     self._delete_executions),
+            "workflow_batches": await self._drain(select(WorkflowBatch.id).where(batches), self._delete_batches),
+            "chat_sessions": await self._drain(select(ChatSession.session_id).where(sessions),
+                                               self._delete_sessions),
+            "documents": await self._drain(select(Document.id).where(documents), self._delete_documents)
+        }
+
+    async def _drain(self, ids: Select, delete_batch: Callable[[AsyncSession, List[Any]], Awaitable[None]]) -> int:
+        """Delete the rows selected by ``ids`` one small transaction at a time"""
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                batch = (await db.execute(ids.limit(self.batch_size))).scalars().all()
+                if not batch:
+                    break
+                await delete_batch(db, batch)
+                await db.commit()
+
+            total += len(batch)
+            if len(batch) < self.batch_size:
+                break
+            # Let queued live writes through before taking the writer again
+            await asyncio.sleep(self.pause)
+        return total
+
+    async def _delete_executions(self, db: AsyncSession, ids: List[int]):
+        await self._delete_traces(db, ids)
+        # A worker still running one of these loses its lease fence and drops the result
+        await db.execute(delete(ExecutionJob).where(ExecutionJob.execution_id.in_(ids)))
+        await db.execute(delete(WorkflowExecution).where(WorkflowExecution.id.in_(ids)))
+        RETENTION_PURGED_ROWS.inc(len(ids), table="workflow_executions")
+
+    async def _delete_traces(self, db: AsyncSession, execution_ids: List[int]):
+        result = await db.execute(
+            delete(WorkflowExecutionTrace).where(WorkflowExecutionTrace.execution_id.in_(execution_ids))
+        )
+        RETENTION_PURGED_ROWS.inc(result.rowcount, table="workflow_execution_traces")
+
+    async def _delete_batches(self, db: AsyncSession, ids: List[str]):
+        await db.execute(delete(WorkflowBatch).where(WorkflowBatch.id.in_(ids)))
+        RETENTION_PURGED_ROWS.inc(len(ids), table="workflow_batches")
+
+    async def _delete_sessions(self, db: AsyncSession, session_ids: List[str]):
+        result = await db.execute(delete(ChatMessage).where(ChatMessage.session_id.in_(session_ids)))
+        await db.execute(delete(ChatSession).where(ChatSession.session_id.in_(session_ids)))
+        RETENTION_PURGED_ROWS.inc(result.rowcount, table="chat_messages")
+        RETENTION_PURGED_ROWS.inc(len(session_ids), table="chat_sessions")
+
+    async def _delete_messages(self, db: AsyncSession, ids: List[int]):
+        await db.execute(delete(ChatMessage).where(ChatMessage.id.in_(ids)))
+        RETENTION_PURGED_ROWS.inc(len(ids), table="chat_messages")
+
+    async def _delete_documents(self, db: AsyncSession, ids: List[int]):
+        paths = (await db.execute(select(Document.file_path).where(Document.id.in_(ids)))).scalars().all()
+        await db.execute(delete(Document).where(Document.id.in_(ids)))
+        await asyncio.to_thread(chroma_service.delete_documents, DOCUMENTS_COLLECTION, {"document_id": {"$in": ids}})
+        await asyncio.to_thread(self._unlink, paths)
+        RETENTION_PURGED_ROWS.inc(len(ids), table="documents")
+
+    async def _delete_idempotency_keys(self, db: AsyncSession, keys: List[str]):
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(keys)))
+        RETENTION_PURGED_ROWS.inc(len(keys), table="idempotency_keys")
+
+    async def _referenced_uploads(self) -> set:
+        async with self.session_factory() as db:
+            paths = (await db.execute(select(Document.file_path))).scalars().all()
+        return {Path(path).resolve() for path in paths}
+
+    def _purge_uploads(self, referenced: set) -> int:
+        """Remove files in uploads/ that no document points to"""
+        if not UPLOAD_DIR.exists():
+            return 0
+        cutoff = time.time() - self.upload_grace
+        orphans = [
+            path for path in UPLOAD_DIR.iterdir()
+            if path.is_file() and path.stat().st_mtime < cutoff and path.resolve() not in referenced
+        ]
+        self._unlink(orphans)
+        RETENTION_PURGED_ROWS.inc(len(orphans), table="uploads")
+        return len(orphans)
+
+    def _unlink(self, paths):
+        for path in paths:
+            try:
+                Path(path).unlink(missing_ok=True)
+            except OSError as e:
+                print(f"Retention could not remove {path}: {e}")
+
+    def _cutoff(self, days: float) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=days)
+
+    def _add(self, totals: Dict[str, int], counts: Dict[str, int]):
+        for table, count in counts.items():
+            totals[table] = totals.get(table, 0) + count
+
+    def _is_leader(self) -> bool:
+        """Hold the purge lock for the life of the process, or report that another worker does"""
+        if self._lock_handle is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            # No flock (Windows): one process per store is the only supported layout there
+            return True
+        handle = open(self.lock_file, "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_handle = handle
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._is_leader():
+                continue
+            try:
+                await self.purge()
+            except Exception as e:
+                print(f"Retention purge error: {e}")
+
+retention = RetentionManager()
@@ -0,0 +1,74 @@
+import httpx
+import os
+from typing import Dict, Any, List, Optional
+from .tracing import tracer
+
+SERPAPI_URL = "https://serpapi.com/search"
+
+class SearchService:
+    def __init__(self):
+        self.serpapi_key = os.getenv("SERPAPI_KEY")
+        self.timeout = float(os.getenv("WEB_SEARCH_TIMEOUT", "10"))
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.serpapi_key)
+
+    async def search(self,
+                     query: str,
+                     max_results: int = 3,
+                     search_type: str = "general",
+                     search_engine: str = "google") -> List[Dict[str, Any]]:
+        """Search the web through SerpAPI without blocking the event loop"""
+        if not self.serpapi_key:
+            return []
+
+        params = self._build_params(query, max_results, search_type, search_engine)
+
+        with tracer.start_span("web_search", engine=params["engine"], search_type=search_type,
+                               max_results=max_results):
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.get(SERPAPI_URL, params=params)
+                response.raise_for_status()
+                data = response.json()
+
+        results_key = "news_results" if search_type == "news" else "organic_results"
+        results = []
+        for result in data.get(results_key, [])[:max_results]:
+            results.append({
+                "title": result.get("title", ""),
+                "snippet": result.get("snippet", ""),
+                "link": result.get("link", "")
+            })
+
+        return results
+
+    def format_results(self, results: List[Dict[str, Any]]) -> Optional[str]:
+        """Format search results as prompt context"""
+        if not results:
+            return None
+        return "\n\n".join(f"Title: {r['title']}\nSnippet: {r['snippet']}" for r in results)
+
+    def _build_params(self, query: str, max_results: int, search_type: str, search_engine: str) -> Dict[str, Any]:
+        params = {
+            "engine": "bing" if search_engine == "bing" else "google",
+            "q": query,
+            "api_key": self.serpapi_key
+        }
+
+        if params["engine"] == "bing":
+            params["count"] = max_results
+        else:
+            params["num"] = max_results
+
+        if search_type == "news":
+            if params["engine"] == "google":
+                params["tbm"] = "nws"
+            else:
+                params["engine"] = "bing_news"
+        elif search_type == "academic":
+            params["engine"] = "google_scholar"
+
+        return params
+
+search_service = SearchService()
@@ -0,0 +1,85 @@
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import json
+import os
+from app.schemas.workflow import TraceLevel
+
+DEFAULT_TRACE_LEVEL = TraceLevel(os.getenv("TRACE_LEVEL", TraceLevel.FULL.value))
+
+def resolve_trace_level(requested: Optional[TraceLevel], settings: Optional[Dict[str, Any]]) -> TraceLevel:
+    """Pick the trace level: request override, then workflow setting, then TRACE_LEVEL"""
+    if requested:
+        return TraceLevel(requested)
+    if settings and settings.get("trace_level"):
+        return TraceLevel(settings["trace_level"])
+    return DEFAULT_TRACE_LEVEL
+
+class TraceRecorder:
+    """Turns raw execution steps into the trace stored on an execution.
+
+    OFF records nothing, SUMMARY records ids, types, timings and payload
+    sizes, and FULL records inputs and outputs with every field truncated to
+    ``max_field_chars``. In FULL mode long strings such as retrieved context
+    are written once to a payload table and referenced from each step as
+    ``{"$ref": key}`` instead of being copied into every step.
+    """
+
+    def __init__(self, level: Optional[TraceLevel] = None,
+                 max_field_chars: Optional[int] = None,
+                 ref_min_chars: Optional[int] = None):
+        self.level = TraceLevel(level) if level else DEFAULT_TRACE_LEVEL
+        self.max_field_chars = max_field_chars or int(os.getenv("TRACE_MAX_FIELD_CHARS", "2000"))
+        self.ref_min_chars = ref_min_chars or int(os.getenv("TRACE_REF_MIN_CHARS", "256"))
+
+    def render(self, steps: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """Return (execution_steps, trace_payloads) for the configured level"""
+        if self.level == TraceLevel.OFF:
+            return [], {}
+
+        if self.level == TraceLevel.SUMMARY:
+            return [self._summarize_step(step) for step in steps], {}
+
+        payloads: Dict[str, str] = {}
+        rendered = []
+        for step in steps:
+            entry = {key: value for key, value in step.items() if key not in ("input", "output")}
+            entry["input"] = self._render_fields(step["input"], payloads)
+            entry["output"] = self._render_fields(step["output"], payloads)
+            rendered.append(entry)
+        return rendered, payloads
+
+    def _summarize_step(self, step: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {key: value for key, value in step.items() if key not in ("input", "output")}
+        entry["input_keys"] = sorted(step["input"].keys())
+        entry["output_keys"] = sorted(step["output"].keys())
+        entry["input_size"] = sum(self._size(value) for value in step["input"].values())
+        entry["output_size"] = sum(self._size(value) for value in step["output"].values())
+        return entry
+
+    def _render_fields(self, fields: Dict[str, Any], payloads: Dict[str, str]) -> Dict[str, Any]:
+        rendered = {}
+        for key, value in fields.items():
+            if isinstance(value, str) and len(value) >= self.ref_min_chars:
+                ref = hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+                if ref not in payloads:
+                    payloads[ref] = self._truncate(value)
+                rendered[key] = {"$ref": ref}
+            elif isinstance(value, str):
+                rendered[key] = self._truncate(value)
+            elif isinstance(value, (dict, list)) and self._size(value) > self.max_field_chars:
+                rendered[key] = self._truncate(json.dumps(value, default=str))
+            else:
+                rendered[key] = value
+        return rendered
+
+    def _truncate(self, value: str) -> str:
+        if len(value) <= self.max_field_chars:
+            return value
+        return f"{value[:self.max_field_chars]}... [truncated {len(value) - self.max_field_chars} chars]"
+
+    def _size(self, value: Any) -> int:
+        if isinstance(value, str):
+            return len(value)
+        if isinstance(value, (dict, list)):
+            return len(json.dumps(value, default=str))
+        return len(str(value))
@@ -0,0 +1,60 @@
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import os
+import zlib
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.workflow import WorkflowExecution, WorkflowExecutionTrace
+
+TRACE_ENCODING = "zlib+json"
+
+def execution_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary columns of a WorkflowExecution row from an executor result"""
+    metadata = result.get("metadata") or {}
+    usage = metadata.get("usage") or {}
+    return {
+        "duration_ms": metadata.get("duration_ms"),
+        "step_count": metadata.get("total_steps", len(result.get("execution_steps") or [])),
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0)
+    }
+
+class TraceStore:
+    """Stores execution step traces compressed, in their own table.
+
+    Listing executions never touches the trace table; the steps are only
+    decompressed when ``GET /executions/{id}/steps`` asks for them.
+    """
+
+    def __init__(self, compression_level: Optional[int] = None):
+        self.compression_level = compression_level if compression_level is not None else \
+            int(os.getenv("TRACE_COMPRESSION_LEVEL", "6"))
+
+    def encode(self, execution_id: int, steps: List[Dict[str, Any]],
+               payloads: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """WorkflowExecutionTrace row values, or None when there is nothing to store"""
+        if not steps and not payloads:
+            return None
+        raw = json.dumps({"steps": steps, "payloads": payloads}, default=str).encode("utf-8")
+        return {
+            "execution_id": execution_id,
+            "encoding": TRACE_ENCODING,
+            "data": zlib.compress(raw, self.compression_level),
+            "size_bytes": len(raw)
+        }
+
+    def decode(self, trace: WorkflowExecutionTrace) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        if trace.encoding != TRACE_ENCODING:
+            raise ValueError(f"Unknown trace encoding: {trace.encoding}")
+        document = json.loads(zlib.decompress(trace.data))
+        return document["steps"], document["payloads"]
+
+    async def load(self, db: AsyncSession,
+                   execution: WorkflowExecution) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """(steps, trace_payloads) of an execution; empty if none were recorded"""
+        trace = await db.get(WorkflowExecutionTrace, execution.id)
+        if trace is not None:
+            return self.decode(trace)
+        # Executions recorded before traces had their own table
+        return execution.execution_steps or [], execution.trace_payloads or {}
+
+trace_store = TraceStore()
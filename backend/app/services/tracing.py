@@ -0,0 +1,155 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+import json
+import os
+import secrets
+import threading
+import time
+
+class Span:
+    """A timed unit of work with an optional parent, modelled on OpenTelemetry spans"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_unix_ns = time.time_ns()
+        self._start_ns = time.perf_counter_ns()
+        self.duration_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        """Monotonic duration, or the elapsed time so far for an open span"""
+        duration_ns = self.duration_ns if self.duration_ns is not None else time.perf_counter_ns() - self._start_ns
+        return round(duration_ns / 1_000_000, 3)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        if self.duration_ns is None:
+            self.duration_ns = time.perf_counter_ns() - self._start_ns
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Serialize in the OTLP/JSON span shape"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_unix_ns),
+            "endTimeUnixNano": str(self.start_unix_ns + (self.duration_ns or 0)),
+            "attributes": [
+                _otlp_attribute(key, value) for key, value in self.attributes.items() if value is not None
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class Tracer:
+    """Collects spans per trace and exports each trace when its root span ends.
+
+    Parent/child links follow the async call stack through a ContextVar, so
+    spans opened inside tasks spawned by the executor attach to the span that
+    was current when the task was created. Finished traces are written as
+    OTLP/JSON lines to TRACE_EXPORT_PATH and/or posted to TRACE_EXPORT_URL.
+    With neither set, spans are still timed and linked but not kept.
+    """
+
+    def __init__(self):
+        self.service_name = os.getenv("TRACE_SERVICE_NAME", "workflow-api")
+        self.export_path = os.getenv("TRACE_EXPORT_PATH")
+        self.export_url = os.getenv("TRACE_EXPORT_URL")
+        self._traces: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def exporting(self) -> bool:
+        return bool(self.export_path or self.export_url)
+
+    @contextmanager
+    def start_span(self, name: str, **attributes):
+        """Open a span as a child of the current span, or as a new trace root"""
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+
+        if parent is None and self.exporting:
+            with self._lock:
+                self._traces[trace_id] = []
+
+        try:
+            yield span
+        except BaseException as e:
+            span.error = str(e) or type(e).__name__
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def _finish(self, span: Span):
+        if not self.exporting:
+            return
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                # Late child of a trace that has already been exported
+                return
+            spans.append(span)
+            if span.parent_id is not None:
+                return
+            del self._traces[span.trace_id]
+
+        self.export(spans)
+
+    def export(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.services.tracing"},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+
+        if self.export_path:
+            try:
+                with self._lock, open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload) + "\n")
+            except Exception as e:
+                print(f"Trace export error: {e}")
+
+        if self.export_url:
+            threading.Thread(target=self._post, args=(payload,), daemon=True).start()
+
+    def _post(self, payload: Dict[str, Any]):
+        try:
+            import requests
+            requests.post(self.export_url, json=payload, timeout=5)
+        except Exception as e:
+            print(f"Trace export error: {e}")
+
+tracer = Tracer()
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import os
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.workflow import Workflow
+from app.schemas.workflow import Workflow as WorkflowSchema
+from .http_cache import make_etag
+from .metrics import WORKFLOW_CACHE_REQUESTS
+
+class CachedWorkflow:
+    """Read-only snapshot of a Workflow row with its serialized API body.
+
+    Exposes the same attributes as the row, so it can be passed to
+    plan_cache.get_plan() and read by the routers. The JSON columns are
+    shared between requests and must not be mutated.
+    """
+
+    def __init__(self, workflow: Workflow):
+        self.id: int = workflow.id
+        self.name: str = workflow.name
+        self.description: Optional[str] = workflow.description
+        self.components: List[Dict[str, Any]] = workflow.components
+        self.connections: List[Dict[str, Any]] = workflow.connections
+        self.is_valid: bool = workflow.is_valid
+        self.settings: Optional[Dict[str, Any]] = workflow.settings
+        self.created_at = workflow.created_at
+        self.updated_at = workflow.updated_at
+        self.checked_at = time.monotonic()
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+
+    @property
+    def body(self) -> bytes:
+        """The GET /workflows/{id} response, serialized once per version"""
+        if self._body is None:
+            self._body = WorkflowSchema.model_validate(self).model_dump_json().encode("utf-8")
+        return self._body
+
+    @property
+    def etag(self) -> str:
+        """Derived from the body, so every worker hands out the same ETag for the same definition"""
+        if self._etag is None:
+            self._etag = make_etag("workflow", self.body.decode("utf-8"))
+        return self._etag
+
+class WorkflowCache:
+    """Bounded LRU of workflow definitions keyed by id and version (updated_at).
+
+    Updates and deletes in this process invalidate entries immediately.
+    Entries also expire after ``ttl_seconds``, which bounds how long another
+    worker's changes can go unseen. ``revalidate_seconds`` tightens that
+    bound: a hit older than it first checks the row's version with a
+    primary-key lookup, which is much cheaper than loading and
+    re-serializing the definition. It defaults to 1s, since any other API
+    or execution worker may share the database.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 revalidate_seconds: Optional[float] = None):
+        self.max_size = max_size or int(os.getenv("WORKFLOW_CACHE_SIZE", "512"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("WORKFLOW_CACHE_TTL_SECONDS", "60"))
+        # 0 trusts entries for the whole TTL, which is only safe when one process serves the database
+        self.revalidate_seconds = revalidate_seconds if revalidate_seconds is not None \
+            else float(os.getenv("WORKFLOW_CACHE_REVALIDATE_SECONDS", "1"))
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def peek(self, workflow_id: int) -> Optional[CachedWorkflow]:
+        """The cached definition, without touching the database"""
+        entry = self._entries.get(workflow_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[workflow_id]
+            return None
+        self._entries.move_to_end(workflow_id)
+        return entry[1]
+
+    async def get(self, db: AsyncSession, workflow_id: int) -> Optional[CachedWorkflow]:
+        """The workflow definition, loading it on a miss; None if it does not exist"""
+        cached = self.peek(workflow_id)
+        if cached is not None and self.revalidate_seconds \
+                and time.monotonic() - cached.checked_at >= self.revalidate_seconds:
+            cached = await self._revalidate(db, cached)
+        WORKFLOW_CACHE_REQUESTS.inc(result="hit" if cached else "miss")
+        if cached is not None:
+            return cached
+
+        workflow = await db.get(Workflow, workflow_id)
+        if workflow is None:
+            return None
+        return self.put(workflow)
+
+    async def _revalidate(self, db: AsyncSession, cached: CachedWorkflow) -> Optional[CachedWorkflow]:
+        """The entry if the row is unchanged, otherwise None after dropping it"""
+        version = (await db.execute(
+            select(Workflow.created_at, Workflow.updated_at).where(Workflow.id == cached.id)
+        )).first()
+        if version is not None and version.created_at == cached.created_at \
+                and version.updated_at == cached.updated_at:
+            cached.checked_at = time.monotonic()
+            return cached
+        self.invalidate(cached.id)
+        return None
+
+    def put(self, workflow: Workflow) -> CachedWorkflow:
+        current = self._entries.get(workflow.id)
+        if current is not None and current[1].updated_at == workflow.updated_at \
+                and current[1].created_at == workflow.created_at:
+            cached = current[1]
+            cached.checked_at = time.monotonic()
+        else:
+            cached = CachedWorkflow(workflow)
+
+        self._entries[workflow.id] = (time.monotonic() + self.ttl_seconds, cached)
+        self._entries.move_to_end(workflow.id)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, workflow_id: int):
+        self._entries.pop(workflow_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+workflow_cache = WorkflowCache()
@@ -1,77 +1,443 @@
 from typing import Dict, Any, List, Optional
+import asyncio
+import heapq
+import os
+import time
 import uuid
+from collections import deque
 from datetime import datetime
-from .llm_service import llm_service, LLMProvider
-from .chroma_service import chroma_service
-from app.schemas.workflow import ComponentType, ComponentConfig, WorkflowConnection
+from types import MappingProxyType
+from .component_registry import component_registry
+from . import components  # registers the built-in component executors
+from .memo_cache import memo_cache
+from .fair_scheduler import fair_scheduler
+from .trace_recorder import TraceRecorder
+from .workflow_settings import parse_setting
+from .tracing import tracer
+from .metrics import COMPONENT_DURATION
+from app.schemas.workflow import ComponentType, ComponentConfig, WorkflowConnection, TraceLevel
+
+DEFAULT_MAX_PARALLELISM = int(os.getenv("WORKFLOW_MAX_PARALLELISM", "4"))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("WORKFLOW_TIMEOUT_SECONDS", "120"))
+
+def resolve_max_parallelism(requested: Optional[int], settings: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Request value, then the workflow's settings, then WORKFLOW_MAX_PARALLELISM; ValueError if the setting is not a positive whole number"""
+    if requested:
+        return requested
+    value = (settings or {}).get("max_parallelism")
+    if value is None:
+        return None
+    parallelism = parse_setting("max_parallelism", value, 0)
+    if parallelism < 1:
+        raise ValueError(f"Invalid max_parallelism setting {value!r}: expected a positive whole number")
+    return parallelism
+
+# Keys whose values are concatenated rather than overwritten when branches join
+JOINED_KEYS = ["context"]
+
+class ExecutionContext:
+    """Per-run state for a single workflow execution.
+
+    The executor itself holds no state, so concurrent runs each get their own
+    context and never see each other's data or step traces.
+    """
+    
+    def __init__(self, user_query: str, workflow_id: Optional[int] = None,
+                 max_parallelism: Optional[int] = None,
+                 timeout_seconds: Optional[float] = None,
+                 cancel_event: Optional[asyncio.Event] = None,
+                 history: Optional[str] = None):
+        self.execution_id = str(uuid.uuid4())
+        self.workflow_id = workflow_id
+        self.max_parallelism = max(1, max_parallelism or DEFAULT_MAX_PARALLELISM)
+        self.timeout_seconds = timeout_seconds or DEFAULT_TIMEOUT_SECONDS
+        self.deadline = time.monotonic() + self.timeout_seconds
+        self.cancel_event = cancel_event
+        self.status: Optional[str] = None
+        self.data: Dict[str, Any] = {"query": user_query, "workflow_id": workflow_id}
+        if history:
+            self.data["history"] = history
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self.steps: List[Dict[str, Any]] = []
+        self.started_at = datetime.now()
+    
+    def remaining(self) -> float:
+        """Seconds left before the execution deadline"""
+        return self.deadline - time.monotonic()
+
+class ExecutionPlan:
+    """Immutable, precompiled form of a workflow.
+
+    Holds the parsed component configs indexed by id, the topological order
+    and the upstream/downstream adjacency, so executing a message does not
+    re-parse, re-validate or re-sort the stored workflow JSON.
+    """
+    
+    def __init__(self, components: List[ComponentConfig], connections: List[WorkflowConnection],
+                 is_valid: bool, order: List[str]):
+        order_index = {cid: i for i, cid in enumerate(order)}
+        predecessors = {c.id: [] for c in components}
+        successors = {c.id: [] for c in components}
+        
+        if is_valid:
+            for connection in connections:
+                successors[connection.source].append(connection.target)
+                predecessors[connection.target].append(connection.source)
+        
+        self.is_valid = is_valid
+        self.components = MappingProxyType({c.id: c for c in components})
+        self.order = tuple(order)
+        self.order_index = MappingProxyType(order_index)
+        self.predecessors = MappingProxyType({
+            cid: tuple(sorted(preds, key=lambda p: order_index.get(p, len(order))))
+            for cid, preds in predecessors.items()
+        })
+        self.successors = MappingProxyType({cid: tuple(succ) for cid, succ in successors.items()})
+        self.roots = tuple(cid for cid in self.order if not self.predecessors[cid])
 
 class WorkflowExecutor:
-    def __init__(self):
-        self.execution_steps = []
+    def compile_plan(self, components: List[ComponentConfig], connections: List[WorkflowConnection]) -> ExecutionPlan:
+        """Validate and sort a workflow once into a reusable ExecutionPlan"""
+        is_valid = self._validate_workflow(components, connections)
+        order = self._get_execution_order(components, connections) if is_valid else []
+        return ExecutionPlan(components, connections, is_valid, order)
+    
+    def compile_plan_from_json(self, components: List[Dict[str, Any]], connections: List[Dict[str, Any]]) -> ExecutionPlan:
+        """Compile a plan from the JSON stored on a Workflow row"""
+        return self.compile_plan(
+            [ComponentConfig(**comp) for comp in components],
+            [WorkflowConnection(**conn) for conn in connections]
+        )
     
     async def execute_workflow(self, 
                              components: List[ComponentConfig], 
                              connections: List[WorkflowConnection], 
                              user_query: str,
-                             workflow_id: Optional[int] = None) -> Dict[str, Any]:
+                             workflow_id: Optional[int] = None,
+                             max_parallelism: Optional[int] = None,
+                             trace_level: Optional[TraceLevel] = None,
+                             timeout_seconds: Optional[float] = None,
+                             cancel_event: Optional[asyncio.Event] = None) -> Dict[str, Any]:
         """Execute a workflow with the given components and connections"""
-        self.execution_steps = []
+        plan = self.compile_plan(components, connections)
+        return await self.execute_plan(plan, user_query, workflow_id, max_parallelism, trace_level,
+                                       timeout_seconds, cancel_event)
+    
+    async def execute_plan(self,
+                           plan: ExecutionPlan,
+                           user_query: str,
+                           workflow_id: Optional[int] = None,
+                           max_parallelism: Optional[int] = None,
+                           trace_level: Optional[TraceLevel] = None,
+                           timeout_seconds: Optional[float] = None,
+                           cancel_event: Optional[asyncio.Event] = None,
+                           history: Optional[str] = None,
+                           tenant: Optional[str] = None) -> Dict[str, Any]:
+        """Execute a compiled workflow plan.
+
+        Components run as soon as all of their upstream components have
+        finished, with at most ``max_parallelism`` running at once. The
+        returned ``execution_steps`` are recorded at ``trace_level``.
+
+        The whole run must finish within ``timeout_seconds``, and each
+        component within its own budget. Setting ``cancel_event`` (e.g. when
+        the client disconnects) cancels in-flight components. Either way the
+        steps completed so far are returned, and interrupted steps are marked
+        ``timed_out`` or ``cancelled``.
+
+        ``history`` is the conversation memory of a chat session; it reaches
+        components as the ``history`` input.
+
+        The run first waits for a slot from the fair scheduler, shared by
+        ``tenant`` (by default the workflow). That wait counts against the
+        timeout; a run still waiting at its deadline ends ``timed_out``
+        without starting.
+        """
+        context = ExecutionContext(user_query, workflow_id, max_parallelism, timeout_seconds, cancel_event, history)
+        recorder = TraceRecorder(trace_level)
+        queued_at = time.perf_counter()
+        
+        with tracer.start_span("workflow.execute", workflow_id=workflow_id,
+                               execution_id=context.execution_id) as span:
+            try:
+                async with fair_scheduler.slot(tenant or f"workflow:{workflow_id}", timeout=context.remaining()):
+                    queued_ms = (time.perf_counter() - queued_at) * 1000
+                    span.set_attribute("queued_ms", queued_ms)
+                    result = await self._execute_in_context(context, plan, recorder)
+            except asyncio.TimeoutError:
+                queued_ms = (time.perf_counter() - queued_at) * 1000
+                context.status = "timed_out"
+                result = self._interrupted(
+                    context, recorder,
+                    f"No execution slot became free within the {context.timeout_seconds:.1f}s deadline"
+                )
+            span.set_attribute("success", result["success"])
         
+        result["metadata"]["queued_ms"] = queued_ms
+        result["metadata"]["trace_id"] = span.trace_id
+        result["metadata"]["duration_ms"] = span.duration_ms
+        result["metadata"]["usage"] = self._usage(context.steps)
+        # Components report errors (e.g. a failed LLM call) without failing the run
+        result["metadata"]["failed_steps"] = sum(1 for step in context.steps if step["status"] == "failed")
+        return result
+    
+    async def _execute_in_context(self, context: ExecutionContext, plan: ExecutionPlan,
+                                  recorder: TraceRecorder) -> Dict[str, Any]:
         try:
-            # Validate workflow
-            if not self._validate_workflow(components, connections):
+            if not plan.is_valid:
                 raise ValueError("Invalid workflow configuration")
             
-            execution_order = self._get_execution_order(components, connections)
-            current_data = {"query": user_query, "workflow_id": workflow_id}
+            await self._run_graph(context, plan)
             
-            for component_id in execution_order:
-                component = next(c for c in components if c.id == component_id)
-                
-                step_result = await self._execute_component(component, current_data)
-                
-                self.execution_steps.append({
-                    "component_id": component_id,
-                    "component_type": component.type,
-                    "timestamp": datetime.now().isoformat(),
-                    "input": current_data.copy(),
-                    "output": step_result,
-                    "success": step_result.get("success", True)
-                })
-                
-                current_data.update(step_result)
-                
-                if not step_result.get("success", True):
-                    break
+            executed = [cid for cid in plan.order if cid in context.states]
+            final_data = self._merge_states(context.data, [context.states[cid] for cid in executed])
+            execution_steps, trace_payloads = recorder.render(context.steps)
+            
+            if context.status in ("timed_out", "cancelled"):
+                return self._interrupted(context, recorder, self._interruption_error(context))
             
             return {
                 "success": True,
-                "final_response": current_data.get("response", "No response generated"),
-                "execution_steps": self.execution_steps,
+                "status": "completed",
+                "final_response": final_data.get("response", "No response generated"),
+                "execution_steps": execution_steps,
+                "trace_payloads": trace_payloads,
                 "metadata": {
-                    "total_steps": len(self.execution_steps),
+                    "execution_id": context.execution_id,
+                    "total_steps": len(context.steps),
+                    "trace_level": recorder.level,
                     "execution_time": datetime.now().isoformat()
                 }
             }
             
         except Exception as e:
+            execution_steps, trace_payloads = recorder.render(context.steps)
+            
             return {
                 "success": False,
+                "status": "failed",
                 "error": str(e),
-                "execution_steps": self.execution_steps,
-                "final_response": f"Workflow execution failed: {str(e)}"
+                "execution_steps": execution_steps,
+                "trace_payloads": trace_payloads,
+                "final_response": f"Workflow execution failed: {str(e)}",
+                "metadata": {
+                    "execution_id": context.execution_id,
+                    "total_steps": len(context.steps),
+                    "trace_level": recorder.level
+                }
             }
     
+    def _interrupted(self, context: ExecutionContext, recorder: TraceRecorder, error: str) -> Dict[str, Any]:
+        """Result of a run that timed out or was cancelled, with the steps it got through"""
+        execution_steps, trace_payloads = recorder.render(context.steps)
+        return {
+            "success": False,
+            "status": context.status,
+            "error": error,
+            "execution_steps": execution_steps,
+            "trace_payloads": trace_payloads,
+            "final_response": f"Workflow execution {context.status.replace('_', ' ')}: {error}",
+            "metadata": {
+                "execution_id": context.execution_id,
+                "total_steps": len(context.steps),
+                "trace_level": recorder.level
+            }
+        }
+    
+    async def _run_graph(self, context: ExecutionContext, plan: ExecutionPlan):
+        """Schedule every component whose upstream components have completed"""
+        pending = {cid: len(preds) for cid, preds in plan.predecessors.items()}
+        ready = [(plan.order_index[cid], cid) for cid in plan.roots]
+        running: Dict[asyncio.Task, tuple] = {}
+        cancel_waiter = asyncio.create_task(context.cancel_event.wait()) if context.cancel_event else None
+        failed = False
+        
+        try:
+            while ready or running:
+                while ready and not failed and len(running) < context.max_parallelism:
+                    if context.remaining() <= 0:
+                        context.status = "timed_out"
+                        failed = True
+                        break
+                    
+                    _, component_id = heapq.heappop(ready)
+                    upstream = plan.predecessors[component_id]
+                    node_input = self._merge_states(context.data, [context.states[p] for p in upstream])
+                    component = plan.components[component_id]
+                    task = asyncio.create_task(self._run_step(component, node_input, context))
+                    running[task] = (component, node_input, datetime.now().isoformat())
+                
+                if not running:
+                    break
+                
+                waiters = set(running) | ({cancel_waiter} if cancel_waiter else set())
+                done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                
+                if cancel_waiter in done:
+                    context.status = "cancelled"
+                    await self._interrupt(context, running, "cancelled")
+                    break
+                
+                for task in sorted(done, key=lambda t: plan.order_index[running[t][0].id]):
+                    component = running.pop(task)[0]
+                    step = task.result()
+                    context.steps.append(step)
+                    context.states[component.id] = {**step["input"], **step["output"]}
+                    
+                    if step["status"] == "timed_out":
+                        context.status = "timed_out"
+                    
+                    if not step["success"]:
+                        failed = True
+                    
+                    for neighbor in plan.successors[component.id]:
+                        pending[neighbor] -= 1
+                        if pending[neighbor] == 0:
+                            heapq.heappush(ready, (plan.order_index[neighbor], neighbor))
+        finally:
+            for task in running:
+                task.cancel()
+            if cancel_waiter:
+                cancel_waiter.cancel()
+        
+        context.steps.sort(key=lambda step: plan.order_index[step["component_id"]])
+    
+    async def _interrupt(self, context: ExecutionContext, running: Dict[asyncio.Task, tuple], status: str):
+        """Cancel in-flight components and record them as interrupted steps"""
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        
+        for component, node_input, timestamp in running.values():
+            context.steps.append({
+                "component_id": component.id,
+                "component_type": component.type,
+                "timestamp": timestamp,
+                "duration_ms": None,
+                "status": status,
+                "cached": False,
+                "input": node_input,
+                "output": {"success": False, "error": f"Component {status.replace('_', ' ')}"},
+                "success": False
+            })
+        running.clear()
+    
+    async def _run_step(self, component: ComponentConfig, node_input: Dict[str, Any],
+                        context: ExecutionContext) -> Dict[str, Any]:
+        """Execute one component within its time budget and build its trace entry"""
+        timestamp = datetime.now().isoformat()
+        budget = self._component_budget(component, context)
+        memo_key = await self._memo_key(component, node_input)
+        cached = memo_cache.get(memo_key, component.type.value) if memo_key else None
+        
+        with tracer.start_span("component.execute", component_id=component.id,
+                               component_type=component.type.value, timeout_seconds=budget,
+                               cache_hit=cached is not None if memo_key else None) as span:
+            try:
+                if cached is not None:
+                    step_result = cached
+                elif budget <= 0:
+                    raise asyncio.TimeoutError()
+                else:
+                    step_result = await asyncio.wait_for(self._execute_component(component, node_input), budget)
+                status = "completed" if step_result.get("success", True) else "failed"
+            except asyncio.TimeoutError:
+                step_result = {
+                    "success": False,
+                    "error": f"Component timed out after {max(budget, 0):.1f}s"
+                }
+                status = "timed_out"
+            span.set_attribute("status", status)
+        
+        if memo_key and cached is None and status == "completed":
+            memo_cache.set(memo_key, step_result)
+        
+        COMPONENT_DURATION.observe(span.duration_ms / 1000, component_type=component.type.value,
+                                   success=str(step_result.get("success", True)).lower())
+        
+        return {
+            "component_id": component.id,
+            "component_type": component.type,
+            "timestamp": timestamp,
+            "duration_ms": span.duration_ms,
+            "status": status,
+            "cached": cached is not None,
+            "input": node_input,
+            "output": step_result,
+            "success": step_result.get("success", True)
+        }
+    
+    async def _memo_key(self, component: ComponentConfig, node_input: Dict[str, Any]) -> Optional[str]:
+        """Cache key for a deterministic component, or None if it must always run"""
+        spec = component_registry.get(component.type)
+        if not spec or not spec.deterministic or not memo_cache.enabled:
+            return None
+        if component.data.get("memoize") is False:
+            return None
+        
+        config = {key: value for key, value in component.data.items() if key != "timeout_seconds"}
+        inputs = {key: node_input.get(key) for key in spec.inputs}
+        inputs["workflow_id"] = node_input.get("workflow_id")
+        data_version = await spec.data_version(component.data) if spec.data_version else None
+        return memo_cache.make_key(component.type.value, config, inputs, data_version)
+    
+    def _component_budget(self, component: ComponentConfig, context: ExecutionContext) -> float:
+        """Seconds this component may run: its own budget capped by the execution deadline"""
+        spec = component_registry.get(component.type)
+        budget = component.data.get("timeout_seconds") or (spec.timeout_seconds if spec else None)
+        remaining = context.remaining()
+        return min(float(budget), remaining) if budget else remaining
+    
+    def _usage(self, steps: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Token counts summed over the LLM steps of an execution"""
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        for step in steps:
+            step_usage = (step["output"].get("llm_metadata") or {}).get("usage") or {}
+            for key in usage:
+                usage[key] += step_usage.get(key, 0)
+        return usage
+    
+    def _interruption_error(self, context: ExecutionContext) -> str:
+        for step in context.steps:
+            if step["status"] == context.status:
+                return step["output"].get("error", "")
+        if context.status == "cancelled":
+            return "Execution cancelled"
+        return f"Execution exceeded its {context.timeout_seconds:.1f}s deadline"
+    
+    def _merge_states(self, base: Dict[str, Any], states: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge upstream states in execution order.
+
+        Later states win on conflicting keys, except for JOINED_KEYS whose
+        distinct non-empty values are concatenated so parallel branches can
+        both contribute context.
+        """
+        merged = dict(base)
+        joined = {key: [] for key in JOINED_KEYS}
+        
+        for state in states:
+            merged.update(state)
+            for key in JOINED_KEYS:
+                value = state.get(key)
+                if value and value not in joined[key]:
+                    joined[key].append(value)
+        
+        for key, values in joined.items():
+            if len(values) > 1:
+                merged[key] = "\n\n".join(values)
+        
+        return merged
+    
     def _validate_workflow(self, components: List[ComponentConfig], connections: List[WorkflowConnection]) -> bool:
         """Validate that the workflow is properly configured"""
-        component_types = [c.type for c in components]
+        component_types = {c.type for c in components}
         required_types = [ComponentType.USER_QUERY, ComponentType.OUTPUT]
         
         for required_type in required_types:
             if required_type not in component_types:
                 return False
         
-        component_ids = [c.id for c in components]
+        component_ids = {c.id for c in components}
         
         for connection in connections:
             if connection.source not in component_ids or connection.target not in component_ids:
@@ -89,11 +455,11 @@ class WorkflowExecutor:
             in_degree[connection.target] += 1
         
         # Topological sort
-        queue = [comp_id for comp_id, degree in in_degree.items() if degree == 0]
+        queue = deque(comp_id for comp_id, degree in in_degree.items() if degree == 0)
         execution_order = []
         
         while queue:
-            current = queue.pop(0)
+            current = queue.popleft()
             execution_order.append(current)
             
             for neighbor in graph[current]:
@@ -104,126 +470,16 @@ class WorkflowExecutor:
         return execution_order
     
     async def _execute_component(self, component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a single component"""
-        
-        if component.type == ComponentType.USER_QUERY:
-            return await self._execute_user_query_component(component, current_data)
+        """Execute a single component through its registered executor"""
+        spec = component_registry.get(component.type)
         
-        elif component.type == ComponentType.KNOWLEDGE_BASE:
-            return await self._execute_knowledge_base_component(component, current_data)
-        
-        elif component.type == ComponentType.LLM_ENGINE:
-            return await self._execute_llm_engine_component(component, current_data)
-        
-        elif component.type == ComponentType.OUTPUT:
-            return await self._execute_output_component(component, current_data)
-        
-        else:
+        if spec is None:
             return {
                 "success": False,
                 "error": f"Unknown component type: {component.type}"
             }
-    
-    async def _execute_user_query_component(self, component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute user query component"""
-        return {
-            "success": True,
-            "query": current_data.get("query", ""),
-            "component_output": "Query received and processed"
-        }
-    
-    async def _execute_knowledge_base_component(self, component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute knowledge base component"""
-        try:
-            query = current_data.get("query", "")
-            workflow_id = current_data.get("workflow_id")
-            config = component.data
-            
-            collection_name = config.get("collection_name", "documents")
-            max_results = config.get("max_results", 3) 
-            
-            results = chroma_service.query_documents(
-                collection_name=collection_name,
-                query=query,
-                n_results=max_results,
-                workflow_id=workflow_id 
-            )
-            
-            context = "\n\n".join(results["documents"])
-            
-            return {
-                "success": True,
-                "context": context,
-                "retrieved_documents": len(results["documents"]),
-                "component_output": f"Retrieved {len(results['documents'])} relevant documents for workflow {workflow_id if workflow_id else 'all'}"
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"Knowledge base component error: {str(e)}",
-                "context": ""
-            }
-    
-    async def _execute_llm_engine_component(self, component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute LLM engine component"""
-        try:
-            query = current_data.get("query", "")
-            context = current_data.get("context", "")
-            config = component.data
-            
-            # Get configuration with smart provider detection
-            provider_name = config.get("provider")
-            model = config.get("model")
-            
-            # Auto-detect provider if not specified
-            if not provider_name and model:
-                if "gemini" in model.lower() or "bard" in model.lower():
-                    provider_name = "gemini"
-                elif "gpt" in model.lower() or "davinci" in model.lower() or "curie" in model.lower():
-                    provider_name = "openai"
-                else:
-                    provider_name = "gemini"  # Default to free Gemini
-            elif not provider_name:
-                provider_name = "gemini"  # Default to free Gemini
-                
-            provider = LLMProvider(provider_name)
-            custom_prompt = config.get("custom_prompt")
-            use_web_search = config.get("use_web_search", False)
-            
-            # Generate response
-            llm_result = await llm_service.generate_response(
-                query=query,
-                context=context if context else None,
-                custom_prompt=custom_prompt,
-                provider=provider,
-                model=model,
-                use_web_search=use_web_search
-            )
-            
-            return {
-                "success": llm_result["metadata"]["success"],
-                "response": llm_result["response"],
-                "llm_metadata": llm_result["metadata"],
-                "component_output": "LLM response generated"
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"LLM engine component error: {str(e)}",
-                "response": f"Error: {str(e)}"
-            }
-    
-    async def _execute_output_component(self, component: ComponentConfig, current_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute output component"""
-        response = current_data.get("response", "No response available")
         
-        return {
-            "success": True,
-            "final_response": response,
-            "component_output": "Response formatted for output"
-        }
+        return await spec.executor(component, current_data)
 
 # Global instance
 workflow_executor = WorkflowExecutor()
\ No newline at end of file
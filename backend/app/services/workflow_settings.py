@@ -0,0 +1,31 @@
+from typing import Any
+import math
+
+TRUE_VALUES = ("1", "true", "yes")
+FALSE_VALUES = ("0", "false", "no")
+
+def parse_setting(name: str, value: Any, default: Any) -> Any:
+    """A per-workflow override converted to the type of its default; ValueError if it does not fit.
+
+    Booleans accept true/false, yes/no and 1/0 (``bool("false")`` would be
+    True). Numbers must be finite and non-negative, and whole for integers.
+    """
+    if isinstance(default, bool):
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f"Invalid {name} setting {value!r}: expected true or false")
+    if isinstance(default, (int, float)):
+        try:
+            number = float(value) if not isinstance(value, bool) else math.nan
+        except (TypeError, ValueError):
+            number = math.nan
+        if not math.isfinite(number) or number < 0 or (isinstance(default, int) and not number.is_integer()):
+            kind = "whole number" if isinstance(default, int) else "number"
+            raise ValueError(f"Invalid {name} setting {value!r}: expected a non-negative {kind}")
+        return type(default)(number)
+    if not isinstance(value, type(default)):
+        raise ValueError(f"Invalid {name} setting {value!r}: expected a {type(default).__name__}")
+    return value
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the workflow engine.
+
+All scenarios use the in-process mock LLM provider, so they need no API keys
+or network access. Run from the backend directory:
+
+    python benchmark.py concurrency --executions 500
+    python benchmark.py parallel --branches 4
+    python benchmark.py plan --nodes 200
+    python benchmark.py db --requests 500 --concurrency 50 --latency-ms 2
+    python benchmark.py sqlite --requests 1000 --concurrency 50
+    python benchmark.py startup --runs 3
+    python benchmark.py workers --workers 1,2,4 --requests 400
+    python benchmark.py fairness --duration 10 --capacity 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+
+from app.schemas.workflow import ComponentConfig, WorkflowConnection, ComponentType
+from app.services.llm_service import llm_service
+from app.services.workflow_executor import workflow_executor
+from app.services.plan_cache import plan_cache
+from app.services.fair_scheduler import fair_scheduler
+
+def build_linear_workflow():
+    """User query -> mock LLM -> output"""
+    components = [
+        ComponentConfig(id="query", type=ComponentType.USER_QUERY, label="Query", position={"x": 0, "y": 0}, data={}),
+        ComponentConfig(id="llm", type=ComponentType.LLM_ENGINE, label="LLM", position={"x": 200, "y": 0}, data={"provider": "mock"}),
+        ComponentConfig(id="output", type=ComponentType.OUTPUT, label="Output", position={"x": 400, "y": 0}, data={}),
+    ]
+    connections = [
+        WorkflowConnection(id="e1", source="query", target="llm"),
+        WorkflowConnection(id="e2", source="llm", target="output"),
+    ]
+    return components, connections
+
+def build_fan_in_workflow(branches: int):
+    """User query -> N independent mock LLM branches -> summarizing mock LLM -> output"""
+    components = [
+        ComponentConfig(id="query", type=ComponentType.USER_QUERY, label="Query", position={"x": 0, "y": 0}, data={}),
+        ComponentConfig(id="summary", type=ComponentType.LLM_ENGINE, label="Summary", position={"x": 400, "y": 0}, data={"provider": "mock"}),
+        ComponentConfig(id="output", type=ComponentType.OUTPUT, label="Output", position={"x": 600, "y": 0}, data={}),
+    ]
+    connections = [WorkflowConnection(id="e_out", source="summary", target="output")]
+    for i in range(branches):
+        branch_id = f"branch_{i}"
+        components.append(ComponentConfig(
+            id=branch_id, type=ComponentType.LLM_ENGINE, label=f"Branch {i}",
+            position={"x": 200, "y": i * 100}, data={"provider": "mock", "custom_prompt": f"Branch {i}"}
+        ))
+        connections.append(WorkflowConnection(id=f"e_in_{i}", source="query", target=branch_id))
+        connections.append(WorkflowConnection(id=f"e_join_{i}", source=branch_id, target="summary"))
+    return components, connections
+
+async def run_parallel(branches: int):
+    """Compare sequential and parallel scheduling of independent branches"""
+    components, connections = build_fan_in_workflow(branches)
+    timings = {}
+
+    for max_parallelism in (1, branches):
+        start = time.perf_counter()
+        result = await workflow_executor.execute_workflow(
+            components, connections, "parallel benchmark", max_parallelism=max_parallelism
+        )
+        timings[max_parallelism] = time.perf_counter() - start
+        print(f"max_parallelism={max_parallelism}: {timings[max_parallelism]:.2f}s "
+              f"({len(result['execution_steps'])} steps)")
+
+    print(f"Speedup: {timings[1] / timings[branches]:.2f}x")
+    return True
+
+def build_stored_workflow(nodes: int):
+    """A Workflow-like row with JSON components: query -> (nodes - 2) LLM layers -> output"""
+    def component(cid, ctype):
+        return {"id": cid, "type": ctype, "label": cid, "position": {"x": 0, "y": 0}, "data": {"provider": "mock"}}
+
+    components = [component("query", "user_query")]
+    components += [component(f"llm_{i}", "llm_engine") for i in range(nodes - 2)]
+    components.append(component("output", "output"))
+    ids = [c["id"] for c in components]
+    connections = [
+        {"id": f"e_{i}", "source": ids[i], "target": ids[i + 1]}
+        for i in range(len(ids) - 1)
+    ]
+    return SimpleNamespace(id=1, updated_at=None, components=components, connections=connections)
+
+def run_plan(nodes: int, iterations: int):
+    """Per-message setup cost: rebuilding from JSON versus a cached compiled plan"""
+    workflow = build_stored_workflow(nodes)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        components = [ComponentConfig(**comp) for comp in workflow.components]
+        connections = [WorkflowConnection(**conn) for conn in workflow.connections]
+        workflow_executor._validate_workflow(components, connections)
+        order = workflow_executor._get_execution_order(components, connections)
+        for component_id in order:
+            next(c for c in components if c.id == component_id)
+    rebuild = (time.perf_counter() - start) / iterations
+
+    plan_cache.clear()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        plan = plan_cache.get_plan(workflow)
+        for component_id in plan.order:
+            plan.components[component_id]
+    cached = (time.perf_counter() - start) / iterations
+
+    print(f"Nodes: {nodes}")
+    print(f"Rebuild per message: {rebuild * 1000:.3f}ms")
+    print(f"Cached plan per message: {cached * 1000:.3f}ms")
+    print(f"Speedup: {rebuild / cached:.1f}x")
+    return True
+
+async def run_concurrency(executions: int):
+    """Run many executions at once and check that every trace only contains its own query"""
+    components, connections = build_linear_workflow()
+    queries = [f"question number {i}" for i in range(executions)]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        workflow_executor.execute_workflow(components, connections, query)
+        for query in queries
+    ])
+    elapsed = time.perf_counter() - start
+
+    corrupted = 0
+    for query, result in zip(queries, results):
+        steps = result["execution_steps"]
+        if len(steps) != len(components) or any(step["input"]["query"] != query for step in steps):
+            corrupted += 1
+
+    print(f"Executions: {executions}")
+    print(f"Wall time: {elapsed:.2f}s")
+    print(f"Corrupted traces: {corrupted}")
+    return corrupted == 0
+
+def _simulate_round_trip(sync_engine, latency_ms: float, blocking: bool):
+    """Add a network round trip to every statement, as a remote database would"""
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def round_trip(*args):
+        if blocking:
+            time.sleep(latency_ms / 1000)
+        else:
+            await_only(asyncio.sleep(latency_ms / 1000))
+
+async def run_db(requests: int, concurrency: int, latency_ms: float):
+    """Chat-shaped request throughput with blocking Sessions versus AsyncSessions"""
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    from app.database import Base
+    from app.models import Workflow, ChatSession, ChatMessage
+
+    directory = tempfile.mkdtemp()
+    results = {}
+
+    for mode in ("sync", "async"):
+        path = os.path.join(directory, f"{mode}.db")
+        setup = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(setup)
+        with sessionmaker(bind=setup)() as db:
+            db.add(Workflow(id=1, name="bench", components=[], connections=[], is_valid=True))
+            db.add(ChatSession(workflow_id=1, session_id="bench"))
+            db.commit()
+        setup.dispose()
+
+        pool = {"pool_size": concurrency, "max_overflow": 0, "connect_args": {"timeout": 30}}
+        if mode == "sync":
+            engine = create_engine(f"sqlite:///{path}", **pool)
+            _simulate_round_trip(engine, latency_ms, blocking=True)
+            Session = sessionmaker(bind=engine)
+
+            async def handle(i):
+                # What the routes did before: blocking calls inside async def
+                with Session() as db:
+                    db.get(Workflow, 1)
+                    db.add(ChatMessage(session_id="bench", message_type="user", content=f"message {i}"))
+                    db.commit()
+                    db.execute(select(ChatMessage).where(ChatMessage.session_id == "bench").limit(20)).all()
+        else:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, **pool)
+            _simulate_round_trip(engine.sync_engine, latency_ms, blocking=False)
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+
+            async def handle(i):
+                async with Session() as db:
+                    await db.get(Workflow, 1)
+                    db.add(ChatMessage(session_id="bench", message_type="user", content=f"message {i}"))
+                    await db.commit()
+                    (await db.execute(select(ChatMessage).where(ChatMessage.session_id == "bench").limit(20))).all()
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(i):
+            async with semaphore:
+                await handle(i)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[limited(i) for i in range(requests)])
+        elapsed = time.perf_counter() - start
+        results[mode] = requests / elapsed
+
+        if mode == "sync":
+            engine.dispose()
+        else:
+            await engine.dispose()
+        print(f"{mode:>5}: {results[mode]:.0f} req/s ({elapsed:.2f}s for {requests} requests)")
+
+    print(f"Speedup: {results['async'] / results['sync']:.2f}x "
+          f"(concurrency {concurrency}, {latency_ms}ms per statement)")
+    return True
+
+async def run_sqlite(requests: int, concurrency: int):
+    """Concurrent chat writes on SQLite: default settings versus the WAL profile"""
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    from app.database import Base, create_sqlite_engines, routing_sessionmaker
+    from app.models import Workflow, ChatSession, ChatMessage
+
+    directory = tempfile.mkdtemp()
+
+    for profile in ("default", "wal"):
+        path = os.path.join(directory, f"{profile}.db")
+        setup = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(setup)
+        with sessionmaker(bind=setup)() as db:
+            db.add(Workflow(id=1, name="bench", components=[], connections=[], is_valid=True))
+            db.add(ChatSession(workflow_id=1, session_id="bench"))
+            db.commit()
+        setup.dispose()
+
+        url = f"sqlite+aiosqlite:///{path}"
+        if profile == "default":
+            engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=concurrency, max_overflow=0)
+            engines = [engine]
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+        else:
+            engines = list(create_sqlite_engines(url, read_pool_size=8))
+            Session = routing_sessionmaker(*engines)
+
+        errors = 0
+
+        async def handle(i):
+            # send_message: read workflow and session, store both messages, then a history read
+            nonlocal errors
+            try:
+                async with Session() as db:
+                    await db.get(Workflow, 1)
+                    (await db.execute(select(ChatSession).where(ChatSession.session_id == "bench"))).scalars().first()
+                    db.add(ChatMessage(session_id="bench", message_type="user", content=f"question {i}"))
+                    await db.commit()
+                    db.add(ChatMessage(session_id="bench", message_type="assistant", content=f"answer {i}"))
+                    await db.commit()
+                    (await db.execute(
+                        select(ChatMessage).where(ChatMessage.session_id == "bench")
+                        .order_by(ChatMessage.created_at.desc()).limit(20)
+                    )).all()
+            except OperationalError:
+                errors += 1
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(i):
+            async with semaphore:
+                await handle(i)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[limited(i) for i in range(requests)])
+        elapsed = time.perf_counter() - start
+        for engine in engines:
+            await engine.dispose()
+
+        print(f"{profile:>7}: {(requests - errors) / elapsed:.0f} req/s, "
+              f"{errors} 'database is locked' errors ({elapsed:.2f}s for {requests} requests)")
+    return True
+
+STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    up = time.perf_counter()
+    while client.get("/ready").status_code != 200 and time.perf_counter() - up < 60:
+        time.sleep(0.01)
+    ready = time.perf_counter()
+    report = client.get("/ready").json()
+print(json.dumps({
+    "import_s": imported - started, "startup_s": up - imported, "ready_s": ready - started,
+    "warm_ms": {name: dep.get("duration_ms") for name, dep in report["dependencies"].items()}
+}))
+"""
+
+def run_startup(runs: int):
+    """Time a fresh interpreter importing the app, running startup and reaching /ready"""
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, CHROMA_PERSIST_DIRECTORY=os.path.join(directory, "chroma"),
+               PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", STARTUP_PROBE], cwd=directory, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in ("import_s", "startup_s", "ready_s"):
+        values = sorted(sample[key] for sample in samples)
+        print(f"{key[:-2]:>8}: median {values[len(values) // 2]:.2f}s (min {values[0]:.2f}s, max {values[-1]:.2f}s)")
+    print(f"warm-up (last run, ms): {samples[-1]['warm_ms']}")
+    return True
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+async def run_fairness(duration: float, capacity: int, tenant_limit: int, heavy_concurrency: int,
+                       light_tenants: int, light_rate: float):
+    """Latency of light tenants while one heavy tenant keeps the executor saturated"""
+    components, connections = build_linear_workflow()
+    plan = workflow_executor.compile_plan(components, connections)
+    fair_scheduler.capacity = capacity
+    tenant_limit = tenant_limit if tenant_limit is not None else capacity - capacity // 4
+
+    async def scenario(heavy: bool, fair: bool, limit: int):
+        fair_scheduler.default_max_in_flight = limit
+        arrivals = random.Random(7)
+        latencies = []
+        heavy_done = 0
+        deadline = time.perf_counter() + duration
+
+        async def heavy_client():
+            nonlocal heavy_done
+            while time.perf_counter() < deadline:
+                await workflow_executor.execute_plan(plan, "batch item", tenant="heavy")
+                heavy_done += 1
+
+        async def light_client(tenant: int):
+            requests = []
+            while time.perf_counter() < deadline:
+                requests.append(asyncio.create_task(light_request(tenant)))
+                # Poisson arrivals, so light requests sometimes overlap
+                await asyncio.sleep(arrivals.expovariate(light_rate))
+            await asyncio.gather(*requests)
+
+        async def light_request(tenant: int):
+            start = time.perf_counter()
+            # First-come-first-served is the same scheduler with everyone in one queue
+            await workflow_executor.execute_plan(plan, "interactive question",
+                                                 tenant=f"light-{tenant}" if fair else "heavy")
+            latencies.append(time.perf_counter() - start)
+
+        clients = [light_client(i) for i in range(light_tenants)]
+        if heavy:
+            clients += [heavy_client() for _ in range(heavy_concurrency)]
+        await asyncio.gather(*clients)
+        return latencies, heavy_done / duration
+
+    print(f"capacity {capacity} slots, {light_tenants} light tenants at {light_rate:g} req/s each, "
+          f"heavy tenant with {heavy_concurrency} concurrent runs")
+    scenarios = (
+        ("light only", False, True, tenant_limit),
+        ("heavy, FCFS", True, False, capacity),
+        ("heavy, fair, no cap", True, True, capacity),
+        (f"heavy, fair, cap {tenant_limit}", True, True, tenant_limit)
+    )
+    for label, heavy, fair, limit in scenarios:
+        latencies, heavy_throughput = await scenario(heavy, fair, limit)
+        print(f"{label:>24}: light p50 {_percentile(latencies, 0.5) * 1000:6.0f}ms  "
+              f"p99 {_percentile(latencies, 0.99) * 1000:6.0f}ms  heavy {heavy_throughput:5.1f} runs/s")
+    return True
+
+def _wait_until_ready(base_url: str, timeout: float = 120):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{base_url} was not ready within {timeout:.0f}s")
+
+async def _drive_chat(base_url: str, requests: int, concurrency: int) -> float:
+    """Send chat messages through query -> knowledge base -> mock LLM; returns requests per second"""
+    import httpx
+
+    components = [
+        {"id": "query", "type": "user_query", "label": "Query", "position": {"x": 0, "y": 0}, "data": {}},
+        {"id": "kb", "type": "knowledge_base", "label": "KB", "position": {"x": 200, "y": 0}, "data": {"memoize": False}},
+        {"id": "llm", "type": "llm_engine", "label": "LLM", "position": {"x": 400, "y": 0}, "data": {"provider": "mock"}},
+        {"id": "output", "type": "output", "label": "Output", "position": {"x": 600, "y": 0}, "data": {}},
+    ]
+    connections = [
+        {"id": "e1", "source": "query", "target": "kb"},
+        {"id": "e2", "source": "kb", "target": "llm"},
+        {"id": "e3", "source": "llm", "target": "output"},
+    ]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        workflow = (await client.post("/workflows/", json={
+            "name": "workers benchmark", "components": components, "connections": connections
+        })).json()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(i):
+            async with semaphore:
+                response = await client.post("/chat/", json={"message": f"question {i}", "workflow_id": workflow["id"]})
+                response.raise_for_status()
+
+        # Let every worker load the workflow and open its connections first
+        await asyncio.gather(*[send(i) for i in range(concurrency)])
+        start = time.perf_counter()
+        await asyncio.gather(*[send(i) for i in range(requests)])
+        return requests / (time.perf_counter() - start)
+
+def run_workers(worker_counts, requests: int, concurrency: int, port: int, ttft_ms: float, tokens_per_sec: float):
+    """Chat throughput of serve.py with 1..N workers sharing one Chroma server"""
+    backend = os.path.dirname(os.path.abspath(__file__))
+    print(f"CPU cores: {os.cpu_count()} (throughput can only scale up to about this many workers)")
+    baseline = None
+    for workers in worker_counts:
+        directory = tempfile.mkdtemp()
+        env = dict(os.environ, PYTHONPATH=backend, CHROMA_PERSIST_DIRECTORY=os.path.join(directory, "chroma"),
+                   MOCK_LLM_TTFT_MS=str(ttft_ms), MOCK_LLM_TOKENS_PER_SEC=str(tokens_per_sec),
+                   RETENTION_ENABLED="false")
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(backend, "serve.py"), "--workers", str(workers),
+             "--port", str(port), "--chroma-port", str(port + 1)],
+            cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            _wait_until_ready(base_url)
+            throughput = asyncio.run(_drive_chat(base_url, requests, concurrency))
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=30)
+
+        baseline = baseline or throughput
+        print(f"{workers} worker(s): {throughput:.0f} req/s ({throughput / baseline:.2f}x)")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Workflow engine benchmarks")
+    parser.add_argument("--ttft-ms", type=float, default=200, help="Mock time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=200, help="Mock generation rate")
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    concurrency = subparsers.add_parser("concurrency", help="Concurrent executions with isolated traces")
+    concurrency.add_argument("--executions", type=int, default=500)
+
+    parallel = subparsers.add_parser("parallel", help="Independent branches run concurrently")
+    parallel.add_argument("--branches", type=int, default=4)
+
+    plan = subparsers.add_parser("plan", help="Per-message overhead of compiled plans")
+    plan.add_argument("--nodes", type=int, default=200)
+    plan.add_argument("--iterations", type=int, default=200)
+
+    db = subparsers.add_parser("db", help="Request throughput with blocking vs async database sessions")
+    db.add_argument("--requests", type=int, default=500)
+    db.add_argument("--concurrency", type=int, default=50)
+    db.add_argument("--latency-ms", type=float, default=2, help="Simulated network round trip per statement")
+
+    sqlite = subparsers.add_parser("sqlite", help="Concurrent chat writes with and without the SQLite profile")
+    sqlite.add_argument("--requests", type=int, default=1000)
+    sqlite.add_argument("--concurrency", type=int, default=50)
+
+    startup = subparsers.add_parser("startup", help="Import, startup and time-to-ready of a fresh process")
+    startup.add_argument("--runs", type=int, default=3)
+
+    workers = subparsers.add_parser("workers", help="Chat throughput as API workers are added")
+    workers.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    workers.add_argument("--requests", type=int, default=400)
+    workers.add_argument("--concurrency", type=int, default=32)
+    workers.add_argument("--port", type=int, default=8100, help="API port; Chroma uses the next one")
+
+    fairness = subparsers.add_parser("fairness", help="Light tenant latency next to a saturating heavy tenant")
+    fairness.add_argument("--duration", type=float, default=10)
+    fairness.add_argument("--capacity", type=int, default=8)
+    fairness.add_argument("--tenant-limit", type=int, default=None,
+                          help="Slots one tenant may hold (default three quarters of capacity)")
+    fairness.add_argument("--heavy-concurrency", type=int, default=32)
+    fairness.add_argument("--light-tenants", type=int, default=3)
+    fairness.add_argument("--light-rate", type=float, default=1, help="Requests per second per light tenant")
+
+    args = parser.parse_args()
+    llm_service.mock_settings.time_to_first_token_ms = args.ttft_ms
+    llm_service.mock_settings.tokens_per_second = args.tokens_per_sec
+
+    if args.scenario == "concurrency":
+        ok = asyncio.run(run_concurrency(args.executions))
+    elif args.scenario == "parallel":
+        ok = asyncio.run(run_parallel(args.branches))
+    elif args.scenario == "plan":
+        ok = run_plan(args.nodes, args.iterations)
+    elif args.scenario == "db":
+        ok = asyncio.run(run_db(args.requests, args.concurrency, args.latency_ms))
+    elif args.scenario == "sqlite":
+        ok = asyncio.run(run_sqlite(args.requests, args.concurrency))
+    elif args.scenario == "startup":
+        ok = run_startup(args.runs)
+    elif args.scenario == "fairness":
+        ok = asyncio.run(run_fairness(args.duration, args.capacity, args.tenant_limit, args.heavy_concurrency,
+                                      args.light_tenants, args.light_rate))
+    elif args.scenario == "workers":
+        ok = run_workers([int(n) for n in args.workers.split(",")], args.requests, args.concurrency,
+                         args.port, args.ttft_ms, args.tokens_per_sec)
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
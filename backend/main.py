@@ -1,6 +1,12 @@
+import time
+
+# Process start, for the import and time-to-ready numbers reported by /ready
+STARTED_AT = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, JSONResponse
 import os
 from pathlib import Path
 
@@ -11,6 +17,10 @@ from app.routers.documents import router as documents_router
 from app.routers.workflows import router as workflows_router
 from app.routers.chat import router as chat_router
 from app.routers.components import router as components_router
+from app.routers.executions import router as executions_router
+from app.services.tracing import tracer
+from app.services.metrics import metrics, HTTP_REQUEST_DURATION
+from app.services.readiness import readiness
 
 app = FastAPI(
     title="No-Code Workflow Builder API",
@@ -24,17 +34,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+class TraceRequestsMiddleware:
+    """Open a root tracing span and record route latency for every request.
+
+    Plain ASGI rather than ``@app.middleware("http")``: BaseHTTPMiddleware
+    gives the endpoint its own receive channel, so ``request.is_disconnected()``
+    would never see the client go away and disconnect cancellation could not fire.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        with tracer.start_span(f"{method} {scope['path']}", http_method=method) as span:
+            async def send_with_status(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    span.set_attribute("http_status_code", status_code)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # The router records the matched route in the shared scope
+                route = scope.get("route")
+                HTTP_REQUEST_DURATION.observe(
+                    span.duration_ms / 1000,
+                    method=method,
+                    route=getattr(route, "path", "unmatched"),
+                    status=str(status_code)
+                )
+
+app.add_middleware(TraceRequestsMiddleware)
+
 app.include_router(documents_router)
 app.include_router(workflows_router)
 app.include_router(chat_router)
 app.include_router(components_router)
+app.include_router(executions_router)
 
 uploads_dir = Path("uploads")
 uploads_dir.mkdir(exist_ok=True)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
+readiness.record("import", time.perf_counter() - STARTED_AT)
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -49,18 +103,57 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once required dependencies are warm, 503 until then"""
+    report = readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics in text exposition format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 async def startup_event():
-    """Create database tables on startup"""
+    """Create database tables, start background tasks and begin warming dependencies"""
+    startup_started = time.perf_counter()
     try:
-        from app.database import engine, Base
-        from app.models import Document, Workflow, WorkflowExecution, ChatSession, ChatMessage
+        from app.database import write_engine, Base
+        from app.models import Document, Workflow, WorkflowExecution, WorkflowExecutionTrace, WorkflowBatch, ExecutionJob, ChatSession, ChatMessage, IdempotencyKey
+        from sqlalchemy import update
         
-        Base.metadata.create_all(bind=engine)
+        async with write_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            # Sessions written before updated_at was set on insert; the session listing pages on it
+            await conn.execute(
+                update(ChatSession).where(ChatSession.updated_at.is_(None)).values(updated_at=ChatSession.created_at)
+            )
         print("Database tables created successfully")
         
     except Exception as e:
         print(f"Error creating database tables: {e}")
+    
+    from app.services.chat_store import chat_store
+    from app.services.retention import retention
+    chat_store.start()
+    retention.start()
+    readiness.record("startup", time.perf_counter() - startup_started)
+    readiness.start(STARTED_AT)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write buffered chat rows, then close pooled database connections"""
+    from app.database import engine, write_engine
+    from app.services.chat_store import chat_store
+    from app.services.retention import retention
+    from app.services.chat_memory import chat_memory
+    await readiness.close()
+    await retention.close()
+    await chat_memory.close()
+    await chat_store.close()
+    await engine.dispose()
+    await write_engine.dispose()
 
 if __name__ == "__main__":
     import uvicorn
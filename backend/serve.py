@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Run the API with several worker processes.
+
+The persistent vector store can only be opened by one process, so this
+starts a single local Chroma server and points every API worker at it
+(CHROMA_MODE=http). The database tables are created once, before the
+workers fork. Run from the backend directory:
+
+    python serve.py --workers 4
+    python serve.py --workers 4 --chroma-host 10.0.0.5 --external-chroma
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+
+def start_chroma(host: str, port: int, persist_directory: str) -> subprocess.Popen:
+    env = dict(os.environ, IS_PERSISTENT="TRUE", PERSIST_DIRECTORY=persist_directory,
+               ANONYMIZED_TELEMETRY="False")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "chromadb.app:app", "--host", host, "--port", str(port),
+         "--log-level", "warning"],
+        env=env
+    )
+
+def wait_for_chroma(host: str, port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://{host}:{port}/api/v1/heartbeat", timeout=2):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Chroma server on {host}:{port} did not come up within {timeout:.0f}s")
+            time.sleep(0.2)
+
+async def create_tables():
+    from app.database import write_engine, Base
+    import app.models  # noqa: F401 - registers the tables
+
+    async with write_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await write_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with several workers and a shared vector store")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--chroma-host", default=os.getenv("CHROMA_HOST", "127.0.0.1"))
+    parser.add_argument("--chroma-port", type=int, default=int(os.getenv("CHROMA_PORT", "8001")))
+    parser.add_argument("--external-chroma", action="store_true", help="Use an already running Chroma server")
+    args = parser.parse_args()
+
+    os.environ.update(CHROMA_MODE="http", CHROMA_HOST=args.chroma_host, CHROMA_PORT=str(args.chroma_port))
+
+    chroma = None
+    if not args.external_chroma:
+        chroma = start_chroma(args.chroma_host, args.chroma_port,
+                              os.path.abspath(os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")))
+    try:
+        wait_for_chroma(args.chroma_host, args.chroma_port)
+        asyncio.run(create_tables())
+
+        import uvicorn
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        if chroma is not None:
+            chroma.terminate()
+            chroma.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
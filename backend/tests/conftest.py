@@ -0,0 +1,68 @@
+"""
+Shared fixtures. Run from the backend directory:
+
+    python -m pytest -q
+
+The app runs against a SQLite database and a Chroma directory in a
+temporary working directory, with the mock LLM provider.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+os.environ.setdefault("USE_SQLITE", "true")
+os.environ.setdefault("RETENTION_ENABLED", "false")
+
+import pytest
+
+def pytest_sessionstart(session):
+    """Move to a scratch directory before test modules import the app.
+
+    The database, Chroma directory and uploads are relative to the working
+    directory, and the SQLite path is made absolute when the engine is
+    created, so this has to happen before collection.
+    """
+    os.chdir(tempfile.mkdtemp(prefix="workflow-tests-"))
+
+def linear_workflow():
+    """user_query -> llm_engine (mock) -> output"""
+    components = [
+        {"id": "query", "type": "user_query", "label": "Query", "position": {"x": 0, "y": 0}, "data": {}},
+        {"id": "llm", "type": "llm_engine", "label": "LLM", "position": {"x": 0, "y": 0},
+         "data": {"provider": "mock"}},
+        {"id": "output", "type": "output", "label": "Output", "position": {"x": 0, "y": 0}, "data": {}}
+    ]
+    connections = [
+        {"id": "e1", "source": "query", "target": "llm"},
+        {"id": "e2", "source": "llm", "target": "output"}
+    ]
+    return components, connections
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def mock_llm():
+    """The mock provider's settings, fast by default and restored after the test"""
+    from app.services.llm_service import llm_service
+
+    settings = llm_service.mock_settings
+    saved = (settings.time_to_first_token_ms, settings.tokens_per_second)
+    settings.time_to_first_token_ms, settings.tokens_per_second = 1, 100000
+    yield settings
+    settings.time_to_first_token_ms, settings.tokens_per_second = saved
+
+@pytest.fixture
+def workflow_id(client, mock_llm):
+    components, connections = linear_workflow()
+    response = client.post("/workflows/", json={"name": "test", "components": components, "connections": connections})
+    assert response.status_code == 200
+    return response.json()["id"]
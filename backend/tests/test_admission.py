@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.admission import AdmissionController, admission
+
+async def _hold(controller, workflow_id, release):
+    async with controller.admit(workflow_id):
+        await release.wait()
+
+def _controller(**settings):
+    controller = AdmissionController(**settings)
+    controller.enabled = True
+    return controller
+
+def test_full_queue_is_rejected_with_429_and_retry_after():
+    async def scenario():
+        controller = _controller(initial_limit=1, queue_size=1, queue_timeout=5)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, 1, release))
+        queued = asyncio.create_task(_hold(controller, 1, release))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as rejected:
+            async with controller.admit(1):
+                pass
+        release.set()
+        await asyncio.gather(holder, queued)
+        return rejected.value, controller.in_flight
+
+    rejected, in_flight = asyncio.run(scenario())
+
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert in_flight == 0
+
+def test_queue_timeout_is_rejected_with_429():
+    async def scenario():
+        controller = _controller(initial_limit=1, queue_size=4, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, 1, release))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as rejected:
+            async with controller.admit(1):
+                pass
+        waiting = len(controller._waiting)
+        release.set()
+        await holder
+        return rejected.value, waiting
+
+    rejected, waiting = asyncio.run(scenario())
+
+    assert rejected.status_code == 429
+    assert waiting == 0
+
+def test_capped_workflow_does_not_hold_up_others():
+    async def scenario():
+        controller = _controller(initial_limit=4, workflow_limit=1, queue_size=4, queue_timeout=1)
+        release = asyncio.Event()
+        busy = [asyncio.create_task(_hold(controller, 1, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        async with controller.admit(2):
+            admitted_while_waiting = len(controller._waiting)
+        release.set()
+        await asyncio.gather(*busy)
+        return admitted_while_waiting
+
+    assert asyncio.run(scenario()) == 1
+
+def test_endpoint_returns_429_when_at_capacity(client, workflow_id, monkeypatch):
+    monkeypatch.setattr(admission, "enabled", True)
+    monkeypatch.setattr(admission, "limit", 0)
+    monkeypatch.setattr(admission, "queue_size", 0)
+
+    response = client.post(f"/workflows/{workflow_id}/execute",
+                           json={"workflow_id": workflow_id, "input_query": "hello"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert admission.in_flight == 0
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+import main
+
+async def _post_and_disconnect(path: str, body: dict, disconnect_after: float):
+    """Send a request straight to the ASGI app and drop the connection while it runs"""
+    payload = json.dumps(body).encode("utf-8")
+    body_sent = False
+    disconnected = asyncio.Event()
+    messages = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode("utf-8"), "root_path": "",
+        "query_string": b"", "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80)
+    }
+    asyncio.get_running_loop().call_later(disconnect_after, disconnected.set)
+    await asyncio.wait_for(main.app(scope, receive, send), 10)
+    return messages
+
+def test_client_disconnect_cancels_the_execution(client, workflow_id, mock_llm):
+    mock_llm.time_to_first_token_ms = 6000
+
+    messages = client.portal.call(
+        _post_and_disconnect, f"/workflows/{workflow_id}/execute",
+        {"workflow_id": workflow_id, "input_query": "abandoned"}, 0.3
+    )
+
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    assert start["status"] == 200
+    executions = client.get(f"/workflows/{workflow_id}/executions").json()
+    execution = next(item for item in executions if item["input_query"] == "abandoned")
+    assert execution["status"] == "cancelled"
+    steps = client.get(f"/executions/{execution['id']}/steps").json()["steps"]
+    assert any(step["status"] == "cancelled" for step in steps)
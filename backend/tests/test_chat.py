@@ -0,0 +1,39 @@
+import time
+
+from app.services.chat_store import chat_store
+
+def test_unknown_session_is_404_at_once_on_a_single_worker(client, workflow_id, monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    monkeypatch.setattr(chat_store, "interval", 1)
+
+    started = time.monotonic()
+    response = client.post("/chat/", json={"workflow_id": workflow_id, "message": "hi", "session_id": "missing"})
+
+    assert response.status_code == 404
+    assert time.monotonic() - started < 1
+
+def test_unknown_session_is_checked_again_with_several_workers(client, workflow_id, monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    monkeypatch.setattr(chat_store, "interval", 0.2)
+
+    started = time.monotonic()
+    response = client.post("/chat/", json={"workflow_id": workflow_id, "message": "hi", "session_id": "missing"})
+
+    assert response.status_code == 404
+    assert time.monotonic() - started >= 0.4
+
+def test_sessions_are_listed_by_latest_activity(client, workflow_id):
+    def send(session_id=None):
+        response = client.post("/chat/", json={"workflow_id": workflow_id, "message": "hi", "session_id": session_id})
+        assert response.status_code == 200
+        return response.json()["session_id"]
+
+    older = send()
+    newer = send()
+    send(older)
+
+    first = client.get(f"/chat/workflows/{workflow_id}/sessions", params={"limit": 1})
+    second = client.get(f"/chat/workflows/{workflow_id}/sessions",
+                        params={"limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+
+    assert [session["session_id"] for session in first.json() + second.json()] == [older, newer]
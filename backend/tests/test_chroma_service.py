@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+from app.services.chroma_service import ChromaService
+
+def test_shared_data_version_is_read_off_the_event_loop(monkeypatch):
+    service = ChromaService()
+    monkeypatch.setattr(service, "mode", "http")
+    reads = []
+
+    def slow_read(collection_name):
+        reads.append(collection_name)
+        time.sleep(0.2)
+        return "token"
+    monkeypatch.setattr(service, "_read_version_token", slow_read)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        versions = await asyncio.gather(*[service.data_version("documents") for _ in range(5)])
+        task.cancel()
+        return versions, ticks
+
+    versions, ticks = asyncio.run(scenario())
+
+    assert versions == [(0, "token")] * 5
+    assert reads == ["documents"]
+    # The loop kept running while the version was read
+    assert ticks >= 5
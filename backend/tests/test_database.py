@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import app.database as database
+
+READERS = 2
+RUNS = 6
+
+@pytest.fixture
+def small_reader_pool(client):
+    """Requests read through a pool of READERS connections that gives up quickly"""
+    import main
+
+    reader = create_async_engine(
+        database.engine.url, connect_args={"check_same_thread": False}, poolclass=AsyncAdaptedQueuePool,
+        pool_size=READERS, max_overflow=0, pool_timeout=0.25
+    )
+    session_factory = database.routing_sessionmaker(reader, database.write_engine)
+
+    async def get_db():
+        async with session_factory() as db:
+            yield db
+
+    main.app.dependency_overrides[database.get_db] = get_db
+    yield
+    main.app.dependency_overrides.pop(database.get_db)
+    client.portal.call(reader.dispose)
+
+def _run_concurrently(client, path, body):
+    import main
+
+    async def scenario():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test", timeout=30) as http:
+            started = time.monotonic()
+            responses = await asyncio.gather(*(http.post(path, json=body) for _ in range(RUNS)))
+            return responses, time.monotonic() - started
+
+    return client.portal.call(scenario)
+
+@pytest.mark.parametrize("path,body", [
+    ("/chat/", {"message": "hi"}),
+    ("/workflows/{id}/execute", {"input_query": "hi"})
+])
+def test_runs_do_not_hold_a_reader_connection(client, workflow_id, mock_llm, small_reader_pool, path, body):
+    if not database.USE_SQLITE or not database.SQLITE_PROFILE:
+        pytest.skip("needs the SQLite reader pool")
+    mock_llm.time_to_first_token_ms = 500
+
+    responses, elapsed = _run_concurrently(client, path.format(id=workflow_id), {"workflow_id": workflow_id, **body})
+
+    assert [response.status_code for response in responses] == [200] * RUNS
+    # Holding a reader for the run would take RUNS / READERS rounds, or time out in the pool
+    assert elapsed < 1.4
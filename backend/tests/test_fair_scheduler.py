@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.services.fair_scheduler import FairScheduler
+
+async def _run(scheduler, tenant, order, seconds=0.01):
+    async with scheduler.slot(tenant):
+        order.append(tenant)
+        await asyncio.sleep(seconds)
+
+def test_waiting_tenant_is_served_before_a_backlog():
+    async def scenario():
+        scheduler = FairScheduler(capacity=1, weights={}, limits={})
+        order = []
+        backlog = [asyncio.create_task(_run(scheduler, "heavy", order)) for _ in range(6)]
+        await asyncio.sleep(0)
+        await asyncio.gather(*backlog, _run(scheduler, "light", order))
+        return order
+
+    order = asyncio.run(scenario())
+
+    # The light run waits for at most the heavy runs already tagged ahead of it, not the whole backlog
+    assert order.index("light") <= 2
+
+def test_weights_share_slots_in_proportion():
+    async def scenario():
+        scheduler = FairScheduler(capacity=1, weights={"big": 3, "small": 1}, limits={})
+        order = []
+        blocker = asyncio.create_task(_run(scheduler, "blocker", order))
+        await asyncio.sleep(0)
+        runs = [_run(scheduler, tenant, order) for tenant in ["big"] * 12 + ["small"] * 12]
+        await asyncio.gather(blocker, *runs)
+        return order[1:]
+
+    order = asyncio.run(scenario())
+
+    assert order[:8].count("big") == 6 and order[:8].count("small") == 2
+
+def test_busy_tenant_leaves_slots_for_an_idle_one():
+    async def scenario():
+        scheduler = FairScheduler(capacity=4, weights={}, limits={})
+        heavy = [asyncio.create_task(_run(scheduler, "heavy", [], seconds=0.5)) for _ in range(10)]
+        await asyncio.sleep(0.01)
+        heavy_in_flight = scheduler.in_flight
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await _run(scheduler, "light", [], seconds=0)
+        waited = loop.time() - started
+        for task in heavy:
+            task.cancel()
+        await asyncio.gather(*heavy, return_exceptions=True)
+        return heavy_in_flight, waited, scheduler.in_flight
+
+    heavy_in_flight, waited, in_flight_after = asyncio.run(scenario())
+
+    assert heavy_in_flight == 3
+    assert waited < 0.1
+    assert in_flight_after == 0
+
+def test_slot_wait_times_out_and_leaves_no_state_behind():
+    async def scenario():
+        scheduler = FairScheduler(capacity=1, weights={}, limits={})
+        holder = asyncio.create_task(_run(scheduler, "holder", [], seconds=0.3))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            async with scheduler.slot("late", timeout=0.05):
+                pass
+        queued_while_held = scheduler._waiting
+        await holder
+        return queued_while_held, scheduler.in_flight, set(scheduler._tenants)
+
+    queued, in_flight, tenants = asyncio.run(scenario())
+
+    assert queued == 0
+    assert in_flight == 0
+    assert "late" not in tenants
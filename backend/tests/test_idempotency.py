@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+from app.services.idempotency import IdempotencyStore, idempotency
+
+def _execute(client, workflow_id, key, query="hello"):
+    return client.post(f"/workflows/{workflow_id}/execute", headers={"Idempotency-Key": key},
+                       json={"workflow_id": workflow_id, "input_query": query})
+
+async def _concurrently(workflow_id, key, stagger=0.1):
+    """Two requests with the same key, the second sent while the first is running"""
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        async def send(delay):
+            await asyncio.sleep(delay)
+            return await client.post(f"/workflows/{workflow_id}/execute", headers={"Idempotency-Key": key},
+                                     json={"workflow_id": workflow_id, "input_query": "hello"})
+        return await asyncio.gather(send(0), send(stagger))
+
+def test_retry_replays_the_stored_response(client, workflow_id):
+    first = _execute(client, workflow_id, "replay-key")
+    retry = _execute(client, workflow_id, "replay-key")
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["id"] == first.json()["id"]
+
+def test_retry_during_the_run_attaches_to_it(client, workflow_id, mock_llm):
+    mock_llm.time_to_first_token_ms = 400
+
+    first, retry = client.portal.call(_concurrently, workflow_id, "attach-key")
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["id"] == first.json()["id"]
+
+def test_retry_still_in_progress_gets_409(client, workflow_id, mock_llm, monkeypatch):
+    mock_llm.time_to_first_token_ms = 1000
+    monkeypatch.setattr(idempotency, "wait_seconds", 0.1)
+
+    first, retry = client.portal.call(_concurrently, workflow_id, "conflict-key")
+
+    assert first.status_code == 200
+    assert retry.status_code == 409
+    assert retry.headers["Retry-After"] == "1"
+
+def test_key_reused_with_another_body_is_rejected(client, workflow_id):
+    assert _execute(client, workflow_id, "mismatch-key", "one question").status_code == 200
+
+    response = _execute(client, workflow_id, "mismatch-key", "another question")
+
+    assert response.status_code == 422
+
+def test_invalid_body_is_reported_once(client, workflow_id):
+    response = client.post(f"/workflows/{workflow_id}/execute", headers={"Idempotency-Key": "invalid-key"},
+                           json={"workflow_id": workflow_id})
+
+    assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [["body", "input_query"]]
+
+def test_retry_giving_up_does_not_strand_the_others(client):
+    store = IdempotencyStore()
+    store.poll_interval = 5
+    request = Request({"type": "http", "method": "POST", "path": "/", "headers": [(b"idempotency-key", b"shared")]})
+
+    async def scenario():
+        claim = await store.begin(request, "test", {"query": "hello"})
+        store.wait_seconds = 0.05
+        impatient = asyncio.create_task(store.begin(request, "test", {"query": "hello"}))
+        await asyncio.sleep(0)
+        store.wait_seconds = 5
+        patient = asyncio.create_task(store.begin(request, "test", {"query": "hello"}))
+        with pytest.raises(HTTPException):
+            await impatient
+        started = time.monotonic()
+        await store.complete(claim, {"answer": 42})
+        replayed = await patient
+        return replayed, time.monotonic() - started
+
+    replayed, woken_after = client.portal.call(scenario)
+
+    assert replayed.replay is not None
+    # Woken by the completion, not by the next poll
+    assert woken_after < 1
+    assert store._settled == {} and store._waiters == {}
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.services.readiness import Readiness
+
+def test_failed_dependency_is_warmed_again_until_ready():
+    attempts = []
+
+    async def flaky():
+        attempts.append(len(attempts))
+        if len(attempts) < 3:
+            raise ConnectionError("not up yet")
+        return "connected"
+
+    async def scenario():
+        readiness = Readiness(retry_initial=0.01, retry_max=0.02)
+        readiness.register("database", flaky, required=True)
+        readiness.start()
+        for _ in range(100):
+            if readiness.is_ready():
+                break
+            await asyncio.sleep(0.01)
+        await readiness.close()
+        return readiness.report()
+
+    report = asyncio.run(scenario())
+
+    assert report["ready"]
+    assert report["dependencies"]["database"]["state"] == "ready"
+    assert "error" not in report["dependencies"]["database"]
+    assert len(attempts) == 3
@@ -0,0 +1,30 @@
+import json
+
+from app.services.tracing import Tracer
+
+def test_spans_are_not_kept_without_an_exporter():
+    tracer = Tracer()
+    tracer.export_path = tracer.export_url = None
+
+    with tracer.start_span("root") as root:
+        with tracer.start_span("child") as child:
+            assert tracer._traces == {}
+
+    assert child.parent_id == root.span_id
+    assert child.duration_ms >= 0
+    assert tracer._traces == {}
+
+def test_finished_trace_is_exported_once(tmp_path):
+    tracer = Tracer()
+    tracer.export_url = None
+    tracer.export_path = str(tmp_path / "traces.jsonl")
+
+    with tracer.start_span("root"):
+        with tracer.start_span("child"):
+            pass
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(lines) == 1
+    assert [span["name"] for span in spans] == ["child", "root"]
+    assert tracer._traces == {}
@@ -0,0 +1,168 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from app.schemas.workflow import ComponentConfig, WorkflowConnection
+from app.services.fair_scheduler import fair_scheduler
+from app.services.workflow_executor import WorkflowExecutor
+
+def _component(component_id, type="llm_engine", **data):
+    return ComponentConfig(id=component_id, type=type, label=component_id, position={"x": 0, "y": 0}, data=data)
+
+def _edges(*pairs):
+    return [WorkflowConnection(id=f"{source}-{target}", source=source, target=target) for source, target in pairs]
+
+class FakeComponents:
+    """Stands in for the component executors: sleeps, records timings and can fail on request"""
+
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.started = {}
+        self.finished = {}
+
+    async def __call__(self, component, node_input):
+        self.started[component.id] = time.monotonic()
+        delay = self.delays.get(component.id, 0)
+        await asyncio.sleep(delay() if callable(delay) else delay)
+        self.finished[component.id] = time.monotonic()
+        if component.id in self.failing:
+            return {"success": False, "error": f"{component.id} failed"}
+        return {
+            "success": True,
+            "response": f"{node_input['query']}:{component.id}",
+            "context": f"context from {component.id}"
+        }
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = WorkflowExecutor()
+
+    def install(fake):
+        monkeypatch.setattr(executor, "_execute_component", fake)
+        return fake
+    executor.install = install
+    return executor
+
+def test_concurrent_runs_keep_their_own_state(executor):
+    executor.install(FakeComponents(delays={"llm": lambda: random.uniform(0, 0.02)}))
+    plan = executor.compile_plan(
+        [_component("query", "user_query"), _component("llm"), _component("output", "output")],
+        _edges(("query", "llm"), ("llm", "output"))
+    )
+
+    async def run_all():
+        return await asyncio.gather(*[executor.execute_plan(plan, f"question {i}") for i in range(100)])
+
+    results = asyncio.run(run_all())
+
+    assert len({result["metadata"]["execution_id"] for result in results}) == 100
+    for i, result in enumerate(results):
+        assert result["status"] == "completed"
+        assert result["final_response"] == f"question {i}:output"
+        assert [step["component_id"] for step in result["execution_steps"]] == ["query", "llm", "output"]
+        assert all(step["input"]["query"] == f"question {i}" for step in result["execution_steps"])
+
+def test_independent_branches_run_in_parallel_and_join_waits_for_both(executor):
+    fake = executor.install(FakeComponents(delays={"left": 0.2, "right": 0.2}))
+    plan = executor.compile_plan(
+        [_component("query", "user_query"), _component("left"), _component("right"),
+         _component("join"), _component("output", "output")],
+        _edges(("query", "left"), ("query", "right"), ("left", "join"), ("right", "join"), ("join", "output"))
+    )
+
+    result = asyncio.run(executor.execute_plan(plan, "diamond", max_parallelism=2))
+
+    assert result["status"] == "completed"
+    # Both branches were running at the same time
+    assert fake.started["right"] < fake.finished["left"] and fake.started["left"] < fake.finished["right"]
+    assert fake.started["join"] >= max(fake.finished["left"], fake.finished["right"])
+    assert fake.started["output"] >= fake.finished["join"]
+    steps = result["execution_steps"]
+    assert [step["component_id"] for step in steps] == list(plan.order)
+    join_input = next(step["input"] for step in steps if step["component_id"] == "join")
+    assert "context from left" in join_input["context"] and "context from right" in join_input["context"]
+
+def test_max_parallelism_one_runs_branches_one_after_another(executor):
+    fake = executor.install(FakeComponents(delays={"left": 0.05, "right": 0.05}))
+    plan = executor.compile_plan(
+        [_component("query", "user_query"), _component("left"), _component("right"), _component("output", "output")],
+        _edges(("query", "left"), ("query", "right"), ("left", "output"), ("right", "output"))
+    )
+
+    asyncio.run(executor.execute_plan(plan, "sequential", max_parallelism=1))
+
+    first, second = sorted(("left", "right"), key=fake.started.get)
+    assert fake.started[second] >= fake.finished[first]
+
+def test_failed_component_stops_its_downstream(executor):
+    fake = executor.install(FakeComponents(delays={"right": 0.1}, failing={"left"}))
+    plan = executor.compile_plan(
+        [_component("query", "user_query"), _component("left"), _component("right"),
+         _component("join"), _component("output", "output")],
+        _edges(("query", "left"), ("query", "right"), ("left", "join"), ("right", "join"), ("join", "output"))
+    )
+
+    result = asyncio.run(executor.execute_plan(plan, "failing"))
+
+    statuses = {step["component_id"]: step["status"] for step in result["execution_steps"]}
+    assert statuses["left"] == "failed"
+    # The sibling already running finishes; nothing downstream of the failure starts
+    assert statuses["right"] == "completed"
+    assert "join" not in fake.started and "output" not in fake.started
+    assert result["metadata"]["failed_steps"] == 1
+
+def test_cancel_event_interrupts_running_components(executor):
+    executor.install(FakeComponents(delays={"llm": 5}))
+    plan = executor.compile_plan(
+        [_component("query", "user_query"), _component("llm"), _component("output", "output")],
+        _edges(("query", "llm"), ("llm", "output"))
+    )
+
+    async def run_and_cancel():
+        cancel_event = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.1, cancel_event.set)
+        return await executor.execute_plan(plan, "cancelled", cancel_event=cancel_event)
+
+    started = time.monotonic()
+    result = asyncio.run(run_and_cancel())
+
+    assert time.monotonic() - started < 2
+    assert result["status"] == "cancelled"
+    assert {step["component_id"]: step["status"] for step in result["execution_steps"]}["llm"] == "cancelled"
+
+def test_timeout_marks_the_run_timed_out(executor):
+    executor.install(FakeComponents(delays={"llm": 5}))
+    plan = executor.compile_plan(
+        [_component("query", "user_query"), _component("llm"), _component("output", "output")],
+        _edges(("query", "llm"), ("llm", "output"))
+    )
+
+    result = asyncio.run(executor.execute_plan(plan, "slow", timeout_seconds=0.2))
+
+    assert result["status"] == "timed_out"
+    assert {step["component_id"]: step["status"] for step in result["execution_steps"]}["llm"] == "timed_out"
+
+def test_slot_wait_counts_against_the_timeout(executor, monkeypatch):
+    monkeypatch.setattr(fair_scheduler, "capacity", 1)
+    executor.install(FakeComponents(delays={"llm": 0.5}))
+    plan = executor.compile_plan(
+        [_component("query", "user_query"), _component("llm"), _component("output", "output")],
+        _edges(("query", "llm"), ("llm", "output"))
+    )
+
+    async def run_both():
+        holder = asyncio.create_task(executor.execute_plan(plan, "holder", tenant="a"))
+        await asyncio.sleep(0.05)
+        late = await executor.execute_plan(plan, "late", tenant="b", timeout_seconds=0.1)
+        return late, await holder
+
+    late, holder = asyncio.run(run_both())
+
+    assert late["status"] == "timed_out"
+    assert late["execution_steps"] == []
+    assert late["metadata"]["duration_ms"] < 400
+    assert holder["status"] == "completed"
+    assert fair_scheduler.in_flight == 0
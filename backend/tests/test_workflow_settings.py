@@ -0,0 +1,127 @@
+import pytest
+
+from app.services.cancellation import resolve_timeout
+from app.services.chat_memory import MemoryPolicy
+from app.services.retention import RetentionPolicy
+from app.services.workflow_executor import workflow_executor, resolve_max_parallelism
+from app.services.workflow_settings import parse_setting
+
+def test_booleans_are_parsed_not_coerced():
+    assert parse_setting("memory.enabled", "false", True) is False
+    assert parse_setting("memory.enabled", "Yes", False) is True
+    assert parse_setting("memory.enabled", 0, True) is False
+    with pytest.raises(ValueError):
+        parse_setting("memory.enabled", "off-ish", True)
+
+@pytest.mark.parametrize("value", ["abc", -1, 2.5, True, None, float("inf")])
+def test_invalid_counts_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_setting("retention.execution_max_count", value, 0)
+
+def test_retention_overrides_keep_the_default_types():
+    policy = RetentionPolicy(execution_max_count=1000, chat_max_age_days=90.0).for_workflow(
+        {"retention": {"execution_max_count": "100", "chat_max_age_days": 7}}
+    )
+
+    assert policy.execution_max_count == 100 and isinstance(policy.execution_max_count, int)
+    assert policy.chat_max_age_days == 7.0
+    assert policy.chat_max_sessions == 0
+
+def test_workflow_with_invalid_retention_is_rejected(client):
+    response = client.post("/workflows/", json={
+        "name": "bad retention", "components": [], "connections": [],
+        "settings": {"retention": {"execution_max_count": "lots"}}
+    })
+
+    assert response.status_code == 400
+    assert "retention.execution_max_count" in response.json()["detail"]
+
+def test_memory_can_be_disabled_with_a_string():
+    policy = MemoryPolicy(enabled=True, turns=6).for_workflow({"memory": {"enabled": "false", "turns": "2"}})
+
+    assert policy.enabled is False
+    assert policy.turns == 2
+
+def test_workflow_with_invalid_memory_is_rejected(client):
+    response = client.post("/workflows/", json={
+        "name": "bad memory", "components": [], "connections": [],
+        "settings": {"memory": {"enabled": "maybe"}}
+    })
+
+    assert response.status_code == 400
+    assert "memory.enabled" in response.json()["detail"]
+
+def test_workflow_with_unknown_trace_level_is_rejected(client, workflow_id):
+    created = client.post("/workflows/", json={
+        "name": "bad trace level", "components": [], "connections": [],
+        "settings": {"trace_level": "verbose"}
+    })
+    updated = client.put(f"/workflows/{workflow_id}", json={"settings": {"trace_level": "verbose"}})
+
+    assert created.status_code == 400
+    assert updated.status_code == 400
+    assert "verbose" in updated.json()["detail"]
+
+def test_timeout_setting_is_parsed_as_a_number():
+    assert resolve_timeout(None, {"timeout_seconds": "30"}) == 30.0
+    assert resolve_timeout(5, {"timeout_seconds": "30"}) == 5
+
+@pytest.mark.parametrize("value", ["soon", 0, -5])
+def test_workflow_with_invalid_timeout_is_rejected(client, value):
+    response = client.post("/workflows/", json={
+        "name": "bad timeout", "components": [], "connections": [],
+        "settings": {"timeout_seconds": value}
+    })
+
+    assert response.status_code == 400
+    assert "timeout_seconds" in response.json()["detail"]
+
+def test_request_timeout_must_be_positive(client, workflow_id):
+    execute = client.post(f"/workflows/{workflow_id}/execute",
+                          json={"workflow_id": workflow_id, "input_query": "hi", "timeout_seconds": 0})
+    chat = client.post("/chat/", json={"workflow_id": workflow_id, "message": "hi", "timeout_seconds": -1})
+
+    assert execute.status_code == 422
+    assert chat.status_code == 422
+
+def test_max_parallelism_comes_from_the_request_then_the_settings():
+    assert resolve_max_parallelism(None, {"max_parallelism": "2"}) == 2
+    assert resolve_max_parallelism(3, {"max_parallelism": 2}) == 3
+    assert resolve_max_parallelism(None, {}) is None
+
+@pytest.mark.parametrize("value", [0, 1.5, "many"])
+def test_workflow_with_invalid_max_parallelism_is_rejected(client, workflow_id, value):
+    response = client.put(f"/workflows/{workflow_id}", json={"settings": {"max_parallelism": value}})
+
+    assert response.status_code == 400
+    assert "max_parallelism" in response.json()["detail"]
+
+def test_max_parallelism_setting_reaches_the_executor(client, workflow_id, monkeypatch):
+    seen = []
+    execute_plan = workflow_executor.execute_plan
+
+    async def spy(*args, **kwargs):
+        seen.append(kwargs.get("max_parallelism"))
+        return await execute_plan(*args, **kwargs)
+
+    monkeypatch.setattr(workflow_executor, "execute_plan", spy)
+    assert client.put(f"/workflows/{workflow_id}", json={"settings": {"max_parallelism": 2}}).status_code == 200
+
+    client.post("/chat/", json={"workflow_id": workflow_id, "message": "hi"})
+    client.post(f"/workflows/{workflow_id}/execute", json={"workflow_id": workflow_id, "input_query": "hi", "max_parallelism": 1})
+    rejected = client.post("/chat/", json={"workflow_id": workflow_id, "message": "hi", "max_parallelism": 0})
+
+    assert seen == [2, 1]
+    assert rejected.status_code == 422
+
+def test_memory_must_keep_at_least_one_turn(client):
+    with pytest.raises(ValueError):
+        MemoryPolicy().for_workflow({"memory": {"turns": 0}})
+
+    response = client.post("/workflows/", json={
+        "name": "no turns", "components": [], "connections": [],
+        "settings": {"memory": {"turns": "0"}}
+    })
+
+    assert response.status_code == 400
+    assert "memory.turns" in response.json()["detail"]
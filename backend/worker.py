@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Run queued workflow executions outside the API.
+
+Requests sent with ``Prefer: respond-async`` (or every request, with
+EXECUTION_MODE=queue) are stored in the execution_jobs table and run by
+these processes. Start as many as needed, on any host that reaches the same
+database and vector store. The vector store must be a Chroma server
+(CHROMA_MODE=http): a persistent store opened here as well as in the API
+would not see the API's writes. Run from the backend directory:
+
+    CHROMA_MODE=http python worker.py --concurrency 4
+    CHROMA_MODE=http python worker.py --concurrency 4 --metrics-port 9101
+
+SIGTERM and Ctrl+C stop claiming new jobs and let running ones finish for
+up to JOB_DRAIN_SECONDS; jobs still running after that go back to the queue.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+
+def serve_metrics(port: int):
+    """Expose this worker's /metrics, since it has no API of its own"""
+    from app.services.metrics import metrics
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+async def run(concurrency: int):
+    from app.database import engine, write_engine, Base
+    import app.models  # noqa: F401 - registers the tables
+    from app.services.execution_worker import ExecutionWorker
+
+    async with write_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    worker = ExecutionWorker(concurrency=concurrency)
+    print(f"Execution worker {worker.worker_id} running {worker.concurrency} jobs at a time")
+    try:
+        await worker.run(stop)
+    finally:
+        await engine.dispose()
+        await write_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued workflow executions")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("JOB_WORKER_CONCURRENCY", "4")))
+    parser.add_argument("--metrics-port", type=int, default=None)
+    parser.add_argument("--allow-local-chroma", action="store_true",
+                        help="Start without a Chroma server, e.g. for workflows without a knowledge base")
+    args = parser.parse_args()
+
+    if os.getenv("CHROMA_MODE", "persistent").lower() != "http":
+        if not args.allow_local_chroma:
+            parser.error("CHROMA_MODE=http is required, so the worker reads the same vector store as the API; "
+                         "pass --allow-local-chroma to start anyway")
+        print("Warning: using a local persistent vector store; documents the API adds will not be seen here")
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    asyncio.run(run(args.concurrency))
+
+if __name__ == "__main__":
+    main()